@@ -0,0 +1,279 @@
+"""
+Benchmarks of the NsysSqlite query layer and the analyses built on it, on
+synthetic traces (see nsyspy.synthetic), so no GPU or nsys is needed.
+
+Each benchmark runs in a fresh process, and the reported peak RSS is the
+growth of that process' high-water mark over its RSS after imports and
+opening the database, i.e. the memory the benchmark itself needed.
+
+    python benchmarks/querybench.py --sizes 10k,1M,10M
+    python benchmarks/querybench.py --sizes 1M --only Kernels --json after.json --baseline before.json
+
+Traces are generated once and kept in --data-dir. Row (dataclass) mode
+benchmarks are skipped above 1M rows, as they need several GB there. The
+kernelSummaryManyNames benchmarks run on traces with MANY_NAMES distinct
+kernel names, where grouping costs depend on the number of groups.
+"""
+from __future__ import annotations
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from nsyspy import NsysSqlite
+from nsyspy import device
+from nsyspy.compare import compareReports
+from nsyspy.concurrency import analyzeConcurrency
+from nsyspy.criticalpath import analyzeCriticalPath
+from nsyspy.synthetic import generateTrace
+from nsyspy.timeline import utilizationSeries
+
+MILLION = 1000000
+
+# Kernel names of the high name-cardinality traces
+MANY_NAMES = 20000
+
+# name -> (function of an open NsysSqlite, largest trace size it runs on,
+# generateTrace() arguments of the trace it runs on besides numKernels)
+BENCHMARKS = dict()
+
+def benchmark(maxRows: int | None = None, **traceArgs):
+    def register(func):
+        BENCHMARKS[func.__name__] = (func, maxRows, traceArgs)
+        return func
+    return register
+
+@benchmark(maxRows=MILLION)
+def getKernelsBetweenRows(db):
+    return len(db.getKernelsBetween())
+
+@benchmark()
+def getKernelsBetweenColumnar(db):
+    return len(db.getKernelsBetween(columnar=True))
+
+@benchmark()
+def iterKernelsBetweenColumnar(db):
+    return sum(len(chunk) for chunk in db.iterKernelsBetween(columnar=True))
+
+@benchmark()
+def getKernelsByName(db):
+    return len(db.getKernels("kernel_1", columnar=True))
+
+@benchmark()
+def getKernelsAfter(db):
+    kernels = db.iterKernelsBetween(batchSize=1)
+    first = next(kernels)
+    kernels.close()
+    return len(db.getKernelsAfter(first, 1000, columnar=True))
+
+@benchmark()
+def getCudaApiCallsBetweenColumnar(db):
+    return len(db.getCudaApiCallsBetween(columnar=True))
+
+@benchmark()
+def getNvtxBetweenColumnar(db):
+    return len(db.getNvtxBetween(columnar=True))
+
+@benchmark()
+def getKernelLaunchesBetween(db):
+    return len(db.getKernelLaunchesBetween())
+
+@benchmark()
+def projectNvtxToKernels(db):
+    return len(db.projectNvtxToKernels(db.getNvtxBetween(columnar=True)))
+
+@benchmark()
+def kernelSummary(db):
+    return len(db.kernelSummary())
+
+@benchmark()
+def kernelSummaryByStreamAndConfig(db):
+    return len(db.kernelSummary(byStream=True, byLaunchConfig=True))
+
+@benchmark(numNames=MANY_NAMES)
+def kernelSummaryManyNames(db):
+    return len(db.kernelSummary())
+
+@benchmark(numNames=MANY_NAMES)
+def kernelSummaryManyNamesByStream(db):
+    return len(db.kernelSummary(byStream=True))
+
+@benchmark()
+def resolveStringColumn(db):
+    return len(db.resolveStringColumn(db.getKernelsBetween(columnar=True).shortName))
+
+@benchmark()
+def getStreams(db):
+    return len(db.getStreams())
+
+@benchmark()
+def buildSidecarIndexes(db):
+    path = os.path.join(tempfile.mkdtemp(), "idx.sqlite")
+    try:
+        return len(db.buildIndexes(sidecar=path))
+    finally:
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+@benchmark()
+def snapshotCache(db):
+    directory = tempfile.mkdtemp()
+    try:
+        return len(db.snapshot(directory).tablenames)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+@benchmark()
+def analyzeConcurrencyAll(db):
+    return len(analyzeConcurrency(db.getKernelsBetween(columnar=True)))
+
+@benchmark()
+def theoreticalOccupancies(db):
+    return len(device.A10().theoreticalOccupancies(db.getKernelsBetween(columnar=True))[0])
+
+@benchmark()
+def launchLatencySummary(db):
+    return len(db.getKernelLaunchesBetween().summarize("queueDelay", by="shortName"))
+
+@benchmark()
+def utilizationSeries2000(db):
+    return len(utilizationSeries(db.getKernelsBetween(columnar=True), 2000, device=device.A10()))
+
+@benchmark()
+def criticalPath(db):
+    return len(analyzeCriticalPath(db.getDependencyGraph()).path)
+
+@benchmark()
+def compareWithItself(db):
+    return len(compareReports(db, db).kernels)
+
+def parseSize(text: str) -> int:
+    text = text.strip().lower()
+    scale = {"k": 1000, "m": MILLION}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+def tracePath(dataDir: str, rows: int, **traceArgs) -> str:
+    suffix = "".join(f"_{name}{value}" for name, value in sorted(traceArgs.items()))
+    path = os.path.join(dataDir, f"synthetic_{rows}{suffix}.sqlite")
+    if not os.path.exists(path):
+        print(f"Generating {path}...", flush=True)
+        generateTrace(path + ".tmp", numKernels=rows, **traceArgs)
+        os.replace(path + ".tmp", path)
+    return path
+
+def _statusBytes(field: str) -> int | None:
+    # VmRSS / VmHWM (peak) of this process, in bytes; Linux only
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def _peakRssBytes() -> int:
+    peak = _statusBytes("VmHWM")
+    if peak is not None:
+        return peak
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def _resetPeakRss() -> int:
+    # Linux lets a process reset its high-water mark to the current RSS;
+    # elsewhere the peak may include the interpreter start up
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+    current = _statusBytes("VmRSS")
+    return current if current is not None else _peakRssBytes()
+
+def _runOne(name: str, path: str, queue):
+    func, _, _ = BENCHMARKS[name]
+    t0 = time.perf_counter()
+    db = NsysSqlite(path)
+    openTime = time.perf_counter() - t0
+    baseline = _resetPeakRss()
+    t0 = time.perf_counter()
+    result = func(db)
+    elapsed = time.perf_counter() - t0
+    queue.put({
+        "seconds": elapsed,
+        "openSeconds": openTime,
+        "peakRssBytes": max(_peakRssBytes() - baseline, 0),
+        "result": result,
+    })
+
+def run(name: str, path: str) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_runOne, args=(name, path, queue))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        return {"error": f"exit code {proc.exitcode}"}
+    return queue.get()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10k,1M,10M", help="Comma separated kernel counts, e.g. 10k,1M")
+    parser.add_argument("--only", default=None, help="Only run benchmarks whose name contains this")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "nsyspy-bench"))
+    parser.add_argument("--json", default=None, help="Write the results to this file")
+    parser.add_argument("--baseline", default=None, help="Results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown or memory growth reported as a regression")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    sizes = [parseSize(s) for s in args.sizes.split(",")]
+    baseline = dict()
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = dict()
+    regressions = list()
+    print(f"{'benchmark':<34}{'rows':>10}{'seconds':>10}{'Mrows/s':>10}{'peak MB':>10}")
+    for rows in sizes:
+        for name, (_, maxRows, traceArgs) in BENCHMARKS.items():
+            if args.only is not None and args.only not in name:
+                continue
+            if maxRows is not None and rows > maxRows:
+                continue
+            key = f"{name}@{rows}"
+            r = run(name, tracePath(args.data_dir, rows, **traceArgs))
+            results[key] = r
+            if "error" in r:
+                print(f"{name:<34}{rows:>10}  {r['error']}")
+                continue
+            line = (f"{name:<34}{rows:>10}{r['seconds']:>10.3f}"
+                    f"{rows / r['seconds'] / MILLION:>10.2f}{r['peakRssBytes'] / 2**20:>10.1f}")
+            old = baseline.get(key)
+            if old is not None and "error" not in old:
+                for metric in ("seconds", "peakRssBytes"):
+                    # Ignore tiny absolute numbers, which are mostly noise
+                    floor = 0.05 if metric == "seconds" else 16 * 2**20
+                    if r[metric] > max(old[metric], floor) * (1 + args.threshold):
+                        regressions.append((key, metric, old[metric], r[metric]))
+                        line += f"  REGRESSION {metric} ({old[metric]:.3g} -> {r[metric]:.3g})"
+            print(line, flush=True)
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
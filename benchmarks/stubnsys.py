@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the nsys binary, so Runner (and Runner.benchmark() in
+particular) can be exercised without a GPU:
+
+    runner = Runner(nsys_path="benchmarks/stubnsys.py")
+    result = runner.benchmark(["./app"], runs=5)
+
+'profile --output=<report> ... <target>' writes a small placeholder report,
+and 'export --type=sqlite ... <report>' writes a synthetic trace (see
+nsyspy.synthetic.generateTrace()) next to it. Every export is the same
+trace, except that kernel durations get a few percent of fresh random
+jitter, like repeated runs of a real application. Trace shape can be set
+through environment variables: STUBNSYS_KERNELS, STUBNSYS_NAMES,
+STUBNSYS_WARMUP (warm-up launches per kernel name) and STUBNSYS_JITTER
+(relative duration noise). For testing Runner itself, STUBNSYS_SLEEP makes
+profile take that many seconds (the report records when it ran), and
+STUBNSYS_FAIL, a comma separated list of commands, makes those commands
+exit with status 1 without writing anything.
+"""
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from nsyspy.synthetic import generateTrace
+
+def main(argv: list[str]) -> int:
+    if len(argv) == 0:
+        print("usage: stubnsys.py {profile,export} ...", file=sys.stderr)
+        return 2
+    command, args = argv[0], argv[1:]
+    if command in os.environ.get("STUBNSYS_FAIL", "").split(","):
+        print(f"{command} failed (STUBNSYS_FAIL)", file=sys.stderr)
+        return 1
+    if command == "profile":
+        output = next((a.split("=", 1)[1] for a in args if a.startswith("--output=")), None)
+        if output is None:
+            print("profile needs --output=<report>", file=sys.stderr)
+            return 2
+        started = time.time()
+        time.sleep(float(os.environ.get("STUBNSYS_SLEEP", 0)))
+        with open(output, "w") as f:
+            json.dump({"args": args, "started": started, "finished": time.time()}, f)
+        return 0
+    if command == "export":
+        reportname = args[-1]
+        if not os.path.exists(reportname):
+            print(f"{reportname} does not exist", file=sys.stderr)
+            return 1
+        sqlitepath = os.path.splitext(reportname)[0] + ".sqlite"
+        generateTrace(
+            sqlitepath,
+            numKernels=int(os.environ.get("STUBNSYS_KERNELS", 2000)),
+            numNames=int(os.environ.get("STUBNSYS_NAMES", 10)),
+            kernelsPerRange=0,
+            warmup=int(os.environ.get("STUBNSYS_WARMUP", 10)),
+        )
+        # Uniform noise in [-jitter, jitter]; sqlite seeds random() afresh in every process
+        jitter = float(os.environ.get("STUBNSYS_JITTER", 0.02))
+        con = sqlite3.connect(sqlitepath)
+        con.execute(
+            "update CUPTI_ACTIVITY_KIND_KERNEL set end = start + "
+            "cast((end - start) * (1 + ? * (random() % 1000000) / 1000000.0) as int)",
+            (jitter,)
+        )
+        con.commit()
+        con.close()
+        return 0
+    print(f"unknown command {command}", file=sys.stderr)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
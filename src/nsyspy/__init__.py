@@ -1,3 +1,4 @@
 from .streams import Stream
-from .analysis import NsysSqlite, CuptiActivityKindKernel
-from .runners import Runner
+from .analysis import NsysSqlite, CuptiActivityKindKernel, KernelTable, NvtxTable, RuntimeTable, LaunchTable, MemcpyTable, MemsetTable
+from .runners import Runner, Job
+from .reports import ReportSet
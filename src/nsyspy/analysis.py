@@ -1,10 +1,26 @@
 from __future__ import annotations
 import sew
-from sew.condition import Condition
 import dataclasses
+import functools
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterator
+import numpy as np
 
 from .streams import Stream
-from .internal_enums import EnumCudaKernelLaunchType
+from .internal_enums import EnumCudaKernelLaunchType, EnumCudaMemcpyOper
+from .columnar import ColumnarTable
+from .strings import StringCache
+from . import indexes
+from .projection import NvtxProjection, projectRanges
+from .nvtxtree import NvtxTree, buildNvtxTree
+from .criticalpath import DependencyGraph, buildDependencyGraph
+from .cache import TraceCache, defaultCachePath
+from .stats import histogramPercentiles, groupedSummary
+from .query import KernelQuery, likePattern
+from .instrumentation import QueryProfiler, QueryRecord, InstrumentedCursor, NO_CONSTRUCTION
+from .pool import ConnectionPool
 
 @dataclasses.dataclass
 class CuptiActivityKindKernel:
@@ -88,6 +104,42 @@ class CuptiActivityKindKernel:
     # def clusters(self) -> tuple[int, int, int]:
     #     return (self.clusterX, self.clusterY, self.clusterZ)
 
+class KernelTable(ColumnarTable):
+    """
+    Columnar version of a list of CuptiActivityKindKernel.
+
+    Every column of CUPTI_ACTIVITY_KIND_KERNEL is available as a NumPy array
+    e.g. table.start, table.streamId. Indexing with an int returns a single
+    CuptiActivityKindKernel, while indexing with a boolean mask, slice or index
+    array returns a new KernelTable:
+
+        kernels = db.getKernelsBetween(columnar=True)
+        longKernels = kernels[kernels.duration > 10000]
+        first = longKernels[0] # CuptiActivityKindKernel
+    """
+    rowType = CuptiActivityKindKernel
+
+    @property
+    def duration(self) -> np.ndarray:
+        return self.end - self.start
+
+    @property
+    def threads_per_blk(self) -> np.ndarray:
+        return self.blockX * self.blockY * self.blockZ
+
+    @property
+    def totalBlocks(self) -> np.ndarray:
+        return self.gridX * self.gridY * self.gridZ
+
+    def shortNameStrings(self, db: NsysSqlite) -> np.ndarray:
+        return db.resolveStringColumn(self.shortName)
+
+    def mangledNameStrings(self, db: NsysSqlite) -> np.ndarray:
+        return db.resolveStringColumn(self.mangledName)
+
+    def demangledNameStrings(self, db: NsysSqlite) -> np.ndarray:
+        return db.resolveStringColumn(self.demangledName)
+
 @dataclasses.dataclass
 class NvtxEvent:
     rowid: int
@@ -120,72 +172,1035 @@ class NvtxEvent:
         kernels = db.getKernelsFromApiCalls(apicalls)
         return kernels
 
+class NvtxTable(ColumnarTable):
+    """
+    Columnar version of a list of NvtxEvent.
+    """
+    rowType = NvtxEvent
+    dtypes = {
+        "text": object,
+        "jsonText": object,
+        "binaryData": object,
+        "doubleValue": np.float64,
+        "floatValue": np.float64,
+    }
+
+    @property
+    def duration(self) -> np.ndarray:
+        return self.end - self.start
+
+    def textIdStrings(self, db: NsysSqlite) -> np.ndarray:
+        return db.resolveStringColumn(self.textId)
+
+@dataclasses.dataclass
+class CuptiActivityKindRuntime:
+    """
+    Dataclass representing a row in the CUPTI_ACTIVITY_KIND_RUNTIME table,
+    i.e. a CUDA runtime API call made on the host.
+    """
+    rowid: int
+    start: int
+    end: int
+    eventClass: int
+    globalTid: int
+    correlationId: int
+    nameId: int
+    returnValue: int
+    callchainId: int | None = None
+
+    def nameIdString(self, db: NsysSqlite) -> str:
+        return db.findStringMatchingId(self.nameId)
+
+    @property
+    def duration(self) -> int:
+        return self.end - self.start
+
+class RuntimeTable(ColumnarTable):
+    """
+    Columnar version of the CUPTI_ACTIVITY_KIND_RUNTIME rows.
+    """
+    rowType = CuptiActivityKindRuntime
+
+    @property
+    def duration(self) -> np.ndarray:
+        return self.end - self.start
+
+    def nameIdStrings(self, db: NsysSqlite) -> np.ndarray:
+        return db.resolveStringColumn(self.nameId)
+
+class LaunchTable(KernelTable):
+    """
+    Kernels joined with the runtime API call that launched them, as returned by
+    NsysSqlite.getKernelLaunchesBetween(). On top of the kernel columns it has
+    apiStart, apiEnd, apiGlobalTid and apiNameId from the runtime call.
+    """
+    _NAME_COLUMNS = ("shortName", "demangledName", "mangledName", "apiNameId")
+
+    @property
+    def launchOverhead(self) -> np.ndarray:
+        """
+        CPU time spent inside the launching API call.
+        """
+        return self.apiEnd - self.apiStart
+
+    @property
+    def launchLatency(self) -> np.ndarray:
+        """
+        Time from the start of the launching API call to the start of the kernel.
+        """
+        return self.start - self.apiStart
+
+    @property
+    def queueDelay(self) -> np.ndarray:
+        """
+        Time from the return of the launching API call to the start of the kernel.
+        Negative if the kernel started before the call returned.
+        """
+        return self.start - self.apiEnd
+
+    def apiNameIdStrings(self, db: NsysSqlite) -> np.ndarray:
+        return db.resolveStringColumn(self.apiNameId)
+
+    def summarize(
+        self,
+        metric: str = "queueDelay",
+        by: str = "shortName",
+        db: NsysSqlite | None = None,
+        percentiles: list[float] | tuple[float, ...] = (50, 90, 99)
+    ) -> ColumnarTable:
+        """
+        Distribution of a launch metric per kernel name, per thread etc.
+
+        Parameters
+        ----------
+        metric : str
+            Any column or property, e.g. 'launchOverhead', 'launchLatency'
+            or 'queueDelay'. Defaults to 'queueDelay'.
+
+        by : str
+            Column to group by, e.g. 'shortName' for per kernel, or
+            'apiGlobalTid' for per launching thread. Defaults to 'shortName'.
+
+        db : NsysSqlite | None
+            If given and by is a StringIds column, a 'name' column with the
+            resolved strings is added. Defaults to None.
+
+        percentiles : list[float] | tuple[float, ...]
+            Percentiles to compute. Defaults to (50, 90, 99).
+
+        Returns
+        -------
+        summary : ColumnarTable
+            See stats.groupedSummary().
+        """
+        summary = groupedSummary(self[by], getattr(self, metric), percentiles, keyName=by)
+        if db is not None and by in self._NAME_COLUMNS:
+            summary.columns["name"] = db.resolveStringColumn(summary[by])
+        return summary
+
+@dataclasses.dataclass
+class CuptiActivityKindMemcpy:
+    """
+    Dataclass representing a row in the CUPTI_ACTIVITY_KIND_MEMCPY table,
+    i.e. one memory copy performed by a device.
+    """
+    rowid: int
+    start: int
+    end: int
+    deviceId: int
+    contextId: int
+    streamId: int
+    correlationId: int
+    globalPid: int
+    bytes: int
+    copyKind: int
+    greenContextId: int | None = None
+    deprecatedSrcId: int | None = None
+    srcKind: int | None = None
+    dstKind: int | None = None
+    srcDeviceId: int | None = None
+    srcContextId: int | None = None
+    dstDeviceId: int | None = None
+    dstContextId: int | None = None
+    migrationCause: int | None = None
+    graphNodeId: int | None = None
+    virtualAddress: int | None = None
+
+    def copyKindLabel(self, db: NsysSqlite) -> str:
+        return db._getEnumCudaMemcpyOper().get(self.copyKind, str(self.copyKind))
+
+    @property
+    def duration(self) -> int:
+        return self.end - self.start
+
+    @property
+    def bandwidth(self) -> float:
+        """
+        Achieved bandwidth in bytes per nanosecond, i.e. GB/s.
+        """
+        return self.bytes / self.duration if self.duration > 0 else float("nan")
+
+@dataclasses.dataclass
+class CuptiActivityKindMemset:
+    """
+    Dataclass representing a row in the CUPTI_ACTIVITY_KIND_MEMSET table.
+    """
+    rowid: int
+    start: int
+    end: int
+    deviceId: int
+    contextId: int
+    streamId: int
+    correlationId: int
+    globalPid: int
+    value: int
+    bytes: int
+    greenContextId: int | None = None
+    graphNodeId: int | None = None
+    memKind: int | None = None
+
+    @property
+    def duration(self) -> int:
+        return self.end - self.start
+
+    @property
+    def bandwidth(self) -> float:
+        """
+        Achieved bandwidth in bytes per nanosecond, i.e. GB/s.
+        """
+        return self.bytes / self.duration if self.duration > 0 else float("nan")
+
+class TransferTable(ColumnarTable):
+    """
+    Common base of MemcpyTable and MemsetTable.
+    """
+    @property
+    def duration(self) -> np.ndarray:
+        return self.end - self.start
+
+    @property
+    def bandwidth(self) -> np.ndarray:
+        """
+        Achieved bandwidth of each operation in bytes per nanosecond, i.e. GB/s.
+        NaN for zero duration operations.
+        """
+        duration = self.duration
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(duration > 0, self.bytes / duration, np.nan)
+
+    def summarize(
+        self,
+        by: str = "deviceId",
+        percentiles: list[float] | tuple[float, ...] = (50, 90, 99)
+    ) -> ColumnarTable:
+        """
+        Bandwidth distribution and totals per group of operations.
+
+        Parameters
+        ----------
+        by : str
+            Column to group by, e.g. 'copyKind' (copies only), 'deviceId'
+            or 'streamId'. Defaults to 'deviceId'.
+
+        percentiles : list[float] | tuple[float, ...]
+            Percentiles of the per operation bandwidth. Defaults to (50, 90, 99).
+
+        Returns
+        -------
+        summary : ColumnarTable
+            One row per group, by descending total bytes. The columns of
+            stats.groupedSummary() over the per operation bandwidth, plus
+            bytes and time (the group's totals) and achievedBandwidth
+            (bytes / time), which weighs large operations appropriately.
+        """
+        bandwidth = self.bandwidth
+        valid = ~np.isnan(bandwidth)
+        summary = groupedSummary(self[by][valid], bandwidth[valid], percentiles, keyName=by)
+        keys, inverse = np.unique(self[by], return_inverse=True)
+        inverse = inverse.reshape(-1)
+        # groupedSummary only saw the non-zero duration operations; totals use all
+        rows = np.searchsorted(keys, summary[by])
+        totalBytes = np.bincount(inverse, weights=self.bytes, minlength=len(keys))[rows]
+        totalTime = np.bincount(inverse, weights=self.duration, minlength=len(keys))[rows]
+        summary.columns["bytes"] = totalBytes.astype(np.int64)
+        summary.columns["time"] = totalTime.astype(np.int64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            summary.columns["achievedBandwidth"] = np.where(totalTime > 0, totalBytes / totalTime, np.nan)
+        return summary[np.argsort(-totalBytes, kind="stable")]
+
+class MemsetTable(TransferTable):
+    """
+    Columnar version of the CUPTI_ACTIVITY_KIND_MEMSET rows.
+    """
+    rowType = CuptiActivityKindMemset
+
+class MemcpyTable(TransferTable):
+    """
+    Columnar version of the CUPTI_ACTIVITY_KIND_MEMCPY rows.
+    """
+    rowType = CuptiActivityKindMemcpy
+
+    def copyKindLabels(self, db: NsysSqlite) -> np.ndarray:
+        """
+        The ENUM_CUDA_MEMCPY_OPER label (e.g. 'Host-to-Device') of each copy.
+        """
+        labels = db._getEnumCudaMemcpyOper()
+        kinds, inverse = np.unique(self.copyKind, return_inverse=True)
+        resolved = np.array([labels.get(k, str(k)) for k in kinds.tolist()], dtype=object)
+        return resolved[inverse.reshape(-1)]
+
+    def summarize(
+        self,
+        by: str = "copyKind",
+        percentiles: list[float] | tuple[float, ...] = (50, 90, 99),
+        db: NsysSqlite | None = None
+    ) -> ColumnarTable:
+        """
+        Bandwidth per copy kind (or other column); see TransferTable.summarize().
+        If db is given and by is 'copyKind', a 'name' column with the copy
+        kind labels is added.
+        """
+        summary = super().summarize(by, percentiles)
+        if db is not None and by == "copyKind":
+            labels = db._getEnumCudaMemcpyOper()
+            summary.columns["name"] = np.array(
+                [labels.get(k, str(k)) for k in summary.copyKind.tolist()], dtype=object)
+        return summary
+
 
 class NsysSqlite(sew.Database):
-    def __init__(self, dbfilepath: str, lazyLoadEnums: bool = True):
-        super().__init__(dbfilepath)
+    # Stay under the default SQLITE_MAX_VARIABLE_NUMBER of older sqlite builds
+    _MAX_PARAMS_PER_QUERY = 900
+    # Default number of rows pulled per fetchmany() in the iter* methods
+    DEFAULT_BATCH_SIZE = 65536
+
+    def __init__(
+        self,
+        dbfilepath: str,
+        lazyLoadEnums: bool = True,
+        maxCachedStrings: int = 65536,
+        indexes: str | None = None,
+        cache: bool | str = False,
+        readOnly: bool = False
+    ):
+        """
+        Parameters
+        ----------
+        dbfilepath : str
+            Path to the sqlite file exported by nsys.
+
+        lazyLoadEnums : bool
+            Only read the enum tables when first needed. Defaults to True.
+
+        maxCachedStrings : int
+            Maximum number of StringIds entries to keep cached. Defaults to 65536.
+
+        indexes : str | None
+            Whether to make sure the time-range/correlation indexes exist
+            (see buildIndexes()). One of None (leave as is), "inplace"
+            or "sidecar". Defaults to None.
+
+        cache : bool | str
+            Serve columnar queries from a columnar snapshot of the trace
+            (see snapshot()). The snapshot is loaded if an up-to-date one
+            exists, and written otherwise. Pass a directory, or True to use
+            <export>.nsyspy-cache. Defaults to False.
+
+        readOnly : bool
+            Run all queries on a pool of read-only connections, one per
+            thread (see pool.ConnectionPool), so that one instance can be
+            queried from many threads at once. The connections (including
+            the instance's own, used for setup such as building a sidecar)
+            are opened with mode=ro and immutable=1, so the export is never
+            written, must not change while open, and inplace indexes cannot
+            be built. Defaults to False.
+        """
+        if readOnly:
+            # sew only opens plain paths, i.e. read-write; start it on an empty
+            # in-memory database, then switch to a read-only connection
+            super().__init__(":memory:")
+            # Only used for setup (see buildIndexes()), which may happen on
+            # any thread; queries run on the pool's per-thread connections
+            self._switchConnection(sqlite3.connect(
+                ConnectionPool.uriFor(dbfilepath, immutable=True), uri=True, check_same_thread=False))
+            self.dbpath = dbfilepath
+        else:
+            super().__init__(dbfilepath)
+        # sew binds close() to the connection, which would skip the pool
+        del self.close
+        self._pool = ConnectionPool(dbfilepath) if readOnly else None
+        self._local = threading.local()
+        self._setupLock = threading.Lock()
+        self._stringCache = StringCache(maxCachedStrings)
+        self._sidecarTables: set[str] = set()
+        if readOnly:
+            # sew's execute()/fetch*() shortcuts share one cursor; give each
+            # thread its own, on its pool connection
+            for name in ("execute", "executemany", "fetchone", "fetchall", "fetchmany"):
+                setattr(self, name, functools.partial(self._onThreadCursor, name))
+        self._profiler: QueryProfiler | None = None
+        self._traceCache: TraceCache | None = None
+        self._cachedTables: dict[str, ColumnarTable] = dict()
         # All Enums
         self._enumCudaKernelLaunchType: EnumCudaKernelLaunchType = EnumCudaKernelLaunchType()
+        self._enumCudaMemcpyOper: EnumCudaMemcpyOper = EnumCudaMemcpyOper()
         if not lazyLoadEnums:
             # Each getter also overwrites our member vars
             self._getEnumCudaKernelLaunchType()
+            if "ENUM_CUDA_MEMCPY_OPER" in self.tablenames:
+                self._getEnumCudaMemcpyOper()
+
+        if indexes == "inplace":
+            self.buildIndexes()
+        elif indexes == "sidecar":
+            self.buildIndexes(sidecar=True)
+        elif indexes is not None:
+            raise ValueError("indexes must be one of None, 'inplace' or 'sidecar'")
+
+        if cache:
+            directory = None if cache is True else cache
+            if not self.loadCache(directory):
+                self.snapshot(directory)
+                self.loadCache(directory)
 
     @property
     def path(self) -> str:
         return self.dbpath
 
+    @property
+    def pool(self) -> ConnectionPool | None:
+        """
+        The read-only connection pool, if opened with readOnly=True.
+        """
+        return self._pool
+
+    def close(self):
+        """
+        Closes all connections to the export.
+        """
+        if self._pool is not None:
+            self._pool.close()
+        self.con.close()
+
+    def _switchConnection(self, con: sqlite3.Connection):
+        # Replaces the connection sew opened, along with the shortcuts it
+        # bound to it (see sew.CommonRedirectMixin) and its list of tables
+        self.con.close()
+        con.row_factory = sqlite3.Row
+        self.con = con
+        self.cur = con.cursor()
+        self.execute = self.cur.execute
+        self.executemany = self.cur.executemany
+        self.commit = self.con.commit
+        self.fetchone = self.cur.fetchone
+        self.fetchall = self.cur.fetchall
+        self.fetchmany = self.cur.fetchmany
+        self.reloadTables()
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._pool.connection() if self._pool is not None else self.con
+
+    def _onThreadCursor(self, method: str, *args):
+        con = self._pool.connection()
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None or cursor.connection is not con:
+            cursor = self._local.cursor = con.cursor()
+            cursor.row_factory = sqlite3.Row
+        return getattr(cursor, method)(*args)
+
+    @property
+    def _lastQuery(self) -> tuple[str, tuple] | None:
+        # Kept per thread, so lastQueryUsedIndex() reports the caller's own query
+        return getattr(self._local, "lastQuery", None)
+
+    @_lastQuery.setter
+    def _lastQuery(self, value: tuple[str, tuple] | None):
+        self._local.lastQuery = value
+
     def _getEnumCudaKernelLaunchType(self) -> EnumCudaKernelLaunchType:
         # No-op if already filled
         if not len(self._enumCudaKernelLaunchType):
-            self['ENUM_CUDA_KERNEL_LAUNCH_TYPE'].select(["id", "label", "name"])
-            while (row := self.fetchone()):
-                self._enumCudaKernelLaunchType.setNameToId(row["name"], row["id"])
-                self._enumCudaKernelLaunchType[row["id"]] = row["label"]
+            cur = self._executeSelect('ENUM_CUDA_KERNEL_LAUNCH_TYPE', ["id", "label", "name"])
+            for id, label, name in cur.fetchall():
+                self._enumCudaKernelLaunchType.setNameToId(name, id)
+                self._enumCudaKernelLaunchType[id] = label
+            cur.close()
         return self._enumCudaKernelLaunchType
 
-    def findStringIdsContaining(self, stringlist: list[str]) -> dict[int, str]:
-        # TODO: docstring, for kernels
-        condition = [
-            f"(value LIKE '%{string}%')"
-            for string in stringlist
+    def _getEnumCudaMemcpyOper(self) -> EnumCudaMemcpyOper:
+        # No-op if already filled
+        if not len(self._enumCudaMemcpyOper):
+            cur = self._executeSelect('ENUM_CUDA_MEMCPY_OPER', ["id", "label", "name"])
+            for id, label, name in cur.fetchall():
+                self._enumCudaMemcpyOper.setNameToId(name, id)
+                self._enumCudaMemcpyOper[id] = label
+            cur.close()
+        return self._enumCudaMemcpyOper
+
+    def _executeSelect(
+        self,
+        tablename: str,
+        columns: str | list[str],
+        conditions: list[str] | None = None,
+        params: list | tuple = (),
+        orderBy: list[str] | str | None = None,
+        limit: int | None = None,
+        rowFactory: type | None = None,
+        encloseTableName: bool = True
+    ) -> sqlite3.Cursor:
+        stmt = self._makeSelectStatement(columns, tablename, conditions, orderBy, encloseTableName)
+        if limit is not None:
+            stmt += " limit ?"
+            params = (*params, limit)
+        return self._execute(stmt, params, rowFactory)
+
+    def _execute(
+        self,
+        stmt: str,
+        params: list | tuple = (),
+        rowFactory: type | None = None
+    ) -> sqlite3.Cursor:
+        # Each call gets its own cursor so that an in-progress iteration
+        # is not clobbered by other queries on the shared one
+        cur = self._connection().cursor()
+        cur.row_factory = rowFactory
+        self._lastQuery = (stmt, tuple(params))
+        if self._profiler is None:
+            cur.execute(stmt, params)
+            return cur
+
+        profiler = self._profiler
+        record = QueryRecord(stmt, tuple(params))
+        if profiler.explain:
+            # Plans rarely depend on the parameter values, so one per statement
+            if stmt not in profiler._plans:
+                profiler._plans[stmt] = self.explainQueryPlan(stmt, params)
+            record.plan = profiler._plans[stmt]
+        t0 = time.perf_counter()
+        cur.execute(stmt, params)
+        record.seconds += time.perf_counter() - t0
+        return InstrumentedCursor(cur, record, profiler)
+
+    @staticmethod
+    def _constructing(cur):
+        # Times building objects out of rows fetched from cur, if instrumented
+        return cur.constructing() if isinstance(cur, InstrumentedCursor) else NO_CONSTRUCTION
+
+    @property
+    def profiler(self) -> QueryProfiler | None:
+        return self._profiler
+
+    def enableInstrumentation(
+        self,
+        callback: Callable[[QueryRecord], None] | None = None,
+        explain: bool = True,
+        measureBytes: bool = True
+    ) -> QueryProfiler:
+        """
+        Starts recording every SQL statement executed by this instance.
+
+        Each statement gets a QueryRecord with its wall time (execution and
+        fetching), rows returned, bytes materialized, time spent constructing
+        dataclasses or columnar tables from the rows, and its query plan.
+        Queries answered from a loaded cache (see loadCache()) run no SQL and
+        are not recorded. Instrumentation adds overhead, so leave it off
+        unless investigating.
+
+            profiler = db.enableInstrumentation()
+            ...
+            print(profiler.report())
+
+        Parameters
+        ----------
+        callback : Callable[[QueryRecord], None] | None
+            Called with each record as soon as its query is finished, e.g. to
+            feed other telemetry. Defaults to None.
+
+        explain : bool
+            Record the EXPLAIN QUERY PLAN of each distinct statement, so that
+            full table scans can be reported. Defaults to True.
+
+        measureBytes : bool
+            Record the in-memory size of fetched rows. Defaults to True.
+
+        Returns
+        -------
+        profiler : QueryProfiler
+            Collects the records; also available as the profiler property.
+        """
+        self._profiler = QueryProfiler(callback, explain, measureBytes)
+        return self._profiler
+
+    def disableInstrumentation(self) -> QueryProfiler | None:
+        """
+        Stops recording queries. Returns the profiler with what was recorded.
+        """
+        profiler = self._profiler
+        self._profiler = None
+        return profiler
+
+    @staticmethod
+    def _fetchBatches(cur: sqlite3.Cursor, batchSize: int) -> Iterator[list]:
+        try:
+            while (rows := cur.fetchmany(batchSize)):
+                yield rows
+        finally:
+            cur.close()
+
+    def _selectColumnar(
+        self,
+        tableType: type[ColumnarTable],
+        tablename: str,
+        columns: str | list[str],
+        conditions: list[str] | None = None,
+        params: list | tuple = (),
+        orderBy: list[str] | str | None = None,
+        limit: int | None = None,
+        batchSize: int | None = None,
+        encloseTableName: bool = True
+    ) -> ColumnarTable:
+        # Plain tuples (no sqlite3.Row) are much cheaper to create and transpose,
+        # and only one batch of them is alive at any time
+        cur = self._executeSelect(
+            tablename, columns, conditions, params, orderBy, limit,
+            encloseTableName=encloseTableName
+        )
+        columnNames = [d[0] for d in cur.description]
+        chunks = list()
+        for rows in self._fetchBatches(cur, batchSize or self.DEFAULT_BATCH_SIZE):
+            with self._constructing(cur):
+                chunks.append(tableType.fromRows(columnNames, rows))
+        if len(chunks) == 0:
+            return tableType.empty(columnNames)
+        return tableType.concatenate(chunks)
+
+    def _iterSelect(
+        self,
+        tableType: type[ColumnarTable],
+        tablename: str,
+        conditions: list[str],
+        params: list | tuple,
+        batchSize: int | None,
+        columnar: bool,
+        rowType: type | None = None,
+        orderBy: list[str] | str | None = None,
+        limit: int | None = None
+    ) -> Iterator:
+        # Yields one tableType per batch if columnar, otherwise one rowType
+        # (or sqlite3.Row if rowType is None) per row
+        batchSize = batchSize or self.DEFAULT_BATCH_SIZE
+        if columnar:
+            cur = self._executeSelect(tablename, "rowid, *", conditions, params, orderBy, limit)
+            columnNames = [d[0] for d in cur.description]
+            for rows in self._fetchBatches(cur, batchSize):
+                with self._constructing(cur):
+                    table = tableType.fromRows(columnNames, rows)
+                yield table
+        else:
+            cur = self._executeSelect(
+                tablename, "rowid, *", conditions, params, orderBy, limit, rowFactory=sqlite3.Row)
+            for rows in self._fetchBatches(cur, batchSize):
+                if rowType is not None:
+                    with self._constructing(cur):
+                        rows = [rowType(**row) for row in rows]
+                yield from rows
+
+    def _viaSidecar(self, tablename: str, conditions: list[str]) -> list[str]:
+        # Sidecar indexes cannot cover the main tables directly, so filter on the
+        # narrow indexed mirror and look the matching rowids up in the main table
+        if tablename not in self._sidecarTables:
+            return conditions
+        return [
+            f'rowid in (select id from {indexes.SIDECAR_SCHEMA}."{tablename}" where {" and ".join(conditions)})'
         ]
-        condition = " OR ".join(condition)
-        self['StringIds'].select(
-            ["id", "value"],
-            condition)
-        stringmap = {row['id']: row['value'] for row in self.fetchall()}
+
+    def buildIndexes(self, sidecar: bool | str = False) -> dict[str, bool]:
+        """
+        Makes sure the columns filtered on by the time-range and correlation
+        queries are indexed. nsys does not create these, so otherwise every
+        call is a full table scan. Indexes that already exist (including ones
+        not created by nsyspy) are detected and not rebuilt.
+
+        Parameters
+        ----------
+        sidecar : bool | str
+            If False, the indexes are created in the export itself, which needs
+            write access to it. Otherwise the indexed columns are mirrored into
+            a separate sqlite file that is attached to this connection, leaving
+            the export untouched; pass a path, or True to use
+            <export>.nsyspy-idx.sqlite. A sidecar is only rebuilt if the export
+            has changed since it was made. Defaults to False.
+
+        Returns
+        -------
+        status : dict[str, bool]
+            See indexStatus().
+        """
+        present = sorted({
+            spec.table for spec in indexes.INDEX_SPECS if spec.table in self.tablenames
+        })
+        if not sidecar:
+            if self._pool is not None:
+                raise ValueError("Cannot build indexes in an export opened with readOnly=True; use sidecar=True")
+            for spec in indexes.INDEX_SPECS:
+                if spec.table in present and not indexes.hasIndexFor(self.con, spec):
+                    self.con.execute(spec.createStatement())
+            self.con.commit()
+        else:
+            path = indexes.defaultSidecarPath(self.dbpath) if sidecar is True else sidecar
+            # The sidecar is written through the instance's own connection,
+            # which threads of a readOnly instance share
+            with self._setupLock:
+                attached = [row[1] for row in self.con.execute("pragma database_list").fetchall()]
+                if indexes.SIDECAR_SCHEMA not in attached:
+                    self.con.execute(f"attach database ? as {indexes.SIDECAR_SCHEMA}", (path,))
+                stamp = indexes.sourceStamp(self.dbpath)
+                if not indexes.sidecarIsValid(self.con, stamp, present):
+                    indexes.buildSidecar(self.con, present, stamp)
+            if self._pool is not None:
+                self._pool.attach(path, indexes.SIDECAR_SCHEMA)
+            self._sidecarTables = set(present)
+        return self.indexStatus()
+
+    def indexStatus(self) -> dict[str, bool]:
+        """
+        Reports which of the indexes in indexes.INDEX_SPECS are available,
+        either in the export or in an attached sidecar.
+
+        Returns
+        -------
+        status : dict[str, bool]
+            Key is the index name, value is True if it is available.
+            Tables that do not exist in the export are left out.
+        """
+        return {
+            spec.name: spec.table in self._sidecarTables or indexes.hasIndexFor(self._connection(), spec)
+            for spec in indexes.INDEX_SPECS
+            if spec.table in self.tablenames
+        }
+
+    def explainQueryPlan(self, stmt: str, params: list | tuple = ()) -> list[str]:
+        """
+        Returns the detail lines of EXPLAIN QUERY PLAN for a statement.
+        """
+        return [row[3] for row in self._connection().execute("explain query plan " + stmt, params).fetchall()]
+
+    def lastQueryUsedIndex(self) -> bool:
+        """
+        Reports whether the most recent query issued by one of the query
+        methods was answered without a full table scan.
+        """
+        if self._lastQuery is None:
+            raise ValueError("No query has been made yet")
+        return indexes.usesIndex(self.explainQueryPlan(*self._lastQuery))
+
+    # Tables included in snapshot(), and the StringIds columns they reference
+    _SNAPSHOT_TABLES = {
+        "CUPTI_ACTIVITY_KIND_KERNEL": (KernelTable, ["shortName", "demangledName", "mangledName"]),
+        "CUPTI_ACTIVITY_KIND_RUNTIME": (RuntimeTable, ["nameId"]),
+        "NVTX_EVENTS": (NvtxTable, ["textId"]),
+        "CUPTI_ACTIVITY_KIND_MEMCPY": (MemcpyTable, []),
+        "CUPTI_ACTIVITY_KIND_MEMSET": (MemsetTable, []),
+    }
+
+    def snapshot(self, directory: str | None = None) -> TraceCache:
+        """
+        Writes the kernel, runtime, NVTX, memcpy and memset tables, along with the StringIds
+        entries they reference, to a columnar cache on disk.
+
+        Tables are streamed in batches, so this works for exports larger than
+        memory. Use loadCache(), or the cache argument of the constructor, to
+        serve later columnar queries from the snapshot instead of sqlite.
+
+        Parameters
+        ----------
+        directory : str | None
+            Output directory. Defaults to None, which uses <export>.nsyspy-cache.
+
+        Returns
+        -------
+        cache : TraceCache
+            The written cache.
+        """
+        directory = defaultCachePath(self.dbpath) if directory is None else directory
+        tables = dict()
+        stringIds = set()
+        for name, (tableType, stringColumns) in self._SNAPSHOT_TABLES.items():
+            if name not in self.tablenames:
+                continue
+            cur = self._execute(f'select count(*) from "{name}"')
+            numRows = cur.fetchone()[0]
+            cur.close()
+            tables[name] = (numRows, self._snapshotChunks(name, tableType, stringColumns, stringIds))
+        # The string ids are only known once the chunks have been consumed
+        return TraceCache.write(
+            directory, indexes.sourceStamp(self.dbpath), tables,
+            lambda: self.resolveStrings(stringIds)
+        )
+
+    def _snapshotChunks(self, tablename, tableType, stringColumns, stringIds):
+        cur = self._executeSelect(tablename, "rowid, *")
+        columnNames = [d[0] for d in cur.description]
+        empty = True
+        for rows in self._fetchBatches(cur, self.DEFAULT_BATCH_SIZE):
+            chunk = tableType.fromRows(columnNames, rows)
+            for col in stringColumns:
+                if col in chunk:
+                    stringIds.update(np.unique(chunk[col][~chunk.nullMask(col)]).tolist())
+            empty = False
+            yield chunk
+        if empty:
+            yield tableType.empty(columnNames)
+
+    def loadCache(self, directory: str | None = None) -> bool:
+        """
+        Starts serving columnar queries from a snapshot (see snapshot()),
+        if one exists and was made from the current version of the export.
+
+        Returns
+        -------
+        loaded : bool
+            True if the snapshot was valid and is now in use.
+        """
+        directory = defaultCachePath(self.dbpath) if directory is None else directory
+        if not TraceCache.isValid(directory, indexes.sourceStamp(self.dbpath)):
+            return False
+        self._traceCache = TraceCache(directory)
+        self._cachedTables.clear()
+        return True
+
+    def _cachedTable(self, tablename: str) -> ColumnarTable | None:
+        # Memory mapped table from the snapshot, if one is in use
+        if self._traceCache is None or tablename not in self._traceCache.tablenames:
+            return None
+        if tablename not in self._cachedTables:
+            self._cachedTables[tablename] = self._traceCache.load(
+                tablename, self._SNAPSHOT_TABLES[tablename][0])
+        return self._cachedTables[tablename]
+
+    @staticmethod
+    def _timeRangeMask(table: ColumnarTable, start: float, end: float | None) -> np.ndarray:
+        # Same semantics as _timeRangeConditions(); NULLs never match
+        mask = (table.start >= start) & ~table.nullMask("start")
+        if end is not None:
+            mask &= (table.end <= end) & ~table.nullMask("end")
+        return mask
+
+    @staticmethod
+    def _iterChunks(table: ColumnarTable, batchSize: int | None) -> Iterator[ColumnarTable]:
+        batchSize = batchSize or NsysSqlite.DEFAULT_BATCH_SIZE
+        for i in range(0, len(table), batchSize):
+            yield table[i:i + batchSize]
+
+    @staticmethod
+    def _timeRangeConditions(start: float, end: float | None) -> tuple[list[str], list]:
+        conditions = ["start >= ?"]
+        params = [start]
+        if end is not None:
+            conditions.append("end <= ?")
+            params.append(end)
+        return conditions, params
+
+    def findStringIdsContaining(self, stringlist: list[str]) -> dict[int, str]:
+        """
+        Finds the StringIds entries containing any of the given substrings,
+        e.g. to look up the ids of kernel names.
+
+        Parameters
+        ----------
+        stringlist : list[str]
+            Substrings to search for. Matching is case insensitive for
+            ASCII characters, as with sqlite's LIKE.
+
+        Returns
+        -------
+        stringmap : dict[int, str]
+            Key is the id, value is the full string.
+        """
+        # Bound patterns with escaped wildcards, so names containing quotes,
+        # '%' or '_' are matched literally
+        condition = " OR ".join(["(value LIKE ? ESCAPE '\\')"] * len(stringlist))
+        cur = self._executeSelect(
+            'StringIds', ["id", "value"], [condition], [likePattern(string) for string in stringlist])
+        stringmap = {id: value for id, value in cur.fetchall()}
+        cur.close()
         return stringmap
 
     def findStringMatchingId(self, id: int) -> str:
-        # TODO: docstring, for kernels
-        self['StringIds'].select("value", f"id = {id}")
-        return str(self.fetchone()['value'])
+        """
+        Looks up a single StringIds entry, e.g. a kernel's shortName.
+        Use resolveStrings() or resolveStringColumn() for many ids.
+
+        Parameters
+        ----------
+        id : int
+            The id to look up.
+
+        Returns
+        -------
+        string : str
+            The string. Raises KeyError if there is no such id.
+        """
+        value = self._stringCache.get(id)
+        if value is None:
+            value = self.resolveStrings([id]).get(id)
+            if value is None:
+                raise KeyError(f"No string with id {id} in StringIds")
+        return value
+
+    def resolveStrings(self, ids) -> dict[int, str]:
+        """
+        Looks up many StringIds at once.
+
+        Ids already in the cache are served from it; all remaining ids are
+        fetched together (batched only to respect sqlite's parameter limit)
+        and added to the cache.
+
+        Parameters
+        ----------
+        ids : iterable of int
+            The ids to resolve. Duplicates are fine.
+
+        Returns
+        -------
+        stringmap : dict[int, str]
+            Key is the id, value is the string.
+            Ids not present in StringIds are left out.
+        """
+        stringmap = dict()
+        missing = list()
+        for id in set(int(i) for i in ids):
+            value = self._stringCache.get(id)
+            if value is None:
+                missing.append(id)
+            else:
+                stringmap[id] = value
+
+        if self._traceCache is not None and len(missing) > 0:
+            for id, value in self._traceCache.resolveStrings(missing).items():
+                stringmap[id] = value
+                self._stringCache.put(id, value)
+            missing = [id for id in missing if id not in stringmap]
+
+        for i in range(0, len(missing), self._MAX_PARAMS_PER_QUERY):
+            batch = missing[i:i + self._MAX_PARAMS_PER_QUERY]
+            cur = self._execute(
+                f"select id, value from StringIds where id in ({','.join('?' * len(batch))})",
+                batch
+            )
+            for id, value in cur.fetchall():
+                value = str(value)
+                stringmap[id] = value
+                self._stringCache.put(id, value)
+            cur.close()
+        return stringmap
+
+    def resolveStringColumn(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Vectorized version of findStringMatchingId() for an array of ids,
+        e.g. KernelTable.shortName. Only the unique ids are looked up.
+
+        Parameters
+        ----------
+        ids : np.ndarray
+            Array of StringIds ids.
+
+        Returns
+        -------
+        strings : np.ndarray
+            Object array of the same shape with the resolved strings
+            (None for ids not in StringIds).
+        """
+        uniqueIds, inverse = np.unique(ids, return_inverse=True)
+        stringmap = self.resolveStrings(uniqueIds.tolist())
+        uniqueStrings = np.array(
+            [stringmap.get(id) for id in uniqueIds.tolist()], dtype=object)
+        return uniqueStrings[inverse].reshape(np.shape(ids))
 
     def getKernelsBetween(
         self,
         start: float = 0.0,
-        end: float | None = None
-    ) -> list[CuptiActivityKindKernel]:
-        # TODO: docstring
-        conditions = [f"start >= {start}"]
-        if end is not None:
-            conditions.append(
-                f"end <= {end}"
+        end: float | None = None,
+        columnar: bool = False
+    ) -> list[CuptiActivityKindKernel] | KernelTable:
+        """
+        Retrieves the kernels in a time range.
+
+        Parameters
+        ----------
+        start : float
+            Minimum start time (inclusive). Defaults to 0.
+
+        end : float | None
+            Maximum end time (inclusive). Defaults to None, which has no limit.
+
+        columnar : bool
+            If True, returns a KernelTable instead of a list of
+            CuptiActivityKindKernel. Defaults to False.
+
+        Returns
+        -------
+        kernels : list[CuptiActivityKindKernel] | KernelTable
+            The kernels.
+        """
+        if columnar:
+            if (cached := self._cachedTable('CUPTI_ACTIVITY_KIND_KERNEL')) is not None:
+                return cached[self._timeRangeMask(cached, start, end)]
+            conditions, params = self._timeRangeConditions(start, end)
+            return self._selectColumnar(
+                KernelTable, 'CUPTI_ACTIVITY_KIND_KERNEL', "rowid, *",
+                self._viaSidecar('CUPTI_ACTIVITY_KIND_KERNEL', conditions), params
             )
-        self['CUPTI_ACTIVITY_KIND_KERNEL'].select(
-            "rowid, *", conditions
+        return list(self.iterKernelsBetween(start, end))
+
+    def iterKernelsBetween(
+        self,
+        start: float = 0.0,
+        end: float | None = None,
+        batchSize: int | None = None,
+        columnar: bool = False
+    ) -> Iterator[CuptiActivityKindKernel] | Iterator[KernelTable]:
+        """
+        Generator version of getKernelsBetween().
+
+        Rows are pulled from the database batchSize at a time, so memory use
+        stays flat no matter how many kernels lie in the range.
+
+        Parameters
+        ----------
+        start : float
+            Minimum start time (inclusive). Defaults to 0.
+
+        end : float | None
+            Maximum end time (inclusive). Defaults to None, which has no limit.
+
+        batchSize : int | None
+            Number of rows to fetch at a time. Defaults to DEFAULT_BATCH_SIZE.
+
+        columnar : bool
+            If True, yields one KernelTable per batch instead of
+            one CuptiActivityKindKernel per row. Defaults to False.
+        """
+        if columnar and (cached := self._cachedTable('CUPTI_ACTIVITY_KIND_KERNEL')) is not None:
+            yield from self._iterChunks(cached[self._timeRangeMask(cached, start, end)], batchSize)
+            return
+        conditions, params = self._timeRangeConditions(start, end)
+        yield from self._iterSelect(
+            KernelTable, 'CUPTI_ACTIVITY_KIND_KERNEL',
+            self._viaSidecar('CUPTI_ACTIVITY_KIND_KERNEL', conditions), params, batchSize, columnar,
+            rowType=CuptiActivityKindKernel
         )
-        rows = self.fetchall()
-        # Parse into dataclass
-        kernels = [CuptiActivityKindKernel(**row) for row in rows]
-        return kernels
 
     def getStreams(self, hwId: int | None = None):
         if hwId is None:
-            self['TARGET_INFO_CUDA_STREAM'].select("*")
+            cur = self._executeSelect('TARGET_INFO_CUDA_STREAM', "*", rowFactory=sqlite3.Row)
         else:
-            self['TARGET_INFO_CUDA_STREAM'].select("*", f"hwId = {hwId}")
-        results = [Stream(**row) for row in self.fetchall()]
+            cur = self._executeSelect(
+                'TARGET_INFO_CUDA_STREAM', "*", ["hwId = ?"], [hwId], rowFactory=sqlite3.Row)
+        rows = cur.fetchall()
+        with self._constructing(cur):
+            results = [Stream(**row) for row in rows]
+        cur.close()
         return results
 
     def findStreamTypeString(self, stream: int | Stream) -> str:
@@ -206,55 +1221,252 @@ class NsysSqlite(sew.Database):
             "Non-blocking stream", "Default stream" or "Null stream".
         """
         id = stream if isinstance(stream, int) else stream.flag
-        self["ENUM_CUPTI_STREAM_TYPE"].select("label", f"id={id}")
-        result = str(self.fetchone()['label'])
+        cur = self._executeSelect("ENUM_CUPTI_STREAM_TYPE", "label", ["id = ?"], [id])
+        result = str(cur.fetchone()[0])
+        cur.close()
         return result
 
+    def kernels(self) -> KernelQuery:
+        """
+        Starts a lazy, composable kernel query; see query.KernelQuery.
+
+        Predicates are accumulated and compiled into one parameterized
+        statement, executed only on iteration (dataclasses), toColumns()
+        (a KernelTable) or count().
+
+            db.kernels().named("gemm").between(t0, t1).onStream(7).toColumns()
+        """
+        return KernelQuery(self, "CUPTI_ACTIVITY_KIND_KERNEL", KernelTable, CuptiActivityKindKernel)
+
     def getKernels(
         self,
         viaShortNames: str | list[str] | None = None,
         viaDemangledNames: str | list[str] | None = None,
-        viaMangledNames: str | list[str] | None = None
-    ) -> list[CuptiActivityKindKernel]:
+        viaMangledNames: str | list[str] | None = None,
+        columnar: bool = False
+    ) -> list[CuptiActivityKindKernel] | KernelTable:
         # Try in order
         if viaShortNames is not None:
-            viaShortNames = [viaShortNames] if isinstance(viaShortNames, str) else viaShortNames
-            idstringmap = self.findStringIdsContaining(viaShortNames)
+            names = [viaShortNames] if isinstance(viaShortNames, str) else viaShortNames
             filterColumn = "shortName"
         elif viaDemangledNames is not None:
-            viaDemangledNames = [viaDemangledNames] if isinstance(viaDemangledNames, str) else viaDemangledNames
-            idstringmap = self.findStringIdsContaining(viaDemangledNames)
+            names = [viaDemangledNames] if isinstance(viaDemangledNames, str) else viaDemangledNames
             filterColumn = "demangledName"
         elif viaMangledNames is not None:
-            viaMangledNames = [viaMangledNames] if isinstance(viaMangledNames, str) else viaMangledNames
-            idstringmap = self.findStringIdsContaining(viaMangledNames)
+            names = [viaMangledNames] if isinstance(viaMangledNames, str) else viaMangledNames
             filterColumn = "mangledName"
         else:
             raise ValueError("Must provide at least one of viaShortName, viaDemangledName, viaMangledName")
 
-        self['CUPTI_ACTIVITY_KIND_KERNEL'].select(
-            "rowid, *",
-            [str(Condition(filterColumn).IN([str(i) for i in idstringmap]))]
+        if columnar and (cached := self._cachedTable('CUPTI_ACTIVITY_KIND_KERNEL')) is not None:
+            idstringmap = self.findStringIdsContaining(names)
+            return cached[np.isin(cached[filterColumn], list(idstringmap))]
+        query = self.kernels().named(*names, column=filterColumn)
+        return query.toColumns() if columnar else list(query)
+
+    def getKernelsAfter(
+        self,
+        kernel: CuptiActivityKindKernel,
+        count: int = 1,
+        columnar: bool = False
+    ) -> list[CuptiActivityKindKernel] | KernelTable:
+        """
+        Retrieves the next kernels after a given kernel, in table (rowid) order.
+        May return fewer than count kernels if the end of the table is reached.
+        """
+        # Keyset pagination: rowid is the primary key, so this is an index seek
+        conditions = ["rowid > ?"]
+        params = [kernel.rowid]
+        if columnar:
+            return self._selectColumnar(
+                KernelTable, "CUPTI_ACTIVITY_KIND_KERNEL", "rowid, *",
+                conditions, params, orderBy="rowid", limit=count
+            )
+        cur = self._executeSelect(
+            "CUPTI_ACTIVITY_KIND_KERNEL", "rowid, *",
+            conditions, params, orderBy="rowid", limit=count, rowFactory=sqlite3.Row
         )
+        rows = cur.fetchall()
+        with self._constructing(cur):
+            r = [CuptiActivityKindKernel(**row) for row in rows]
+        cur.close()
+        return r
 
-        rows = self.fetchall()
-        # Parse into dataclass
-        kernels = [CuptiActivityKindKernel(**row) for row in rows]
-        return kernels
+    _SUMMARY_NAME_COLUMNS = ("shortName", "demangledName", "mangledName")
+    _LAUNCH_CONFIG_COLUMNS = ["gridX", "gridY", "gridZ", "blockX", "blockY", "blockZ"]
+
+    def kernelSummary(
+        self,
+        groupBy: str = "shortName",
+        byDevice: bool = False,
+        byStream: bool = False,
+        byLaunchConfig: bool = False,
+        start: float = 0.0,
+        end: float | None = None,
+        percentiles: list[float] | tuple[float, ...] = (50, 90, 99),
+        numBins: int = 1024
+    ) -> ColumnarTable:
+        """
+        Per kernel duration statistics, like the cuda_gpu_kern_sum report of nsys stats.
+
+        All grouping happens inside sqlite, so memory use depends on the number
+        of groups and not on the number of kernels. Count, total, min, max, mean
+        and standard deviation are exact. Percentiles are estimated from a
+        numBins bucket histogram of each group's duration range, built while
+        joining every kernel back to its group; their error is at most
+        (max - min) / numBins.
+
+        Parameters
+        ----------
+        groupBy : str
+            Name column to group by; one of 'shortName', 'demangledName' or
+            'mangledName'. Defaults to 'shortName'.
+
+        byDevice : bool
+            Also group by deviceId. Defaults to False.
+
+        byStream : bool
+            Also group by streamId. Defaults to False.
+
+        byLaunchConfig : bool
+            Also group by grid and block dimensions. Defaults to False.
+
+        start : float
+            Only kernels starting at or after this time. Defaults to 0.0.
+
+        end : float | None
+            Only kernels ending at or before this time. Defaults to None.
+
+        percentiles : list[float] | tuple[float, ...]
+            Percentiles of duration to estimate, from 0 to 100; each becomes a
+            column named e.g. 'p50'. Defaults to (50, 90, 99).
+
+        numBins : int
+            Histogram resolution per group. Defaults to 1024.
+
+        Returns
+        -------
+        summary : ColumnarTable
+            One row per group, by descending total duration. Columns are the
+            group keys (groupBy holds the StringIds id), 'name' (the resolved
+            string), count, total, min, max, mean, stddev (sample) and the
+            percentiles. Kernels with a NULL key form their own group; the
+            key's null mask marks it.
+        """
+        if groupBy not in self._SUMMARY_NAME_COLUMNS:
+            raise ValueError(f"groupBy must be one of {self._SUMMARY_NAME_COLUMNS}, not {groupBy!r}")
+        keys = [groupBy]
+        if byDevice:
+            keys.append("deviceId")
+        if byStream:
+            keys.append("streamId")
+        if byLaunchConfig:
+            keys.extend(self._LAUNCH_CONFIG_COLUMNS)
+        keyList = ", ".join(keys)
 
-    def getKernelsAfter(self, kernel: CuptiActivityKindKernel, count: int = 1) -> list[CuptiActivityKindKernel]:
-        self["CUPTI_ACTIVITY_KIND_KERNEL"].select(
-            "rowid, *",
-            [f"rowid > {kernel.rowid}"]
+        conditions, params = self._timeRangeConditions(start, end)
+        where = " and ".join(f"k.{c}" for c in conditions)
+        # Each key is kept as (value or 0, is null), so kernels can be joined
+        # back to their group on plain equality, which sqlite answers from an
+        # automatic index on the groups
+        groupKeys = ", ".join(f"g.{key}_v, g.{key}_n" for key in keys)
+        groups = (
+            f"select {', '.join(f'coalesce(k.{key}, 0) as {key}_v, k.{key} is null as {key}_n' for key in keys)}, "
+            "count(*) as count, sum(k.end - k.start) as total, min(k.end - k.start) as lo, "
+            "max(k.end - k.start) as hi, avg(k.end - k.start) as mean "
+            f'from "CUPTI_ACTIVITY_KIND_KERNEL" k where {where} group by {keyList}'
         )
-        # sew has no support for LIMIT yet so we just iterate until we reach it
-        r = list()
-        for _ in range(count):
-            r.append(CuptiActivityKindKernel(**self.fetchone()))
-        return r
+        join = " and ".join(f"g.{key}_v = coalesce(k.{key}, 0) and g.{key}_n = (k.{key} is null)" for key in keys)
+
+        # A single statement, so the groups are aggregated once: every kernel
+        # is joined back to its group (the cross join keeps the kernels as the
+        # outer loop, i.e. one index lookup per kernel) to build per group
+        # duration histograms, plus the squared deviations from the (now
+        # known) mean for a stable stddev. Group columns repeat on each of
+        # their bucket rows
+        cur = self._execute(
+            f"with g as ({groups}) select {groupKeys}, g.count, g.total, g.lo, g.hi, g.mean, "
+            "((k.end - k.start - g.lo) * ?) / (g.hi - g.lo + 1) as bucket, count(*), "
+            "total((k.end - k.start - g.mean) * (k.end - k.start - g.mean)) "
+            f'from "CUPTI_ACTIVITY_KIND_KERNEL" k cross join g on {join} '
+            f"where {where} group by {groupKeys}, bucket order by {groupKeys}, bucket",
+            (*params, numBins, *params)
+        )
+        rows = cur.fetchall()
+        cur.close()
+        numKeyColumns = 2 * len(keys)
+        values = list(zip(*rows)) if len(rows) > 0 else [()] * (numKeyColumns + 8)
+        keyValues = np.array(values[:numKeyColumns], dtype=np.int64).reshape(numKeyColumns, len(rows))
+        stats = dict(zip(
+            ["count", "total", "min", "max", "mean", "bucket", "bucketCount", "sumSquares"],
+            values[numKeyColumns:]
+        ))
+
+        # Rows come sorted by key, so each group starts where a key changes.
+        # Groups are then numbered by descending total, ties broken on the
+        # keys (NULL first, as sqlite sorts them)
+        newGroup = np.ones(len(rows), dtype=bool)
+        newGroup[1:] = np.any(keyValues[:, 1:] != keyValues[:, :-1], axis=0)
+        first = np.flatnonzero(newGroup)
+        total = np.array(stats["total"], dtype=np.int64)[first]
+        sortKeys = list()
+        for i in reversed(range(len(keys))):
+            sortKeys.extend([keyValues[2 * i, first], -keyValues[2 * i + 1, first]])
+        order = np.lexsort((*sortKeys, -total))
+        rank = np.empty(len(first), dtype=np.int64)
+        rank[order] = np.arange(len(first))
+        bucketGroups = rank[np.cumsum(newGroup) - 1]
+        numGroups = len(first)
+        rowOfGroup = first[order]
 
-    def getCudaApiCallFor(self, target):
-        #TODO: make dataclass
+        # Keys can be NULL, e.g. launch configuration columns of some exports
+        columns = dict()
+        keyMasks = dict()
+        for i, key in enumerate(keys):
+            columns[key] = keyValues[2 * i, rowOfGroup]
+            mask = keyValues[2 * i + 1, rowOfGroup].astype(bool)
+            if np.any(mask):
+                keyMasks[key] = mask
+        columns["name"] = self.resolveStringColumn(columns[groupBy])
+        if groupBy in keyMasks:
+            columns["name"][keyMasks[groupBy]] = None
+
+        count = np.array(stats["count"], dtype=np.int64)[rowOfGroup]
+        sumSquares = np.bincount(
+            bucketGroups, weights=np.array(stats["sumSquares"], dtype=np.float64), minlength=numGroups)
+        columns.update({
+            "count": count,
+            "total": total[order],
+            "min": np.array(stats["min"], dtype=np.int64)[rowOfGroup],
+            "max": np.array(stats["max"], dtype=np.int64)[rowOfGroup],
+            "mean": np.array(stats["mean"], dtype=np.float64)[rowOfGroup],
+            "stddev": np.sqrt(sumSquares / np.maximum(count - 1, 1)),
+        })
+        estimates = histogramPercentiles(
+            bucketGroups, np.array(stats["bucket"], dtype=np.int64),
+            np.array(stats["bucketCount"], dtype=np.int64),
+            columns["min"], columns["max"], numBins, percentiles
+        )
+        for j, q in enumerate(percentiles):
+            columns[f"p{q:g}"] = estimates[:, j]
+        return ColumnarTable(columns, keyMasks)
+
+    def getCudaApiCallFor(self, target) -> list[CuptiActivityKindRuntime]:
+        """
+        Retrieves the runtime API call(s) that launched a kernel.
+
+        Parameters
+        ----------
+        target : int | CuptiActivityKindKernel
+            The kernel, or its correlationId.
+
+        Returns
+        -------
+        apicalls : list[CuptiActivityKindRuntime]
+            Usually a single call; correlationIds are only unique per process,
+            so traces of several processes may return more.
+            Use getKernelLaunchesBetween() for many kernels at once.
+        """
         if isinstance(target, int):
             correlationId = target
 
@@ -264,52 +1476,390 @@ class NsysSqlite(sew.Database):
         else:
             raise TypeError("Must be int or CuptiActivityKindKernel (for now)")
 
-        self["CUPTI_ACTIVITY_KIND_RUNTIME"].select(
-            "rowid, *",
-            [f"correlationId={correlationId}"]
-        )
+        return list(self._selectColumnar(
+            RuntimeTable, "CUPTI_ACTIVITY_KIND_RUNTIME", "rowid, *",
+            self._viaSidecar("CUPTI_ACTIVITY_KIND_RUNTIME", ["correlationId = ?"]),
+            [correlationId]
+        ))
 
-        apicalls = self.fetchall()
+    def getCudaApiCallsBetween(
+        self,
+        start: float = 0.0,
+        end: float | None = None,
+        columnar: bool = False
+    ) -> list[CuptiActivityKindRuntime] | RuntimeTable:
+        """
+        Retrieves the CUDA runtime API calls in a time range.
 
-        return apicalls
+        Parameters
+        ----------
+        start : float
+            Minimum start time (inclusive). Defaults to 0.
 
-    def getCudaApiCallsBetween(self, start: float = 0.0, end: float | None = None):
-        #TODO: make dataclass
-        conditions = [f"start >= {start}"]
-        if end is not None:
-            conditions.append(
-                f"end <= {end}"
+        end : float | None
+            Maximum end time (inclusive). Defaults to None, which has no limit.
+
+        columnar : bool
+            If True, returns a RuntimeTable instead of a list of
+            CuptiActivityKindRuntime. Defaults to False.
+
+        Returns
+        -------
+        apicalls : list[CuptiActivityKindRuntime] | RuntimeTable
+            The runtime API calls.
+        """
+        if columnar:
+            if (cached := self._cachedTable("CUPTI_ACTIVITY_KIND_RUNTIME")) is not None:
+                return cached[self._timeRangeMask(cached, start, end)]
+            conditions, params = self._timeRangeConditions(start, end)
+            return self._selectColumnar(
+                RuntimeTable, "CUPTI_ACTIVITY_KIND_RUNTIME", "rowid, *",
+                self._viaSidecar("CUPTI_ACTIVITY_KIND_RUNTIME", conditions), params
             )
-        self["CUPTI_ACTIVITY_KIND_RUNTIME"].select(
-            "rowid, *", conditions
+        return list(self.iterCudaApiCallsBetween(start, end))
+
+    def iterCudaApiCallsBetween(
+        self,
+        start: float = 0.0,
+        end: float | None = None,
+        batchSize: int | None = None,
+        columnar: bool = False
+    ) -> Iterator[CuptiActivityKindRuntime] | Iterator[RuntimeTable]:
+        """
+        Generator version of getCudaApiCallsBetween().
+        See iterKernelsBetween() for details.
+
+        Yields one CuptiActivityKindRuntime per row,
+        or one RuntimeTable per batch if columnar is True.
+        """
+        if columnar and (cached := self._cachedTable("CUPTI_ACTIVITY_KIND_RUNTIME")) is not None:
+            yield from self._iterChunks(cached[self._timeRangeMask(cached, start, end)], batchSize)
+            return
+        conditions, params = self._timeRangeConditions(start, end)
+        for item in self._iterSelect(
+            RuntimeTable, "CUPTI_ACTIVITY_KIND_RUNTIME",
+            self._viaSidecar("CUPTI_ACTIVITY_KIND_RUNTIME", conditions), params, batchSize, columnar
+        ):
+            yield item if columnar else CuptiActivityKindRuntime(**item)
+
+    def getKernelsFromApiCalls(self, rows, columnar: bool = False):
+        if isinstance(rows, RuntimeTable):
+            correlationIds = rows.correlationId.tolist()
+        else:
+            correlationIds = [
+                row.correlationId if isinstance(row, CuptiActivityKindRuntime) else row['correlationId']
+                for row in rows
+            ]
+        if columnar and (cached := self._cachedTable("CUPTI_ACTIVITY_KIND_KERNEL")) is not None:
+            return cached[np.isin(cached.correlationId, correlationIds)]
+        # Bound ids, in as few statements as the parameter limit allows
+        parts = list()
+        for i in range(0, len(correlationIds), self._MAX_PARAMS_PER_QUERY):
+            batch = correlationIds[i:i + self._MAX_PARAMS_PER_QUERY]
+            query = self.kernels().withCorrelationIds(*batch)
+            parts.append(query.toColumns() if columnar else list(query))
+        if columnar:
+            return KernelTable.concatenate(parts) if parts else self.kernels().limit(0).toColumns()
+        return [kernel for part in parts for kernel in part]
+
+    def getNvtxBetween(
+        self,
+        start: float = 0.0,
+        end: float | None = None,
+        columnar: bool = False
+    ) -> list[NvtxEvent] | NvtxTable:
+        if columnar:
+            self._requireNvtxTable()
+            if (cached := self._cachedTable("NVTX_EVENTS")) is not None:
+                return cached[self._timeRangeMask(cached, start, end)]
+            conditions, params = self._timeRangeConditions(start, end)
+            return self._selectColumnar(
+                NvtxTable, "NVTX_EVENTS", "rowid, *",
+                self._viaSidecar("NVTX_EVENTS", conditions), params
+            )
+        return list(self.iterNvtxBetween(start, end))
+
+    def iterNvtxBetween(
+        self,
+        start: float = 0.0,
+        end: float | None = None,
+        batchSize: int | None = None,
+        columnar: bool = False
+    ) -> Iterator[NvtxEvent] | Iterator[NvtxTable]:
+        """
+        Generator version of getNvtxBetween().
+        See iterKernelsBetween() for details.
+        """
+        self._requireNvtxTable()
+        if columnar and (cached := self._cachedTable("NVTX_EVENTS")) is not None:
+            yield from self._iterChunks(cached[self._timeRangeMask(cached, start, end)], batchSize)
+            return
+        conditions, params = self._timeRangeConditions(start, end)
+        yield from self._iterSelect(
+            NvtxTable, "NVTX_EVENTS",
+            self._viaSidecar("NVTX_EVENTS", conditions), params, batchSize, columnar,
+            rowType=NvtxEvent
         )
-        apicalls = self.fetchall()
-        return apicalls
 
-    def getKernelsFromApiCalls(self, rows):
-        self["CUPTI_ACTIVITY_KIND_KERNEL"].select(
-            "rowid, *",
-            [str(Condition("correlationId").IN([str(row['correlationId']) for row in rows]))]
+    def getMemcpyBetween(
+        self,
+        start: float = 0.0,
+        end: float | None = None,
+        columnar: bool = False
+    ) -> list[CuptiActivityKindMemcpy] | MemcpyTable:
+        """
+        Retrieves the memory copies in a time range.
+        See getKernelsBetween() for the time range semantics.
+        """
+        if columnar:
+            self._requireTable("CUPTI_ACTIVITY_KIND_MEMCPY")
+            if (cached := self._cachedTable("CUPTI_ACTIVITY_KIND_MEMCPY")) is not None:
+                return cached[self._timeRangeMask(cached, start, end)]
+            conditions, params = self._timeRangeConditions(start, end)
+            return self._selectColumnar(
+                MemcpyTable, "CUPTI_ACTIVITY_KIND_MEMCPY", "rowid, *",
+                self._viaSidecar("CUPTI_ACTIVITY_KIND_MEMCPY", conditions), params
+            )
+        return list(self.iterMemcpyBetween(start, end))
+
+    def iterMemcpyBetween(
+        self,
+        start: float = 0.0,
+        end: float | None = None,
+        batchSize: int | None = None,
+        columnar: bool = False
+    ) -> Iterator[CuptiActivityKindMemcpy] | Iterator[MemcpyTable]:
+        """
+        Generator version of getMemcpyBetween().
+        See iterKernelsBetween() for details.
+        """
+        yield from self._iterTransfers(
+            "CUPTI_ACTIVITY_KIND_MEMCPY", MemcpyTable, CuptiActivityKindMemcpy, start, end, batchSize, columnar)
+
+    def getMemsetBetween(
+        self,
+        start: float = 0.0,
+        end: float | None = None,
+        columnar: bool = False
+    ) -> list[CuptiActivityKindMemset] | MemsetTable:
+        """
+        Retrieves the memsets in a time range.
+        See getKernelsBetween() for the time range semantics.
+        """
+        if columnar:
+            self._requireTable("CUPTI_ACTIVITY_KIND_MEMSET")
+            if (cached := self._cachedTable("CUPTI_ACTIVITY_KIND_MEMSET")) is not None:
+                return cached[self._timeRangeMask(cached, start, end)]
+            conditions, params = self._timeRangeConditions(start, end)
+            return self._selectColumnar(
+                MemsetTable, "CUPTI_ACTIVITY_KIND_MEMSET", "rowid, *",
+                self._viaSidecar("CUPTI_ACTIVITY_KIND_MEMSET", conditions), params
+            )
+        return list(self.iterMemsetBetween(start, end))
+
+    def iterMemsetBetween(
+        self,
+        start: float = 0.0,
+        end: float | None = None,
+        batchSize: int | None = None,
+        columnar: bool = False
+    ) -> Iterator[CuptiActivityKindMemset] | Iterator[MemsetTable]:
+        """
+        Generator version of getMemsetBetween().
+        See iterKernelsBetween() for details.
+        """
+        yield from self._iterTransfers(
+            "CUPTI_ACTIVITY_KIND_MEMSET", MemsetTable, CuptiActivityKindMemset, start, end, batchSize, columnar)
+
+    def _iterTransfers(self, tablename, tableType, rowType, start, end, batchSize, columnar):
+        self._requireTable(tablename)
+        if columnar and (cached := self._cachedTable(tablename)) is not None:
+            yield from self._iterChunks(cached[self._timeRangeMask(cached, start, end)], batchSize)
+            return
+        conditions, params = self._timeRangeConditions(start, end)
+        yield from self._iterSelect(
+            tableType, tablename,
+            self._viaSidecar(tablename, conditions), params, batchSize, columnar,
+            rowType=rowType
         )
-        kernels = [CuptiActivityKindKernel(**row) for row in self.fetchall()]
-        return kernels
 
-    def getNvtxBetween(self, start: float = 0.0, end: float | None = None) -> list[NvtxEvent]:
-        conditions = [f"start >= {start}"]
+    def getKernelLaunchesBetween(self, start: float = 0.0, end: float | None = None) -> LaunchTable:
+        """
+        Retrieves the kernels whose launching runtime API call lies in a time range.
+
+        This is a single join of CUPTI_ACTIVITY_KIND_KERNEL against
+        CUPTI_ACTIVITY_KIND_RUNTIME on correlationId (within the same process),
+        instead of one getCudaApiCallFor() query per kernel. Use it to find
+        launch bound code, e.g.
+
+            launches = db.getKernelLaunchesBetween()
+            launches.summarize("launchOverhead", by="apiGlobalTid")
+            launches.summarize("queueDelay", by="shortName", db=db)
+
+        Returns
+        -------
+        kernels : LaunchTable
+            The kernels, with the extra columns apiStart, apiEnd, apiGlobalTid
+            and apiNameId taken from the launching runtime call. As in any
+            join, a kernel whose (process, correlationId) matches several
+            runtime calls appears once per call, with or without the cache.
+        """
+        kernels = self._cachedTable("CUPTI_ACTIVITY_KIND_KERNEL")
+        runtime = self._cachedTable("CUPTI_ACTIVITY_KIND_RUNTIME")
+        if kernels is not None and runtime is not None:
+            return _joinLaunches(kernels, runtime[self._timeRangeMask(runtime, start, end)])
+        conditions = ["r.start >= ?"]
+        params = [start]
         if end is not None:
-            conditions.append(
-                f"end <= {end}"
-            )
-        try:
-            self['NVTX_EVENTS'].select(
-                "rowid, *", conditions
+            conditions.append("r.end <= ?")
+            params.append(end)
+        return self._selectColumnar(
+            LaunchTable,
+            '"CUPTI_ACTIVITY_KIND_KERNEL" k join "CUPTI_ACTIVITY_KIND_RUNTIME" r '
+            'on r.correlationId = k.correlationId and (r.globalTid >> 24) = (k.globalPid >> 24)',
+            "k.rowid as rowid, k.*, r.start as apiStart, r.end as apiEnd, "
+            "r.globalTid as apiGlobalTid, r.nameId as apiNameId",
+            conditions, params,
+            encloseTableName=False
+        )
+
+    def projectNvtxToKernels(self, nvtxEvents: list[NvtxEvent] | NvtxTable) -> NvtxProjection:
+        """
+        Maps many NVTX ranges to the GPU kernels launched inside them at once.
+
+        A kernel belongs to a range if its launching runtime call starts and ends
+        within the range, on the same thread (globalTid) that pushed the range.
+        All launches in the overall time span are read with a single join, then
+        matched to the ranges with a sort-merge sweep, instead of two queries per
+        range as in NvtxEvent.getProjection().
+
+        Parameters
+        ----------
+        nvtxEvents : list[NvtxEvent] | NvtxTable
+            The ranges, e.g. from getNvtxBetween().
+
+        Returns
+        -------
+        projection : NvtxProjection
+            Per-range kernel sets, along with the GPU start, end and busy time
+            (union of kernel intervals) of each range.
+        """
+        if not isinstance(nvtxEvents, NvtxTable):
+            nvtxEvents = NvtxTable.fromRecords(nvtxEvents)
+        valid = ~nvtxEvents.nullMask("end")
+        if np.any(valid):
+            launches = self.getKernelLaunchesBetween(
+                int(np.min(nvtxEvents.start[valid])), int(np.max(nvtxEvents.end[valid]))
             )
-            rows = self.fetchall()
-            # Parse into dataclass
-            nvtx = [NvtxEvent(**row) for row in rows]
-            return nvtx
+        else:
+            launches = self.getKernelLaunchesBetween(0, -1)
+        return projectRanges(nvtxEvents, launches)
+
+    def getNvtxTree(self, start: float = 0.0, end: float | None = None, gpu: bool = True) -> NvtxTree:
+        """
+        Builds the push/pop nesting tree of the NVTX ranges in a time range,
+        indexed for stabbing queries, e.g.
+
+            tree = db.getNvtxTree()
+            tree.summarize(db) # inclusive/exclusive CPU and GPU time per name
+            launches = tree.launches
+            query, ranges = tree.enclosing(launches.apiStart, launches.apiGlobalTid)
+
+        Only ranges lying entirely inside the time range are included (as in
+        getNvtxBetween()), so ranges enclosing the whole window are left out.
+
+        Parameters
+        ----------
+        start : float
+            Minimum start time (inclusive). Defaults to 0.
+
+        end : float | None
+            Maximum end time (inclusive). Defaults to None, which has no limit.
+
+        gpu : bool
+            Also reads the kernel launches of the time range, to compute the
+            GPU time of each range. Defaults to True.
+
+        Returns
+        -------
+        tree : NvtxTree
+            See nvtxtree.NvtxTree.
+        """
+        nvtx = self.getNvtxBetween(start, end, columnar=True)
+        launches = self.getKernelLaunchesBetween(start, end) if gpu else None
+        return buildNvtxTree(nvtx, launches)
+
+    def getDependencyGraph(self, start: float = 0.0, end: float | None = None) -> DependencyGraph:
+        """
+        Builds the dependency DAG of the kernels and CUDA runtime calls in a
+        time range (see criticalpath.buildDependencyGraph()), e.g.
+
+            graph = db.getDependencyGraph()
+            path = criticalpath.analyzeCriticalPath(graph)
+            path.summarize(db) # which kernels bound the end to end time
+
+        Parameters
+        ----------
+        start : float
+            Minimum start time (inclusive). Defaults to 0.
+
+        end : float | None
+            Maximum end time (inclusive). Defaults to None, which has no limit.
+
+        Returns
+        -------
+        graph : DependencyGraph
+            See criticalpath.DependencyGraph.
+        """
+        kernels = self.getKernelsBetween(start, end, columnar=True)
+        runtime = self.getCudaApiCallsBetween(start, end, columnar=True)
+        apiNames = self.resolveStrings(np.unique(runtime.nameId).tolist())
+        return buildDependencyGraph(kernels, runtime, apiNames)
+
+    def _requireNvtxTable(self):
+        if "NVTX_EVENTS" not in self.tablenames:
+            raise KeyError("Could not find table: 'NVTX_EVENTS'; it is likely there are no NVTX events profiled.")
+
+    def _requireTable(self, tablename: str):
+        if tablename not in self.tablenames:
+            raise KeyError(f"Could not find table: '{tablename}'; it is likely none were profiled.")
+
 
-        except KeyError as e:
-            raise KeyError(f"Could not find table: {e}; it is likely there are no NVTX events profiled.")
+def _joinLaunches(kernels: KernelTable, runtime: RuntimeTable) -> LaunchTable:
+    # NumPy equivalent of the join in NsysSqlite.getKernelLaunchesBetween():
+    # match kernels to runtime calls on (process, correlationId). Like the
+    # SQL join, a kernel matching several calls gets one row per call
+    valid = ~runtime.nullMask("correlationId") & ~runtime.nullMask("globalTid")
+    rPid = runtime.globalTid[valid] >> 24
+    rCorr = runtime.correlationId[valid]
+    rIndex = np.flatnonzero(valid)
+    kPid = kernels.globalPid >> 24
+    kValid = ~kernels.nullMask("correlationId") & ~kernels.nullMask("globalPid")
 
+    kernelIdx = list()
+    runtimeIdx = list()
+    for pid in np.unique(rPid).tolist():
+        r = rPid == pid
+        order = np.argsort(rCorr[r], kind="stable")
+        corr = rCorr[r][order]
+        k = np.flatnonzero((kPid == pid) & kValid)
+        lo = np.searchsorted(corr, kernels.correlationId[k], side="left")
+        matches = np.searchsorted(corr, kernels.correlationId[k], side="right") - lo
+        # Expand each kernel into its run of equal correlationIds, in rowid order
+        first = np.repeat(np.cumsum(matches) - matches, matches)
+        pos = np.repeat(lo, matches) + np.arange(len(first)) - first
+        kernelIdx.append(np.repeat(k, matches))
+        runtimeIdx.append(rIndex[r][order][pos])
 
+    kernelIdx = np.concatenate(kernelIdx) if kernelIdx else np.zeros(0, dtype=np.int64)
+    runtimeIdx = np.concatenate(runtimeIdx) if runtimeIdx else np.zeros(0, dtype=np.int64)
+    order = np.argsort(kernelIdx, kind="stable")
+    kernelIdx = kernelIdx[order]
+    runtimeIdx = runtimeIdx[order]
+    matched = kernels[kernelIdx]
+    launches = LaunchTable(dict(matched.columns), dict(matched.nullMasks))
+    launches.columns["apiStart"] = runtime.start[runtimeIdx]
+    launches.columns["apiEnd"] = runtime.end[runtimeIdx]
+    launches.columns["apiGlobalTid"] = runtime.globalTid[runtimeIdx]
+    launches.columns["apiNameId"] = runtime.nameId[runtimeIdx]
+    return launches
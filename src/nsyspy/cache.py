@@ -0,0 +1,262 @@
+from __future__ import annotations
+import json
+import os
+import shutil
+from collections.abc import Callable, Iterable
+
+import numpy as np
+
+from .columnar import ColumnarTable
+
+CACHE_VERSION = 1
+
+# Type of each entry of a stored object column
+_NONE, _STR, _BYTES, _INT, _FLOAT = range(5)
+
+def defaultCachePath(dbpath: str) -> str:
+    return os.path.splitext(dbpath)[0] + ".nsyspy-cache"
+
+class TraceCache:
+    """
+    Compact on-disk snapshot of parsed trace tables.
+
+    Each table is a directory of .npy files, one per column (plus one per null
+    mask), so numeric columns can be memory mapped straight back into a
+    ColumnarTable without parsing or copying. Object columns (e.g. NVTX text)
+    are stored as one byte buffer with offsets plus the type of each entry
+    (None, str, bytes, or a number sqlite's dynamic typing put there), and
+    are decoded eagerly. The referenced StringIds are stored as a sorted id
+    array plus one UTF-8 buffer with offsets, also memory mapped. Nothing is
+    pickled, so a cache never runs code when loaded and does not depend on
+    the numpy version that wrote it.
+
+    Layout:
+        <directory>/meta.json
+        <directory>/<table>/<column>.npy
+        <directory>/<table>/<column>.null.npy
+        <directory>/<table>/<column>.{kinds,offsets,data}.npy (object columns)
+        <directory>/StringIds/{ids,offsets,data}.npy
+    """
+    def __init__(self, directory: str):
+        self._directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            self._meta = json.load(f)
+        self._strings = None
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    @property
+    def source(self) -> str:
+        return self._meta["source"]
+
+    @property
+    def tablenames(self) -> list[str]:
+        return list(self._meta["tables"].keys())
+
+    @staticmethod
+    def isValid(directory: str, source: str) -> bool:
+        """
+        True if a cache exists at directory and was made from the given source stamp.
+        """
+        try:
+            with open(os.path.join(directory, "meta.json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return meta.get("version") == CACHE_VERSION and meta.get("source") == source
+
+    @staticmethod
+    def write(
+        directory: str,
+        source: str,
+        tables: dict[str, tuple[int, Iterable[ColumnarTable]]],
+        strings: Callable[[], dict[int, str]]
+    ) -> TraceCache:
+        """
+        Writes a new cache, replacing any existing one at directory.
+
+        Parameters
+        ----------
+        directory : str
+            Output directory.
+
+        source : str
+            Stamp of the source database, used to invalidate the cache later.
+
+        tables : dict[str, tuple[int, Iterable[ColumnarTable]]]
+            Key is the table name; value is the total number of rows and an
+            iterable of chunks (so a table never has to be in memory at once).
+
+        strings : Callable[[], dict[int, str]]
+            Returns the StringIds entries to include. Called after all tables
+            have been written, so it may depend on what was read from them.
+
+        Returns
+        -------
+        cache : TraceCache
+            The newly written cache.
+        """
+        # Write next to the destination and swap in at the end, so that a
+        # crash never leaves a half-written cache that looks valid
+        tmp = directory + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        meta = {"version": CACHE_VERSION, "source": source, "tables": dict()}
+        for name, (numRows, chunks) in tables.items():
+            meta["tables"][name] = TraceCache._writeTable(os.path.join(tmp, name), numRows, chunks)
+
+        os.makedirs(os.path.join(tmp, "StringIds"))
+        strings = strings()
+        ids = np.array(sorted(strings), dtype=np.int64)
+        offsets, data = _packBytes([strings[i].encode("utf-8") for i in ids.tolist()])
+        np.save(os.path.join(tmp, "StringIds", "ids.npy"), ids)
+        np.save(os.path.join(tmp, "StringIds", "offsets.npy"), offsets)
+        np.save(os.path.join(tmp, "StringIds", "data.npy"), data)
+
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp, directory)
+        return TraceCache(directory)
+
+    @staticmethod
+    def _writeTable(directory: str, numRows: int, chunks: Iterable[ColumnarTable]) -> dict:
+        os.makedirs(directory)
+        columns = dict()
+        objects = dict()
+        masks = dict()
+        names = None
+        written = 0
+        for chunk in chunks:
+            if names is None:
+                names = chunk.columnNames
+                for name in names:
+                    col = chunk[name]
+                    if col.dtype == object:
+                        objects[name] = list()
+                    else:
+                        columns[name] = np.lib.format.open_memmap(
+                            os.path.join(directory, f"{name}.npy"), mode="w+",
+                            dtype=col.dtype, shape=(numRows,))
+            n = len(chunk)
+            for name in names:
+                if name in objects:
+                    objects[name].extend(chunk[name].tolist())
+                else:
+                    columns[name][written:written + n] = chunk[name]
+                if name in chunk.nullMasks:
+                    if name not in masks:
+                        # New files are zero (i.e. not NULL) filled
+                        masks[name] = np.lib.format.open_memmap(
+                            os.path.join(directory, f"{name}.null.npy"), mode="w+",
+                            dtype=bool, shape=(numRows,))
+                    masks[name][written:written + n] = chunk.nullMasks[name]
+            written += n
+
+        if written != numRows:
+            raise ValueError(f"Expected {numRows} rows but got {written}")
+        for name, values in objects.items():
+            kinds, encoded = _encodeObjects(values)
+            offsets, data = _packBytes(encoded)
+            np.save(os.path.join(directory, f"{name}.kinds.npy"), kinds)
+            np.save(os.path.join(directory, f"{name}.offsets.npy"), offsets)
+            np.save(os.path.join(directory, f"{name}.data.npy"), data)
+        for arr in list(columns.values()) + list(masks.values()):
+            arr.flush()
+        return {
+            "columns": names or [],
+            "objects": list(objects),
+            "nullable": list(masks),
+            "rows": numRows,
+        }
+
+    def load(self, tablename: str, tableType: type[ColumnarTable]) -> ColumnarTable:
+        """
+        Loads a table, memory mapping all numeric columns.
+        """
+        info = self._meta["tables"][tablename]
+        directory = os.path.join(self._directory, tablename)
+        columns = dict()
+        for name in info["columns"]:
+            if name in info["objects"]:
+                kinds, offsets, data = (
+                    np.load(os.path.join(directory, f"{name}.{part}.npy"), allow_pickle=False)
+                    for part in ("kinds", "offsets", "data")
+                )
+                columns[name] = _decodeObjects(kinds, offsets, data)
+            else:
+                columns[name] = np.load(
+                    os.path.join(directory, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+        nullMasks = {
+            name: np.load(os.path.join(directory, f"{name}.null.npy"), mmap_mode="r", allow_pickle=False)
+            for name in info["nullable"]
+        }
+        return tableType(columns, nullMasks)
+
+    def resolveStrings(self, ids: Iterable[int]) -> dict[int, str]:
+        """
+        Looks up StringIds entries stored in the cache; unknown ids are left out.
+        """
+        if self._strings is None:
+            d = os.path.join(self._directory, "StringIds")
+            self._strings = tuple(
+                np.load(os.path.join(d, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+                for name in ("ids", "offsets", "data")
+            )
+        cachedIds, offsets, data = self._strings
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if len(cachedIds) == 0 or len(ids) == 0:
+            return dict()
+        pos = np.minimum(np.searchsorted(cachedIds, ids), len(cachedIds) - 1)
+        found = cachedIds[pos] == ids
+        return {
+            i: bytes(data[offsets[p]:offsets[p + 1]]).decode("utf-8")
+            for i, p in zip(ids[found].tolist(), pos[found].tolist())
+        }
+
+def _packBytes(encoded: list[bytes]) -> tuple[np.ndarray, np.ndarray]:
+    # Entry i is data[offsets[i]:offsets[i + 1]]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+def _encodeObjects(values: list) -> tuple[np.ndarray, list[bytes]]:
+    kinds = np.zeros(len(values), dtype=np.int8)
+    encoded = list()
+    for i, value in enumerate(values):
+        if value is None:
+            encoded.append(b"")
+        elif isinstance(value, str):
+            kinds[i] = _STR
+            encoded.append(value.encode("utf-8"))
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            kinds[i] = _BYTES
+            encoded.append(bytes(value))
+        elif isinstance(value, (int, np.integer)):
+            kinds[i] = _INT
+            encoded.append(str(int(value)).encode())
+        elif isinstance(value, (float, np.floating)):
+            kinds[i] = _FLOAT
+            encoded.append(repr(float(value)).encode())
+        else:
+            raise TypeError(f"Cannot store {type(value).__name__} values in the cache")
+    return kinds, encoded
+
+def _decodeObjects(kinds: np.ndarray, offsets: np.ndarray, data: np.ndarray) -> np.ndarray:
+    buffer = data.tobytes()
+    decode = {
+        _NONE: lambda b: None,
+        _STR: lambda b: b.decode("utf-8"),
+        _BYTES: bytes,
+        _INT: int,
+        _FLOAT: float,
+    }
+    values = np.empty(len(kinds), dtype=object)
+    values[:] = [
+        decode[kind](buffer[a:b])
+        for kind, a, b in zip(kinds.tolist(), offsets[:-1].tolist(), offsets[1:].tolist())
+    ]
+    return values
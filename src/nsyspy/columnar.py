@@ -0,0 +1,198 @@
+from __future__ import annotations
+import dataclasses
+
+import numpy as np
+
+class ColumnarTable:
+    """
+    Struct-of-arrays container for rows of an nsys table.
+
+    Each column is held as a single NumPy array, so that bulk
+    operations (durations, masks, grouping) are vectorized instead of
+    going through one dataclass per row. Subclasses set rowType to the
+    dataclass that should be materialized when a single row is indexed.
+
+    NULL entries in integer columns are stored as 0, with a boolean mask
+    kept alongside in nullMasks. Float columns use NaN and object columns
+    keep None as is.
+    """
+    rowType: type | None = None
+    # Columns not listed here are assumed to be integers
+    dtypes: dict[str, type] = dict()
+
+    def __init__(
+        self,
+        columns: dict[str, np.ndarray],
+        nullMasks: dict[str, np.ndarray] | None = None
+    ):
+        self._columns = columns
+        self._nullMasks = dict() if nullMasks is None else nullMasks
+        lengths = {len(v) for v in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have mismatched lengths: {lengths}")
+
+    @classmethod
+    def fromRows(cls, columnNames: list[str], rows: list[tuple]):
+        """
+        Builds the table from plain tuples, as returned by a cursor
+        without a row factory.
+
+        Parameters
+        ----------
+        columnNames : list[str]
+            Names of the columns, in the order they appear in each row.
+
+        rows : list[tuple]
+            Rows to transpose into columns.
+
+        Returns
+        -------
+        table : ColumnarTable
+            The columnar table (of the calling subclass).
+        """
+        columns = dict()
+        nullMasks = dict()
+        transposed = zip(*rows) if len(rows) > 0 else [()] * len(columnNames)
+        for name, values in zip(columnNames, transposed):
+            columns[name], mask = cls._toArray(name, values)
+            if mask is not None:
+                nullMasks[name] = mask
+        return cls(columns, nullMasks)
+
+    @classmethod
+    def fromRecords(cls, records: list):
+        """
+        Builds the table from a list of rowType dataclasses,
+        e.g. the output of one of the non-columnar query methods.
+        """
+        if cls.rowType is None:
+            raise TypeError(f"{cls.__name__} has no row type")
+        columnNames = [f.name for f in dataclasses.fields(cls.rowType)]
+        rows = [dataclasses.astuple(r) for r in records]
+        return cls.fromRows(columnNames, rows)
+
+    @classmethod
+    def _toArray(cls, name: str, values: tuple) -> tuple[np.ndarray, np.ndarray | None]:
+        dtype = cls.dtypes.get(name, np.int64)
+        try:
+            return np.array(values, dtype=dtype), None
+        except (TypeError, ValueError):
+            # Contains NULLs; fill them in and remember where they were
+            mask = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+            return np.array([0 if v is None else v for v in values], dtype=dtype), mask
+
+    @classmethod
+    def empty(cls, columnNames: list[str]):
+        return cls.fromRows(columnNames, [])
+
+    @classmethod
+    def concatenate(cls, tables: list[ColumnarTable]):
+        """
+        Joins several tables with identical columns end to end.
+        Used to stitch together chunks that were read separately.
+        """
+        if len(tables) == 0:
+            raise ValueError("Need at least one table to concatenate")
+        if len(tables) == 1:
+            return tables[0]
+        names = tables[0].columnNames
+        columns = {
+            name: np.concatenate([t._columns[name] for t in tables])
+            for name in names
+        }
+        nullMasks = dict()
+        for name in names:
+            if any(name in t._nullMasks for t in tables):
+                nullMasks[name] = np.concatenate([t.nullMask(name) for t in tables])
+        return cls(columns, nullMasks)
+
+    @property
+    def columnNames(self) -> list[str]:
+        return list(self._columns.keys())
+
+    @property
+    def columns(self) -> dict[str, np.ndarray]:
+        return self._columns
+
+    @property
+    def nullMasks(self) -> dict[str, np.ndarray]:
+        return self._nullMasks
+
+    def nullMask(self, name: str) -> np.ndarray:
+        """
+        Boolean array that is True where the column was NULL.
+        """
+        if name in self._nullMasks:
+            return self._nullMasks[name]
+        return np.zeros(len(self), dtype=bool)
+
+    def __len__(self) -> int:
+        for v in self._columns.values():
+            return len(v)
+        return 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        # Only called when normal lookup fails, so columns act like attributes
+        columns = self.__dict__.get("_columns")
+        if columns is not None and name in columns:
+            return columns[name]
+        raise AttributeError(f"{type(self).__name__} has no attribute or column '{name}'")
+
+    def __getitem__(self, key):
+        """
+        Indexing rules:
+            table["start"] -> the column array
+            table[5] -> the row materialized as rowType
+            table[mask], table[1:10], table[[1, 4, 9]] -> a new table
+        """
+        if isinstance(key, str):
+            return self._columns[key]
+        if isinstance(key, (int, np.integer)):
+            return self.row(int(key))
+        return type(self)(
+            {name: col[key] for name, col in self._columns.items()},
+            {name: mask[key] for name, mask in self._nullMasks.items()}
+        )
+
+    def row(self, i: int):
+        """
+        Materializes a single row as the rowType dataclass.
+        NULL entries are returned as None.
+        """
+        if self.rowType is None:
+            raise TypeError(f"{type(self).__name__} has no row type to materialize")
+        fields = {f.name for f in dataclasses.fields(self.rowType)}
+        values = dict()
+        for name, col in self._columns.items():
+            if name not in fields:
+                continue
+            if name in self._nullMasks and self._nullMasks[name][i]:
+                values[name] = None
+            else:
+                v = col[i]
+                values[name] = v.item() if isinstance(v, np.generic) else v
+        return self.rowType(**values)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def toRows(self) -> list:
+        """
+        Materializes every row. Mainly useful for small tables.
+        """
+        return list(self)
+
+    def sortedBy(self, *names: str):
+        """
+        Returns a copy of the table sorted by the given columns
+        (first name is the primary key).
+        """
+        order = np.lexsort([self._columns[name] for name in reversed(names)])
+        return self[order]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self)} rows, columns={self.columnNames})"
@@ -0,0 +1,282 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .analysis import NsysSqlite, KernelTable
+
+import dataclasses
+import math
+import numpy as np
+
+from .columnar import ColumnarTable
+from .stats import groupedSummary, groupLabels
+
+# Element-wise math.erfc (NaN stays NaN), without needing scipy
+_erfc = np.frompyfunc(math.erfc, 1, 1)
+
+LAUNCH_CONFIG = [
+    "gridX", "gridY", "gridZ", "blockX", "blockY", "blockZ",
+    "registersPerThread", "staticSharedMemory", "dynamicSharedMemory",
+]
+
+@dataclasses.dataclass
+class ReportComparison:
+    """
+    Kernel by kernel comparison of two reports (before and after a change).
+
+    kernels has one row per distinct kernel (name plus the matched launch
+    configuration columns) seen in either report, sorted by descending
+    totalChange. Kernels missing from one report have a count of 0 and NaN
+    statistics on that side.
+    """
+    kernels: ColumnarTable
+    totalBefore: int
+    totalAfter: int
+
+    @property
+    def totalChange(self) -> int:
+        """
+        Change in summed kernel duration (GPU time) from before to after.
+        """
+        return self.totalAfter - self.totalBefore
+
+    @property
+    def relativeTotalChange(self) -> float:
+        return self.totalChange / self.totalBefore if self.totalBefore > 0 else math.nan
+
+    @property
+    def appeared(self) -> ColumnarTable:
+        """
+        Kernels only present in the after report.
+        """
+        return self.kernels[self.kernels.countBefore == 0]
+
+    @property
+    def disappeared(self) -> ColumnarTable:
+        """
+        Kernels only present in the before report.
+        """
+        return self.kernels[self.kernels.countAfter == 0]
+
+    @property
+    def matched(self) -> ColumnarTable:
+        """
+        Kernels present in both reports.
+        """
+        return self.kernels[(self.kernels.countBefore > 0) & (self.kernels.countAfter > 0)]
+
+    def regressions(self, alpha: float = 0.05, minRelativeChange: float = 0.0) -> ColumnarTable:
+        """
+        Matched kernels that got significantly slower, largest total impact first.
+
+        Parameters
+        ----------
+        alpha : float
+            Significance level for the Mann-Whitney p-value. Defaults to 0.05.
+            With many kernels, consider dividing by their number (Bonferroni).
+
+        minRelativeChange : float
+            Minimum relative change in median duration, e.g. 0.05 for 5%.
+            Defaults to 0.0.
+        """
+        k = self.kernels
+        return k[(k.pValue < alpha) & (k.relativeChange > minRelativeChange)]
+
+    def improvements(self, alpha: float = 0.05, minRelativeChange: float = 0.0) -> ColumnarTable:
+        """
+        Matched kernels that got significantly faster, largest total impact first.
+        See regressions().
+        """
+        k = self.kernels
+        k = k[(k.pValue < alpha) & (k.relativeChange < -minRelativeChange)]
+        return k[np.argsort(k.totalChange, kind="stable")]
+
+def compareReports(
+    before: NsysSqlite,
+    after: NsysSqlite,
+    nameColumn: str = "shortName",
+    matchBy: list[str] = LAUNCH_CONFIG,
+    start: float = 0.0,
+    end: float | None = None
+) -> ReportComparison:
+    """
+    Compares the kernels of two reports, e.g. before and after a code change.
+
+    Works from the columnar kernel tables, so opening the reports with
+    cache=True makes repeated comparisons cheap.
+
+    Parameters
+    ----------
+    before : NsysSqlite
+        The baseline report.
+
+    after : NsysSqlite
+        The report to compare against the baseline.
+
+    nameColumn : str
+        Kernel name column to match on; names are compared as strings since
+        StringIds differ between reports. Defaults to 'shortName'.
+
+    matchBy : list[str]
+        Kernel columns that must also be equal for two kernels to match.
+        Defaults to LAUNCH_CONFIG (grid, block, registers and shared memory);
+        use [] to match by name only.
+
+    start : float
+        Only kernels starting at or after this time, in both reports. Defaults to 0.0.
+
+    end : float | None
+        Only kernels ending at or before this time, in both reports. Defaults to None.
+
+    Returns
+    -------
+    comparison : ReportComparison
+        See compareKernels().
+    """
+    tables = list()
+    names = list()
+    for db in (before, after):
+        kernels = db.getKernelsBetween(start, end, columnar=True)
+        tables.append(kernels)
+        names.append(db.resolveStrings(np.unique(kernels[nameColumn]).tolist()))
+    return compareKernels(tables[0], tables[1], names[0], names[1], nameColumn, matchBy)
+
+def compareKernels(
+    before: KernelTable,
+    after: KernelTable,
+    beforeNames: dict[int, str],
+    afterNames: dict[int, str],
+    nameColumn: str = "shortName",
+    matchBy: list[str] = LAUNCH_CONFIG
+) -> ReportComparison:
+    """
+    Compares two sets of kernels. See compareReports().
+
+    Kernels are matched by name and the matchBy columns with one sort of both
+    tables together. For every kernel present in both, the two duration
+    distributions are compared with a two-sided Mann-Whitney U test (normal
+    approximation with tie correction), computed for all kernels at once.
+
+    Parameters
+    ----------
+    before, after : KernelTable
+        The kernels to compare.
+
+    beforeNames, afterNames : dict[int, str]
+        StringIds of each table's nameColumn, e.g. from NsysSqlite.resolveStrings().
+
+    Returns
+    -------
+    comparison : ReportComparison
+        Per kernel columns are the name, the matchBy columns, then count,
+        total, mean and median duration before and after, medianChange,
+        relativeChange (of the median), totalChange, u (the U statistic of
+        the before sample) and pValue.
+    """
+    # Map name ids of both tables onto one shared set of codes
+    codes = list()
+    for kernels, stringmap in ((before, beforeNames), (after, afterNames)):
+        ids, inverse = np.unique(kernels[nameColumn], return_inverse=True)
+        codes.append((ids, inverse.reshape(-1), [stringmap.get(i, f"<{i}>") for i in ids.tolist()]))
+    allNames = np.array(sorted(set(codes[0][2]) | set(codes[1][2])), dtype=object)
+    nameCodes = [
+        np.searchsorted(allNames, np.array(strings, dtype=object)).astype(np.int64)[inverse]
+        if len(strings) > 0 else np.zeros(0, dtype=np.int64)
+        for _, inverse, strings in codes
+    ]
+
+    keys = np.concatenate([
+        np.column_stack([nameCodes[i], *[np.asarray(t[c], dtype=np.int64) for c in matchBy]])
+        for i, t in enumerate((before, after))
+    ])
+    group, first = groupLabels(*keys.T)
+    uniqueKeys = keys[first]
+    numGroups = len(first)
+    side = np.concatenate((np.zeros(len(before), dtype=np.int64), np.ones(len(after), dtype=np.int64)))
+    durations = np.concatenate((before.duration, after.duration))
+
+    # Per group and side statistics, looked up by key = 2 * group + side
+    summary = groupedSummary(2 * group + side, durations, (50,))
+    stats = dict()
+    for name in ("count", "total", "mean", "p50"):
+        full = np.zeros(2 * numGroups) if name != "count" else np.zeros(2 * numGroups, dtype=np.int64)
+        if name in ("mean", "p50"):
+            full[:] = np.nan
+        full[summary.key] = summary[name]
+        stats[name] = full.reshape(numGroups, 2)
+
+    u, pValue = _mannWhitney(group, side, durations, stats["count"][:, 0], stats["count"][:, 1])
+
+    totalBefore = np.nan_to_num(stats["total"][:, 0]).astype(np.int64)
+    totalAfter = np.nan_to_num(stats["total"][:, 1]).astype(np.int64)
+    medianBefore = stats["p50"][:, 0]
+    medianAfter = stats["p50"][:, 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relativeChange = (medianAfter - medianBefore) / medianBefore
+
+    columns = {"name": allNames[uniqueKeys[:, 0]]}
+    for j, c in enumerate(matchBy):
+        columns[c] = uniqueKeys[:, j + 1]
+    columns.update({
+        "countBefore": stats["count"][:, 0],
+        "countAfter": stats["count"][:, 1],
+        "totalBefore": totalBefore,
+        "totalAfter": totalAfter,
+        "meanBefore": stats["mean"][:, 0],
+        "meanAfter": stats["mean"][:, 1],
+        "medianBefore": medianBefore,
+        "medianAfter": medianAfter,
+        "medianChange": medianAfter - medianBefore,
+        "relativeChange": relativeChange,
+        "totalChange": totalAfter - totalBefore,
+        "u": u,
+        "pValue": pValue,
+    })
+    order = np.argsort(-columns["totalChange"], kind="stable")
+    return ReportComparison(
+        kernels=ColumnarTable({name: col[order] for name, col in columns.items()}),
+        totalBefore=int(np.sum(before.duration)),
+        totalAfter=int(np.sum(after.duration)),
+    )
+
+def _mannWhitney(
+    group: np.ndarray,
+    side: np.ndarray,
+    values: np.ndarray,
+    n1: np.ndarray,
+    n2: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    # Two-sided Mann-Whitney U test of side 0 against side 1, independently
+    # within every group, using midranks for ties
+    numGroups = len(n1)
+    order = np.lexsort((values, group))
+    g = group[order]
+    v = values[order]
+    n = len(v)
+
+    # Runs of equal (group, value) share the average of their 1-based ranks
+    # within the group
+    newRun = np.ones(n, dtype=bool)
+    newRun[1:] = (g[1:] != g[:-1]) | (v[1:] != v[:-1])
+    runId = np.cumsum(newRun) - 1
+    runStart = np.flatnonzero(newRun)
+    runLength = np.diff(np.append(runStart, n))
+    groupStart = np.zeros(numGroups + 1, dtype=np.int64)
+    np.cumsum(np.bincount(g, minlength=numGroups), out=groupStart[1:])
+    midrank = runStart + (runLength + 1) / 2 - groupStart[g[runStart]]
+    ranks = midrank[runId]
+
+    r1 = np.bincount(g, weights=ranks * (side[order] == 0), minlength=numGroups)
+    u1 = r1 - n1 * (n1 + 1) / 2
+    total = n1 + n2
+    ties = np.bincount(g[runStart], weights=runLength.astype(np.float64) ** 3 - runLength, minlength=numGroups)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = n1 * n2 / 12 * ((total + 1) - ties / (total * (total - 1)))
+        z = (np.abs(u1 - n1 * n2 / 2) - 0.5) / np.sqrt(variance)
+    z = np.maximum(z, 0)
+    pValue = _erfc(z / math.sqrt(2)).astype(np.float64)
+    valid = (n1 > 0) & (n2 > 0) & (variance > 0)
+    pValue[~valid] = np.nan
+    # Identical samples with no spread: no evidence of a difference
+    pValue[(n1 > 0) & (n2 > 0) & (variance == 0)] = 1.0
+    return np.where((n1 > 0) & (n2 > 0), u1, np.nan), pValue
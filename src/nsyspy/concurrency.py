@@ -0,0 +1,174 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .analysis import KernelTable
+
+import dataclasses
+import numpy as np
+
+from .intervals import mergeIntervals, unionLength
+
+@dataclasses.dataclass
+class DeviceConcurrency:
+    """
+    How busy one device was, and how much its kernels overlapped, over a window.
+
+    Kernel indices (gapKernelBefore/After) refer to rows of the KernelTable that
+    was analyzed; -1 means there is no kernel on that side of the gap.
+    """
+    deviceId: int
+    start: int
+    end: int
+    busyTime: int
+    # concurrencyTime[i] is the time during which exactly i kernels were running
+    concurrencyTime: np.ndarray
+    streamIds: np.ndarray
+    streamBusyTime: np.ndarray
+    gapStart: np.ndarray
+    gapEnd: np.ndarray
+    gapKernelBefore: np.ndarray
+    gapKernelAfter: np.ndarray
+
+    @property
+    def span(self) -> int:
+        return self.end - self.start
+
+    @property
+    def idleTime(self) -> int:
+        return self.span - self.busyTime
+
+    @property
+    def utilization(self) -> float:
+        return self.busyTime / self.span if self.span > 0 else 0.0
+
+    @property
+    def streamUtilization(self) -> np.ndarray:
+        return self.streamBusyTime / self.span if self.span > 0 else np.zeros(len(self.streamIds))
+
+    @property
+    def meanConcurrency(self) -> float:
+        """
+        Average number of kernels running while the device is busy.
+        """
+        levels = np.arange(len(self.concurrencyTime))
+        return float(np.sum(levels * self.concurrencyTime) / self.busyTime) if self.busyTime > 0 else 0.0
+
+    @property
+    def gapDuration(self) -> np.ndarray:
+        return self.gapEnd - self.gapStart
+
+    def longestIdleGaps(self, n: int = 10) -> np.ndarray:
+        """
+        Indices into the gap arrays of the n longest idle gaps, longest first.
+        """
+        return np.argsort(-self.gapDuration, kind="stable")[:n]
+
+def analyzeConcurrency(
+    kernels: KernelTable,
+    start: int | None = None,
+    end: int | None = None
+) -> dict[int, DeviceConcurrency]:
+    """
+    Sweep-line analysis of kernel overlap, per device.
+
+    Computes busy time (union of kernel intervals), idle gaps and the kernels
+    bordering them, per-stream busy time and a histogram of how long each
+    number of kernels ran simultaneously. Everything is O(n log n) in the
+    number of kernels.
+
+    Parameters
+    ----------
+    kernels : KernelTable
+        Kernels to analyze, e.g. from getKernelsBetween(columnar=True).
+
+    start : int | None
+        Start of the analysis window. Kernels are clipped to the window.
+        Defaults to None, which uses the first kernel start of each device.
+
+    end : int | None
+        End of the analysis window. Defaults to None, which uses the last
+        kernel end of each device.
+
+    Returns
+    -------
+    results : dict[int, DeviceConcurrency]
+        Key is the deviceId.
+    """
+    results = dict()
+    for deviceId in np.unique(kernels.deviceId).tolist():
+        indices = np.flatnonzero(kernels.deviceId == deviceId)
+        kStart = kernels.start[indices]
+        kEnd = kernels.end[indices]
+        windowStart = int(np.min(kStart)) if start is None else start
+        windowEnd = int(np.max(kEnd)) if end is None else end
+
+        kStart = np.clip(kStart, windowStart, windowEnd)
+        kEnd = np.clip(kEnd, windowStart, windowEnd)
+        inside = kEnd > kStart
+        results[deviceId] = _analyzeDevice(
+            deviceId, kStart[inside], kEnd[inside],
+            kernels.streamId[indices][inside], indices[inside],
+            windowStart, windowEnd
+        )
+    return results
+
+def _findExact(values: np.ndarray, targets: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    # For each target, indices[i] of some i with values[i] == target, else -1
+    if len(values) == 0:
+        return np.full(len(targets), -1, dtype=np.int64)
+    order = np.argsort(values, kind="stable")
+    sortedValues = values[order]
+    pos = np.minimum(np.searchsorted(sortedValues, targets), len(values) - 1)
+    return np.where(sortedValues[pos] == targets, indices[order][pos], -1)
+
+def _analyzeDevice(
+    deviceId: int,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    streams: np.ndarray,
+    indices: np.ndarray,
+    windowStart: int,
+    windowEnd: int
+) -> DeviceConcurrency:
+    # Busy time and gaps from the union of all kernels
+    mStarts, mEnds, _ = mergeIntervals(starts, ends)
+    busyTime = int(np.sum(mEnds - mStarts))
+    gapStart = np.concatenate(([windowStart], mEnds))
+    gapEnd = np.concatenate((mStarts, [windowEnd]))
+    isGap = gapEnd > gapStart
+    gapStart = gapStart[isGap]
+    gapEnd = gapEnd[isGap]
+
+    # Kernels bordering each gap: the one ending exactly at its start,
+    # and the one starting exactly at its end
+    gapKernelBefore = _findExact(ends, gapStart, indices)
+    gapKernelAfter = _findExact(starts, gapEnd, indices)
+
+    # Concurrency histogram: +1 at every start and -1 at every end; ends sort
+    # before starts at equal times so back-to-back kernels do not overlap
+    times = np.concatenate(([windowStart], starts, ends, [windowEnd]))
+    deltas = np.concatenate(([0], np.ones(len(starts), dtype=np.int64), -np.ones(len(ends), dtype=np.int64), [0]))
+    order = np.lexsort((deltas, times))
+    times = times[order]
+    levels = np.cumsum(deltas[order])
+    durations = np.diff(times)
+    concurrencyTime = np.zeros(int(np.max(levels)) + 1, dtype=np.int64)
+    np.add.at(concurrencyTime, levels[:-1], durations)
+
+    # Per-stream busy time
+    streamIds, streamSegments = np.unique(streams, return_inverse=True)
+    streamBusyTime = unionLength(starts, ends, streamSegments.reshape(-1), len(streamIds))
+
+    return DeviceConcurrency(
+        deviceId=deviceId,
+        start=windowStart,
+        end=windowEnd,
+        busyTime=busyTime,
+        concurrencyTime=concurrencyTime,
+        streamIds=streamIds,
+        streamBusyTime=streamBusyTime,
+        gapStart=gapStart,
+        gapEnd=gapEnd,
+        gapKernelBefore=gapKernelBefore,
+        gapKernelAfter=gapKernelAfter,
+    )
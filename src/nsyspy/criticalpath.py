@@ -0,0 +1,528 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .analysis import NsysSqlite, KernelTable, RuntimeTable
+
+import dataclasses
+import heapq
+import numpy as np
+
+from .columnar import ColumnarTable
+from .stats import groupLabels
+
+# Edge kinds of a DependencyGraph
+STREAM_EDGE = 0  # previous kernel on the same stream
+HOST_EDGE = 1    # previous runtime call on the same thread
+LAUNCH_EDGE = 2  # launching runtime call -> kernel
+SYNC_EDGE = 3    # kernel -> synchronize call that waited for it
+EVENT_EDGE = 4   # kernel before an event record -> kernel after the matching wait
+
+# Runtime API name prefix -> how the call synchronizes. 'device' waits for
+# all streams, 'stream' for one unknown stream (stream and event
+# synchronize), 'record' and 'wait' are cudaEventRecord/cudaStreamWaitEvent
+SYNC_CALLS = {
+    "cudaDeviceSynchronize": "device",
+    "cudaStreamSynchronize": "stream",
+    "cudaEventSynchronize": "stream",
+    "cudaEventRecord": "record",
+    "cudaStreamWaitEvent": "wait",
+}
+
+@dataclasses.dataclass
+class DependencyGraph:
+    """
+    DAG of kernels and CUDA runtime calls, with array-backed adjacency.
+
+    Nodes 0 .. numKernels - 1 are the rows of kernels, the rest are the rows
+    of runtime (node numKernels + i is runtime[i]). Edge j goes from
+    edgeSource[j] to edgeTarget[j]; edgeKind is one of the *_EDGE constants.
+
+    ready is the time at which a node's last dependency was satisfied: the
+    latest end of its predecessors (the start of the call, for launch edges),
+    or its own start if it has none. cost = end - ready is then the time the
+    node itself accounts for; for a kernel its duration plus any launch or
+    queueing delay, for a synchronize call only the time it took to return.
+    """
+    kernels: KernelTable
+    runtime: RuntimeTable
+    numKernels: int
+    start: np.ndarray
+    end: np.ndarray
+    ready: np.ndarray
+    edgeSource: np.ndarray
+    edgeTarget: np.ndarray
+    edgeKind: np.ndarray
+    # Time at which each edge's dependency was satisfied
+    edgeArrival: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @property
+    def numEdges(self) -> int:
+        return len(self.edgeSource)
+
+    @property
+    def cost(self) -> np.ndarray:
+        return self.end - self.ready
+
+    @property
+    def isKernel(self) -> np.ndarray:
+        return np.arange(len(self)) < self.numKernels
+
+def buildDependencyGraph(
+    kernels: KernelTable,
+    runtime: RuntimeTable,
+    apiNames: dict[int, str]
+) -> DependencyGraph:
+    """
+    Builds the dependency DAG of kernels and runtime calls.
+
+    Edges come from stream order (consecutive kernels of a (deviceId,
+    streamId)), host order (consecutive runtime calls of a globalTid),
+    launches (the runtime call with the kernel's correlationId in the same
+    process) and synchronization calls, as named in SYNC_CALLS. The runtime
+    table does not record which stream or event a call used, so these are
+    inferred from the thread's launches:
+
+    - cudaDeviceSynchronize waits for the last kernel launched before it
+      (by the same process) on every stream.
+    - Stream and event synchronize wait for the one of those that ended
+      last before the call returned.
+    - cudaStreamWaitEvent makes the next kernel launched by the thread
+      depend on the kernel launched just before the thread's most recent
+      cudaEventRecord, if it ran on another stream.
+
+    Edges that point backwards in time, which can only come from the
+    inference above or clock skew, are dropped.
+
+    Parameters
+    ----------
+    kernels : KernelTable
+        The kernels, e.g. from getKernelsBetween(columnar=True).
+
+    runtime : RuntimeTable
+        The runtime calls of the same time range, e.g. from
+        getCudaApiCallsBetween(columnar=True).
+
+    apiNames : dict[int, str]
+        Name of (at least) every runtime nameId, e.g. from resolveStrings().
+
+    Returns
+    -------
+    graph : DependencyGraph
+        See DependencyGraph.
+    """
+    numKernels = len(kernels)
+    start = np.concatenate((kernels.start, runtime.start)).astype(np.int64)
+    end = np.concatenate((kernels.end, runtime.end)).astype(np.int64)
+    sources = list()
+    targets = list()
+    kinds = list()
+
+    def addEdges(source, target, kind):
+        sources.append(np.asarray(source, dtype=np.int64))
+        targets.append(np.asarray(target, dtype=np.int64))
+        kinds.append(np.full(len(source), kind, dtype=np.int8))
+
+    # Stream order; a single integer key per (device, stream)
+    streamKey, _ = groupLabels(kernels.deviceId, kernels.streamId)
+    byStream = np.lexsort((kernels.start, streamKey))
+    consecutive = streamKey[byStream[1:]] == streamKey[byStream[:-1]]
+    addEdges(byStream[:-1][consecutive], byStream[1:][consecutive], STREAM_EDGE)
+
+    # Host order
+    callTid = runtime.globalTid
+    byThread = np.lexsort((runtime.start, callTid))
+    consecutive = callTid[byThread[1:]] == callTid[byThread[:-1]]
+    addEdges(numKernels + byThread[:-1][consecutive], numKernels + byThread[1:][consecutive], HOST_EDGE)
+
+    # Launches, matched on (process, correlationId)
+    launchCall = _matchLaunches(kernels, runtime)
+    launched = np.flatnonzero(launchCall >= 0)
+    addEdges(numKernels + launchCall[launched], launched, LAUNCH_EDGE)
+
+    # Synchronization, inferred from each thread's launches
+    nameIds = np.unique(runtime.nameId).tolist()
+    kindOf = {kind: i for i, kind in enumerate(("device", "stream", "record", "wait"), start=1)}
+    nameKind = {
+        nameId: next((kindOf[kind] for prefix, kind in SYNC_CALLS.items()
+                      if apiNames.get(nameId, "").startswith(prefix)), 0)
+        for nameId in nameIds
+    }
+    lookup = np.array([nameKind[i] for i in nameIds], dtype=np.int8)
+    callKind = lookup[np.searchsorted(nameIds, runtime.nameId)] if len(runtime) > 0 else np.zeros(0, dtype=np.int8)
+    for source, target, kind in _syncEdges(kernels, runtime, launchCall, callKind, streamKey, kindOf, numKernels):
+        addEdges(source, target, kind)
+
+    source = np.concatenate(sources)
+    target = np.concatenate(targets)
+    kind = np.concatenate(kinds)
+    # A kernel can start as soon as its launch call has started
+    arrival = np.where(kind == LAUNCH_EDGE, start[source], end[source])
+    keep = arrival <= end[target]
+    source, target, kind, arrival = source[keep], target[keep], kind[keep], arrival[keep]
+
+    ready = start.copy()
+    hasEdges = np.zeros(len(start), dtype=bool)
+    hasEdges[target] = True
+    ready[hasEdges] = np.iinfo(np.int64).min
+    np.maximum.at(ready, target, arrival)
+    return DependencyGraph(
+        kernels=kernels,
+        runtime=runtime,
+        numKernels=numKernels,
+        start=start,
+        end=end,
+        ready=ready,
+        edgeSource=source,
+        edgeTarget=target,
+        edgeKind=kind,
+        edgeArrival=arrival,
+    )
+
+def _matchLaunches(kernels: KernelTable, runtime: RuntimeTable) -> np.ndarray:
+    # Row of the launching runtime call of each kernel, -1 if not found
+    launchCall = np.full(len(kernels), -1, dtype=np.int64)
+    valid = ~runtime.nullMask("correlationId")
+    callPid = runtime.globalTid >> 24
+    kernelPid = kernels.globalPid >> 24
+    for pid in np.unique(callPid[valid]).tolist():
+        rows = np.flatnonzero(valid & (callPid == pid))
+        rows = rows[np.argsort(runtime.correlationId[rows], kind="stable")]
+        corr = runtime.correlationId[rows]
+        k = np.flatnonzero((kernelPid == pid) & ~kernels.nullMask("correlationId"))
+        pos = np.minimum(np.searchsorted(corr, kernels.correlationId[k]), len(corr) - 1)
+        found = corr[pos] == kernels.correlationId[k]
+        launchCall[k[found]] = rows[pos[found]]
+    return launchCall
+
+def _syncEdges(kernels, runtime, launchCall, callKind, streamKey, kindOf, numKernels):
+    # Yields (source, target, kind) arrays of sync and event edges
+    launched = np.flatnonzero(launchCall >= 0)
+    launchStart = runtime.start[launchCall[launched]]
+    launchPid = runtime.globalTid[launchCall[launched]] >> 24
+    syncs = np.flatnonzero((callKind == kindOf["device"]) | (callKind == kindOf["stream"]))
+    syncPid = runtime.globalTid[syncs] >> 24
+
+    # Last kernel of every stream launched before each sync call, one
+    # column per stream
+    streams = np.unique(streamKey[launched])
+    candidate = np.full((len(syncs), len(streams)), -1, dtype=np.int64)
+    for j, key in enumerate(streams.tolist()):
+        for pid in np.unique(syncPid).tolist():
+            onStream = launched[(streamKey[launched] == key) & (launchPid == pid)]
+            if len(onStream) == 0:
+                continue
+            onStream = onStream[np.argsort(runtime.start[launchCall[onStream]], kind="stable")]
+            sel = np.flatnonzero(syncPid == pid)
+            pos = np.searchsorted(runtime.start[launchCall[onStream]], runtime.start[syncs[sel]], side="left") - 1
+            candidate[sel[pos >= 0], j] = onStream[pos[pos >= 0]]
+    kernelEnd = np.where(candidate >= 0, kernels.end[np.maximum(candidate, 0)], np.iinfo(np.int64).min)
+    # Work still running after the call returned cannot have been waited for
+    kernelEnd[kernelEnd > runtime.end[syncs][:, None]] = np.iinfo(np.int64).min
+
+    isDevice = callKind[syncs] == kindOf["device"]
+    row, col = np.nonzero(isDevice[:, None] & (kernelEnd > np.iinfo(np.int64).min))
+    yield candidate[row, col], numKernels + syncs[row], SYNC_EDGE
+    if len(streams) > 0:
+        last = np.argmax(kernelEnd, axis=1)
+        row = np.flatnonzero(~isDevice & (kernelEnd[np.arange(len(syncs)), last] > np.iinfo(np.int64).min))
+        yield candidate[row, last[row]], numKernels + syncs[row], SYNC_EDGE
+
+    # Events: per thread, pair each wait with the latest record before it
+    records = callKind == kindOf["record"]
+    waits = callKind == kindOf["wait"]
+    isLaunch = np.zeros(len(runtime), dtype=bool)
+    launchedKernel = np.full(len(runtime), -1, dtype=np.int64)
+    isLaunch[launchCall[launched]] = True
+    launchedKernel[launchCall[launched]] = launched
+    for tid in np.unique(runtime.globalTid[waits]).tolist():
+        calls = np.flatnonzero(runtime.globalTid == tid)
+        calls = calls[np.argsort(runtime.start[calls], kind="stable")]
+        launchPos = np.flatnonzero(isLaunch[calls])
+        recordPos = np.flatnonzero(records[calls])
+        waitPos = np.flatnonzero(waits[calls])
+        if len(launchPos) == 0 or len(recordPos) == 0:
+            continue
+        # Kernel launched just before each record, and just after each wait
+        before = np.searchsorted(launchPos, recordPos) - 1
+        recordKernel = np.where(before >= 0, launchedKernel[calls[launchPos[np.maximum(before, 0)]]], -1)
+        matching = np.searchsorted(recordPos, waitPos) - 1
+        after = np.searchsorted(launchPos, waitPos)
+        ok = (matching >= 0) & (after < len(launchPos))
+        source = recordKernel[matching[ok]]
+        target = launchedKernel[calls[launchPos[after[ok]]]]
+        ok = (source >= 0) & (streamKey[np.maximum(source, 0)] != streamKey[target])
+        ok &= kernels.end[np.maximum(source, 0)] <= kernels.start[target]
+        yield source[ok], target[ok], EVENT_EDGE
+
+@dataclasses.dataclass
+class CriticalPath:
+    """
+    The chain of dependencies that determined when the last node finished,
+    and how much every node could have been delayed without delaying it.
+
+    path lists the nodes of the critical path in time order; each one is the
+    binding predecessor (the one satisfied last, see DependencyGraph.ready)
+    of the next. slack[i] is how much node i could finish later without
+    moving the end of the graph, assuming every other node keeps its cost;
+    it is 0 on the critical path.
+    """
+    graph: DependencyGraph
+    path: np.ndarray
+    slack: np.ndarray
+    # Binding predecessor of every node, -1 for nodes without predecessors
+    binding: np.ndarray
+
+    @property
+    def length(self) -> int:
+        """
+        Time from the start of the first node on the path to the end of the graph.
+        """
+        return int(self.graph.end[self.path[-1]] - self.graph.start[self.path[0]]) if len(self.path) > 0 else 0
+
+    @property
+    def kernelSlack(self) -> np.ndarray:
+        return self.slack[:self.graph.numKernels]
+
+    @property
+    def onPath(self) -> np.ndarray:
+        mask = np.zeros(len(self.graph), dtype=bool)
+        mask[self.path] = True
+        return mask
+
+    @property
+    def pathKernels(self) -> np.ndarray:
+        """
+        Rows of graph.kernels on the critical path, in time order.
+        """
+        return self.path[self.path < self.graph.numKernels]
+
+    @property
+    def pathGpuTime(self) -> int:
+        """
+        Part of the path length accounted for by kernels; the rest is spent
+        in runtime calls and the host time between them.
+        """
+        return int(np.sum(self.graph.cost[self.pathKernels]))
+
+    def summarize(self, db: NsysSqlite | None = None, nameColumn: str = "shortName") -> ColumnarTable:
+        """
+        Critical path time and slack per kernel name.
+
+        Parameters
+        ----------
+        db : NsysSqlite | None
+            Database to resolve names with. Defaults to None, which keeps the ids.
+
+        nameColumn : str
+            Kernel name column to group by. Defaults to 'shortName'.
+
+        Returns
+        -------
+        summary : ColumnarTable
+            One row per name, by descending critical time, with columns
+            nameColumn, count, total (summed duration), critical (number of
+            kernels on the path), criticalTime (their summed cost), minSlack
+            and medianSlack.
+        """
+        kernels = self.graph.kernels
+        uniqueNames, inverse = np.unique(kernels.columns[nameColumn], return_inverse=True)
+        inverse = inverse.reshape(-1)
+        n = len(uniqueNames)
+        onPath = self.onPath[:self.graph.numKernels]
+        slack = self.kernelSlack
+        order = np.lexsort((slack, inverse))
+        count = np.bincount(inverse, minlength=n)
+        first = np.cumsum(count) - count
+        criticalTime = np.bincount(
+            inverse[onPath], weights=self.graph.cost[:self.graph.numKernels][onPath], minlength=n).astype(np.int64)
+        byTime = np.argsort(-criticalTime, kind="stable")
+        return ColumnarTable({
+            nameColumn: (db.resolveStringColumn(uniqueNames) if db is not None else uniqueNames)[byTime],
+            "count": count[byTime],
+            "total": np.bincount(inverse, weights=kernels.duration, minlength=n).astype(np.int64)[byTime],
+            "critical": np.bincount(inverse[onPath], minlength=n)[byTime],
+            "criticalTime": criticalTime[byTime],
+            "minSlack": slack[order][first][byTime],
+            "medianSlack": slack[order][first + (count - 1) // 2][byTime],
+        })
+
+def analyzeCriticalPath(graph: DependencyGraph) -> CriticalPath:
+    """
+    Critical path and per node slack of a dependency graph.
+
+    The binding predecessor of every node (the edge with the latest
+    arrival) is found for all nodes at once, and the critical path is the
+    chain of binding predecessors back from the node that ended last.
+    Slack is the shortest path to the end of the graph: slack[i] = min over
+    successors s of slack[s] + ready[s] - arrival(i, s), with nodes that
+    have no successors getting the time from their end to the end of the
+    graph. It is computed backwards in topological order, a block of nodes
+    at a time (see _blockSlack()).
+
+    Parameters
+    ----------
+    graph : DependencyGraph
+        From buildDependencyGraph().
+
+    Returns
+    -------
+    criticalPath : CriticalPath
+        See CriticalPath.
+
+    Raises
+    ------
+    ValueError
+        If the graph has a cycle.
+    """
+    n = len(graph)
+    source = graph.edgeSource
+    target = graph.edgeTarget
+    arrival = graph.edgeArrival
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return CriticalPath(graph=graph, path=empty, slack=empty.copy(), binding=empty.copy())
+    topological = _topologicalOrder(graph)
+
+    # Binding edge of every node: latest arrival, ties to the latest ending source
+    binding = np.full(n, -1, dtype=np.int64)
+    tight = np.flatnonzero(arrival == graph.ready[target])
+    tight = tight[np.lexsort((graph.end[source[tight]], target[tight]))]
+    last = np.concatenate((target[tight][1:] != target[tight][:-1], [True])) if len(tight) > 0 else np.zeros(0, dtype=bool)
+    binding[target[tight][last]] = source[tight][last]
+
+    sink = int(np.argmax(graph.end))
+    path = list()
+    node = sink
+    while node >= 0:
+        path.append(node)
+        node = int(binding[node])
+    path = np.array(path[::-1], dtype=np.int64)
+
+    return CriticalPath(
+        graph=graph,
+        path=path,
+        slack=_blockSlack(graph, topological, int(graph.end[sink])),
+        binding=binding,
+    )
+
+def _topologicalOrder(graph: DependencyGraph) -> np.ndarray:
+    # Sorting by ready time (then start, end) is a topological order unless
+    # ties put a node before one of its predecessors, e.g. a zero length
+    # kernel and the synchronize call that waited for it; only then is
+    # Kahn's algorithm run, taking nodes in the sorted order where it can
+    n = len(graph)
+    source = graph.edgeSource
+    target = graph.edgeTarget
+    order = np.lexsort((np.arange(n), graph.end, graph.start, graph.ready))
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n)
+    if np.all(rank[source] < rank[target]):
+        return order
+
+    bySource = np.argsort(source, kind="stable")
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(source, minlength=n), out=offsets[1:])
+    succList = target[bySource].tolist()
+    offsetList = offsets.tolist()
+    orderList = order.tolist()
+    rankList = rank.tolist()
+    inDegree = np.bincount(target, minlength=n)
+    # Ranks of the nodes whose predecessors have all been taken
+    available = rank[inDegree == 0].tolist()
+    heapq.heapify(available)
+    inDegree = inDegree.tolist()
+    topological = list()
+    while available:
+        v = orderList[heapq.heappop(available)]
+        topological.append(v)
+        for e in range(offsetList[v], offsetList[v + 1]):
+            s = succList[e]
+            inDegree[s] -= 1
+            if inDegree[s] == 0:
+                heapq.heappush(available, rankList[s])
+    if len(topological) < n:
+        raise ValueError(f"The dependency graph has a cycle; {n - len(topological)} nodes could not be ordered")
+    return np.array(topological, dtype=np.int64)
+
+def _blockSlack(graph: DependencyGraph, topological: np.ndarray, makespan: int, blockSize: int = 4096) -> np.ndarray:
+    # Nodes are cut into blocks of consecutive topological ranks, which are
+    # solved from the last one back; edges leaving a block point at nodes
+    # whose slack is final already, so they are applied once. Within a
+    # block, slack is found by policy iteration: every node either stops
+    # there or follows one chosen successor, starting with its stream or
+    # host order successor. The slack this gives is evaluated for the whole
+    # block by pointer jumping, then every node switches to whichever option
+    # is best under those values (np.minimum.at over the edges), until none
+    # improves. Each round is a few vectorized steps, and pointer jumping
+    # follows long chains in log2(blockSize) steps, so nothing is done per
+    # node or per level of the graph.
+    n = len(graph)
+    source = graph.edgeSource
+    target = graph.edgeTarget
+    gap = graph.ready[target] - graph.edgeArrival
+    isChain = (graph.edgeKind == STREAM_EDGE) | (graph.edgeKind == HOST_EDGE)
+    slack = makespan - graph.end
+    rank = np.empty(n, dtype=np.int64)
+    rank[topological] = np.arange(n)
+    block = rank // blockSize
+    numBlocks = int(block[topological[-1]]) + 1
+
+    internal = block[source] == block[target]
+    inner = np.flatnonzero(internal)
+    inner = inner[np.argsort(block[source[inner]], kind="stable")]
+    innerOffsets = np.searchsorted(block[source[inner]], np.arange(numBlocks + 1))
+    outer = np.flatnonzero(~internal)
+    outer = outer[np.argsort(block[source[outer]], kind="stable")]
+    outerOffsets = np.searchsorted(block[source[outer]], np.arange(numBlocks + 1))
+
+    for b in range(numBlocks - 1, -1, -1):
+        e = outer[outerOffsets[b]:outerOffsets[b + 1]]
+        np.minimum.at(slack, source[e], slack[target[e]] + gap[e])
+        lo = b * blockSize
+        nodes = topological[lo:lo + blockSize]
+        e = inner[innerOffsets[b]:innerOffsets[b + 1]]
+        if len(e) == 0:
+            continue
+        # Slack when stopping, i.e. not following an edge inside the block
+        base = slack[nodes]
+        # Block local node indices; a node that stops points at itself
+        edgeSource, edgeTarget, edgeGap = rank[source[e]] - lo, rank[target[e]] - lo, gap[e]
+        local = np.arange(len(nodes))
+        follow = local.copy()
+        followGap = np.zeros(len(nodes), dtype=np.int64)
+        chain = isChain[e]
+        follow[edgeSource[chain]] = edgeTarget[chain]
+        followGap[edgeSource[chain]] = edgeGap[chain]
+        while True:
+            end, distance = _followPointers(follow, followGap)
+            value = distance + base[end]
+            candidate = value[edgeTarget] + edgeGap
+            best = base.copy()
+            np.minimum.at(best, edgeSource, candidate)
+            improves = best < value
+            if not np.any(improves):
+                break
+            stop = improves & (best == base)
+            follow[stop] = local[stop]
+            followGap[stop] = 0
+            # One best edge per node that does not stop
+            switch = np.flatnonzero((candidate == best[edgeSource]) & (improves & ~stop)[edgeSource])
+            _, first = np.unique(edgeSource[switch], return_index=True)
+            switch = switch[first]
+            follow[edgeSource[switch]] = edgeTarget[switch]
+            followGap[edgeSource[switch]] = edgeGap[switch]
+        slack[nodes] = value
+    return slack
+
+def _followPointers(pointer: np.ndarray, distance: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Where following pointer from every node ends (at a node pointing at
+    # itself), and the summed distance there, by pointer jumping
+    while True:
+        jumped = pointer[pointer]
+        if np.array_equal(jumped, pointer):
+            return pointer, distance
+        distance = distance + distance[pointer]
+        pointer = jumped
@@ -1,8 +1,12 @@
-from .analysis import CuptiActivityKindKernel
+from __future__ import annotations
+from .analysis import CuptiActivityKindKernel, KernelTable, NsysSqlite
+from .columnar import ColumnarTable
+from .stats import groupLabels
 
 import dataclasses
 from enum import IntEnum
 from math import inf
+import numpy as np
 
 class SMResourceLimitation(IntEnum):
     NONE = 0
@@ -10,6 +14,8 @@ class SMResourceLimitation(IntEnum):
     REGISTERS = 2
     SHARED_MEMORY = 3
     # WARPS = 4 # unnecessary, threads is always an exact factor
+    # Only reported by Device.allocatedBlksPerSm()
+    BLOCKS = 5
 
 @dataclasses.dataclass
 class ComputeCapability:
@@ -18,30 +24,77 @@ class ComputeCapability:
     max_registers_per_sm: int
     max_shmem_per_sm: int
     # max_resident_warps_per_sm: int
+    # Allocation granularity, only used by Device.allocatedBlksPerSm()
+    warp_size: int = 32
+    max_threads_per_blk: int = 1024
+    max_registers_per_thread: int = 255
+    # Registers are allocated per warp, in units of this many
+    register_allocation_unit: int = 256
+    # Warps per SM allowed by the register file are rounded down to a multiple of this
+    warp_allocation_granularity: int = 4
+    shmem_allocation_unit: int = 128
+    # Shared memory the driver reserves for every resident block
+    reserved_shmem_per_blk: int = 1024
+    max_shmem_per_blk: int = 49152
+
+    @property
+    def max_resident_warps_per_sm(self) -> int:
+        return self.max_resident_threads_per_sm // self.warp_size
+
+# Per compute capability limits, from the CUDA programming guide's table of
+# technical specifications and the occupancy calculator. Supporting a new
+# architecture only takes a new entry here.
+COMPUTE_CAPABILITIES: dict[tuple[int, int], ComputeCapability] = {
+    (7, 0): ComputeCapability(32, 2048, 65536, 98304, shmem_allocation_unit=256,
+                              reserved_shmem_per_blk=0, max_shmem_per_blk=98304),
+    (7, 5): ComputeCapability(16, 1024, 65536, 65536, shmem_allocation_unit=256,
+                              reserved_shmem_per_blk=0, max_shmem_per_blk=65536),
+    (8, 0): ComputeCapability(32, 2048, 65536, 167936, max_shmem_per_blk=166912),
+    (8, 6): ComputeCapability(16, 1536, 65536, 102400, max_shmem_per_blk=101376),
+    # Jetson Orin: the 8.0 shared memory but only 48 resident warps (1536
+    # threads) per SM; "Technical Specifications per Compute Capability"
+    # table of the CUDA C++ programming guide
+    (8, 7): ComputeCapability(16, 1536, 65536, 167936, max_shmem_per_blk=166912),
+    (8, 9): ComputeCapability(24, 1536, 65536, 102400, max_shmem_per_blk=101376),
+    (9, 0): ComputeCapability(32, 2048, 65536, 233472, max_shmem_per_blk=232448),
+}
+
+# Device name -> (compute capability major, minor, number of SMs)
+DEVICES: dict[str, tuple[int, int, int]] = {
+    "V100": (7, 0, 80),
+    "T4": (7, 5, 40),
+    "A100": (8, 0, 108),
+    "A30": (8, 0, 56),
+    "A10": (8, 6, 72),
+    "A40": (8, 6, 84),
+    "RTX3090": (8, 6, 82),
+    "L4": (8, 9, 58),
+    "L40S": (8, 9, 142),
+    "RTX4090": (8, 9, 128),
+    "H100": (9, 0, 132),
+}
+
+def computeCapability(major: int, minor: int) -> ComputeCapability:
+    """
+    The registered limits of a compute capability, e.g. computeCapability(8, 6).
+    """
+    try:
+        return dataclasses.replace(COMPUTE_CAPABILITIES[(major, minor)])
+    except KeyError:
+        raise KeyError(
+            f"Unknown compute capability {major}.{minor}; add it to COMPUTE_CAPABILITIES") from None
 
 class CC75(ComputeCapability):
     def __init__(self):
-        self.max_resident_blocks_per_sm = 16
-        # self.max_resident_warps_per_sm = 32
-        self.max_resident_threads_per_sm = 1024
-        self.max_registers_per_sm = 65536
-        self.max_shmem_per_sm = 65536
+        super().__init__(**dataclasses.asdict(COMPUTE_CAPABILITIES[(7, 5)]))
 
 class CC86(ComputeCapability):
     def __init__(self):
-        self.max_resident_blocks_per_sm = 16
-        # self.max_resident_warps_per_sm = 48
-        self.max_resident_threads_per_sm = 1536
-        self.max_registers_per_sm = 65536
-        self.max_shmem_per_sm = 102400
+        super().__init__(**dataclasses.asdict(COMPUTE_CAPABILITIES[(8, 6)]))
 
 class CC89(ComputeCapability):
     def __init__(self):
-        self.max_resident_blocks_per_sm = 24
-        # self.max_resident_warps_per_sm = 48
-        self.max_resident_threads_per_sm = 1536
-        self.max_registers_per_sm = 65536
-        self.max_shmem_per_sm = 102400
+        super().__init__(**dataclasses.asdict(COMPUTE_CAPABILITIES[(8, 9)]))
 
 @dataclasses.dataclass
 class Device:
@@ -54,6 +107,24 @@ class Device:
     def cc(self) -> ComputeCapability:
         return self.compute_capability
 
+    @classmethod
+    def fromComputeCapability(cls, major: int, minor: int, num_sms: int) -> Device:
+        """
+        A device of a registered compute capability (see COMPUTE_CAPABILITIES).
+        """
+        return cls(major, minor, computeCapability(major, minor), num_sms)
+
+    @classmethod
+    def fromName(cls, name: str) -> Device:
+        """
+        A registered device (see DEVICES), e.g. Device.fromName("A100").
+        """
+        try:
+            major, minor, num_sms = DEVICES[name]
+        except KeyError:
+            raise KeyError(f"Unknown device {name!r}; known devices are {sorted(DEVICES)}") from None
+        return cls.fromComputeCapability(major, minor, num_sms)
+
     def maxKernelBlksPerSm(self, kernel: CuptiActivityKindKernel) -> tuple[float, SMResourceLimitation]:
         threads_per_blk = kernel.threads_per_blk
         warps_per_blk = threads_per_blk // 32 + threads_per_blk % 32 != 0
@@ -86,34 +157,394 @@ class Device:
         return numBlocksThatFit, limitedBy
 
     def theoreticalOccupancy(self, kernel: CuptiActivityKindKernel) -> tuple[float, SMResourceLimitation]:
-        # TODO: add docstring that notes that this is an upper bound
-        # Matches the nsys value
+        """
+        Theoretical occupancy of a kernel: the fraction of the SM's resident
+        threads its blocks can fill, given its block size, registers and
+        shared memory. This is an upper bound; it matches the value nsys
+        reports, not the occupancy actually achieved.
+        """
         numBlocksThatFit, limitedBy = self.maxKernelBlksPerSm(kernel)
         occ = numBlocksThatFit * kernel.threads_per_blk / self.cc.max_resident_threads_per_sm
         return occ, limitedBy
 
     def launchOccupancy(self, kernel: CuptiActivityKindKernel) -> float:
-        # TODO: add docstring that notes that this is the occupancy based on the launch grid
+        """
+        Occupancy of a kernel given its launch grid: like
+        theoreticalOccupancy(), but a grid too small to fill every SM with
+        as many blocks as fit only gets its blocks per SM.
+        """
         numBlocksThatFit, _ = self.maxKernelBlksPerSm(kernel)
-        # TODO: kinda ugly, refactor so we don't recalc things..
-        if kernel.totalBlocks > numBlocksThatFit * self.num_sms:
-            return self.theoreticalOccupancy(kernel)[0] # can only go up to the theoretical
-        else:
-            return kernel.totalBlocks * kernel.threads_per_blk / (self.cc.max_resident_threads_per_sm * self.num_sms)
+        # Can only go up to the theoretical
+        blocksPerSm = min(kernel.totalBlocks / self.num_sms, numBlocksThatFit)
+        return blocksPerSm * kernel.threads_per_blk / self.cc.max_resident_threads_per_sm
+
+    @property
+    def _launchConfigCache(self) -> dict[tuple[int, int, int], tuple[int, int]]:
+        # Memoized per set of compute capability limits, so results computed
+        # before the capability was replaced or edited are never served.
+        # Subclasses set their fields in a custom __init__, so create this lazily
+        caches = self.__dict__.setdefault("_configCaches", dict())
+        return caches.setdefault(dataclasses.astuple(self.cc), dict())
+
+    def _computeMaxBlksPerSm(
+        self,
+        threads_per_blk: np.ndarray,
+        registersPerThread: np.ndarray,
+        shmem_per_blk: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # Vectorized maxKernelBlksPerSm(), same precedence of limitations
+        byThreads = self.cc.max_resident_threads_per_sm // threads_per_blk
+        registers_per_blk = registersPerThread * threads_per_blk
+        byRegisters = np.where(
+            registers_per_blk > 0,
+            self.cc.max_registers_per_sm // np.maximum(registers_per_blk, 1),
+            np.iinfo(np.int64).max
+        )
+        byShmem = np.where(
+            shmem_per_blk > 0,
+            self.cc.max_shmem_per_sm // np.maximum(shmem_per_blk, 1),
+            np.iinfo(np.int64).max
+        )
+
+        numBlocksThatFit = byThreads.copy()
+        limitedBy = np.full(len(byThreads), SMResourceLimitation.THREADS, dtype=np.int8)
+
+        mask = byRegisters < numBlocksThatFit
+        numBlocksThatFit[mask] = byRegisters[mask]
+        limitedBy[mask] = SMResourceLimitation.REGISTERS
+
+        mask = byShmem < numBlocksThatFit
+        numBlocksThatFit[mask] = byShmem[mask]
+        limitedBy[mask] = SMResourceLimitation.SHARED_MEMORY
+
+        limitedBy[numBlocksThatFit * threads_per_blk == self.cc.max_resident_threads_per_sm] = SMResourceLimitation.NONE
+        return numBlocksThatFit, limitedBy
+
+    def maxBlksPerSm(
+        self,
+        threads_per_blk: np.ndarray,
+        registersPerThread: np.ndarray,
+        shmem_per_blk: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Batch version of maxKernelBlksPerSm() over arrays of launch configurations.
+
+        Traces tend to repeat a handful of configurations many times, so only the
+        unique configurations are evaluated, and their results are memoized on
+        this device for later calls (keyed by the compute capability's limits
+        too, so changing cc is safe).
+
+        Parameters
+        ----------
+        threads_per_blk : np.ndarray
+            Threads per block of each launch.
+
+        registersPerThread : np.ndarray
+            Registers per thread of each launch.
+
+        shmem_per_blk : np.ndarray
+            Static plus dynamic shared memory per block of each launch, in bytes.
+
+        Returns
+        -------
+        numBlocksThatFit : np.ndarray
+            Maximum number of resident blocks per SM for each launch.
+
+        limitedBy : np.ndarray
+            The SMResourceLimitation value for each launch.
+        """
+        configs = np.stack(np.broadcast_arrays(
+            np.asarray(threads_per_blk, dtype=np.int64),
+            np.asarray(registersPerThread, dtype=np.int64),
+            np.asarray(shmem_per_blk, dtype=np.int64)
+        ), axis=-1).reshape(-1, 3)
+        inverse, first = groupLabels(*configs.T)
+        uniqueConfigs = configs[first]
+
+        cache = self._launchConfigCache
+        keys = [tuple(c) for c in uniqueConfigs.tolist()]
+        missing = [i for i, key in enumerate(keys) if key not in cache]
+        if len(missing) > 0:
+            m = uniqueConfigs[missing]
+            blocks, limits = self._computeMaxBlksPerSm(m[:, 0], m[:, 1], m[:, 2])
+            for i, b, l in zip(missing, blocks.tolist(), limits.tolist()):
+                cache[keys[i]] = (b, l)
+
+        uniqueBlocks = np.array([cache[key][0] for key in keys], dtype=np.int64)
+        uniqueLimits = np.array([cache[key][1] for key in keys], dtype=np.int8)
+        shape = np.shape(configs)[:1]
+        return uniqueBlocks[inverse].reshape(shape), uniqueLimits[inverse].reshape(shape)
+
+    def maxKernelBlksPerSmBatch(self, kernels: KernelTable) -> tuple[np.ndarray, np.ndarray]:
+        """
+        maxKernelBlksPerSm() for every kernel of a KernelTable. See maxBlksPerSm().
+        """
+        return self.maxBlksPerSm(
+            kernels.threads_per_blk,
+            kernels.registersPerThread,
+            kernels.staticSharedMemory + kernels.dynamicSharedMemory
+        )
+
+    def theoreticalOccupancies(self, kernels: KernelTable) -> tuple[np.ndarray, np.ndarray]:
+        """
+        theoreticalOccupancy() for every kernel of a KernelTable.
+
+        Returns
+        -------
+        occ : np.ndarray
+            Theoretical occupancy of each kernel.
+
+        limitedBy : np.ndarray
+            The SMResourceLimitation value for each kernel.
+        """
+        numBlocksThatFit, limitedBy = self.maxKernelBlksPerSmBatch(kernels)
+        occ = numBlocksThatFit * kernels.threads_per_blk / self.cc.max_resident_threads_per_sm
+        return occ, limitedBy
+
+    def launchOccupancies(self, kernels: KernelTable) -> np.ndarray:
+        """
+        launchOccupancy() for every kernel of a KernelTable.
+        """
+        numBlocksThatFit, _ = self.maxKernelBlksPerSmBatch(kernels)
+        blocksPerSm = np.minimum(kernels.totalBlocks / self.num_sms, numBlocksThatFit)
+        return blocksPerSm * kernels.threads_per_blk / self.cc.max_resident_threads_per_sm
+
+    def allocatedBlksPerSm(
+        self,
+        threads_per_blk: np.ndarray,
+        registersPerThread: np.ndarray,
+        shmem_per_blk: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Resident blocks per SM like the CUDA occupancy calculator computes them.
+
+        Unlike maxBlksPerSm(), this models allocation granularity: threads
+        are allocated in whole warps, registers per warp in units of
+        register_allocation_unit (with the warps the register file allows
+        rounded down to warp_allocation_granularity), shared memory in units
+        of shmem_allocation_unit plus the driver's reserved_shmem_per_blk,
+        and the resident block limit also applies. Configurations that
+        cannot launch at all (too many threads, registers or shared memory
+        per block) fit 0 blocks, limited by the offending resource.
+
+        All arguments broadcast against each other, so a whole grid of
+        configurations is evaluated in one call.
+
+        Returns
+        -------
+        numBlocksThatFit : np.ndarray
+            Resident blocks per SM for each configuration.
+
+        limitedBy : np.ndarray
+            The SMResourceLimitation value for each configuration.
+        """
+        cc = self.cc
+        threads, registers, shmem = np.broadcast_arrays(
+            np.asarray(threads_per_blk, dtype=np.int64),
+            np.asarray(registersPerThread, dtype=np.int64),
+            np.asarray(shmem_per_blk, dtype=np.int64)
+        )
+        shape = threads.shape
+        threads, registers, shmem = threads.reshape(-1), registers.reshape(-1), shmem.reshape(-1)
+        unlimited = np.iinfo(np.int64).max
+        warpsPerBlk = np.maximum(-(-threads // cc.warp_size), 1)
+
+        byThreads = cc.max_resident_warps_per_sm // warpsPerBlk
+        unit = cc.register_allocation_unit
+        registersPerWarp = -(-registers * cc.warp_size // unit) * unit
+        warpsByRegisters = cc.max_registers_per_sm // np.maximum(registersPerWarp, 1)
+        warpsByRegisters -= warpsByRegisters % cc.warp_allocation_granularity
+        byRegisters = np.where(registersPerWarp > 0, warpsByRegisters // warpsPerBlk, unlimited)
+        unit = cc.shmem_allocation_unit
+        allocatedShmem = -(-(shmem + cc.reserved_shmem_per_blk) // unit) * unit
+        byShmem = np.where(allocatedShmem > 0, cc.max_shmem_per_sm // np.maximum(allocatedShmem, 1), unlimited)
+
+        # Same precedence of limitations as maxBlksPerSm(), then the block limit
+        numBlocksThatFit = byThreads.copy()
+        limitedBy = np.full(numBlocksThatFit.shape, SMResourceLimitation.THREADS, dtype=np.int8)
+        for limit, resource in (
+            (byRegisters, SMResourceLimitation.REGISTERS),
+            (byShmem, SMResourceLimitation.SHARED_MEMORY),
+            (np.full(numBlocksThatFit.shape, cc.max_resident_blocks_per_sm), SMResourceLimitation.BLOCKS),
+        ):
+            mask = limit < numBlocksThatFit
+            numBlocksThatFit[mask] = limit[mask]
+            limitedBy[mask] = resource
+        limitedBy[numBlocksThatFit * warpsPerBlk == cc.max_resident_warps_per_sm] = SMResourceLimitation.NONE
+
+        for invalid, resource in (
+            ((threads <= 0) | (threads > cc.max_threads_per_blk), SMResourceLimitation.THREADS),
+            ((registers > cc.max_registers_per_thread)
+             | (registersPerWarp * warpsPerBlk > cc.max_registers_per_sm), SMResourceLimitation.REGISTERS),
+            (shmem > cc.max_shmem_per_blk, SMResourceLimitation.SHARED_MEMORY),
+        ):
+            numBlocksThatFit[invalid] = 0
+            limitedBy[invalid] = resource
+        return numBlocksThatFit.reshape(shape), limitedBy.reshape(shape)
+
+    def allocatedOccupancy(
+        self,
+        threads_per_blk: np.ndarray,
+        registersPerThread: np.ndarray,
+        shmem_per_blk: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Theoretical occupancy (resident warps over the maximum) of each
+        configuration, with allocation granularity. See allocatedBlksPerSm().
+        """
+        numBlocksThatFit, limitedBy = self.allocatedBlksPerSm(threads_per_blk, registersPerThread, shmem_per_blk)
+        warpsPerBlk = np.maximum(-(-np.asarray(threads_per_blk, dtype=np.int64) // self.cc.warp_size), 1)
+        return numBlocksThatFit * warpsPerBlk / self.cc.max_resident_warps_per_sm, limitedBy
+
+    def occupancySweep(
+        self,
+        kernels: KernelTable,
+        blockSizes: list[int] | np.ndarray | None = None,
+        registersPerThread: list[int] | np.ndarray | None = None,
+        sharedMemory: list[int] | np.ndarray | None = None,
+        scaleSharedMemory: bool = False,
+        top: int | None = 5,
+        onlyImprovements: bool = True,
+        nameColumn: str = "shortName",
+        db: NsysSqlite | None = None
+    ) -> ColumnarTable:
+        """
+        What-if occupancy of every distinct kernel under other launch configurations.
+
+        Each distinct (name, threads per block, registers per thread, shared
+        memory per block) of the trace is evaluated against every combination
+        of the candidate values, all in one vectorized allocatedBlksPerSm()
+        call, and the candidates are ranked by the occupancy they would reach.
+
+        Parameters
+        ----------
+        kernels : KernelTable
+            The kernels, e.g. from getKernelsBetween(columnar=True).
+
+        blockSizes : list[int] | np.ndarray | None
+            Candidate threads per block. Defaults to None, which uses every
+            multiple of the warp size up to max_threads_per_blk.
+
+        registersPerThread : list[int] | np.ndarray | None
+            Candidate registers per thread (e.g. from __launch_bounds__ or
+            -maxrregcount). Defaults to None, which keeps each kernel's own.
+
+        sharedMemory : list[int] | np.ndarray | None
+            Candidate shared memory per block, in bytes. Defaults to None,
+            which keeps each kernel's own.
+
+        scaleSharedMemory : bool
+            When keeping a kernel's own shared memory, scale it with the
+            candidate block size, for kernels whose shared memory is per
+            thread. Defaults to False.
+
+        top : int | None
+            Keep at most this many candidates per kernel. Defaults to 5;
+            None keeps all.
+
+        onlyImprovements : bool
+            Only keep candidates with a higher occupancy than the launched
+            configuration. Defaults to True.
+
+        nameColumn : str
+            Name column identifying a kernel. Defaults to 'shortName'.
+
+        db : NsysSqlite | None
+            If given, a 'name' column with the resolved names is added.
+            Defaults to None.
+
+        Returns
+        -------
+        sweep : ColumnarTable
+            One row per (kernel, candidate), kernels by descending total
+            time, then candidates by rank (highest occupancy first; ties
+            prefer the candidate closest to the launched block size, then
+            more registers and shared memory). Columns: the name column,
+            blockSize, registersPerThread, sharedMemory, count, totalTime,
+            occupancy and limitedBy (as launched), then rank,
+            candidateBlockSize, candidateRegistersPerThread,
+            candidateSharedMemory, candidateOccupancy, candidateLimitedBy
+            and gain (candidateOccupancy - occupancy).
+        """
+        cc = self.cc
+        configs = np.column_stack((
+            kernels[nameColumn], kernels.threads_per_blk, kernels.registersPerThread,
+            kernels.staticSharedMemory + kernels.dynamicSharedMemory
+        )).astype(np.int64).reshape(-1, 4)
+        inverse, first = groupLabels(*configs.T)
+        distinct = configs[first]
+        count = np.bincount(inverse, minlength=len(distinct))
+        totalTime = np.bincount(inverse, weights=kernels.duration, minlength=len(distinct)).astype(np.int64)
+        names, threads, registers, shmem = distinct.T
+        occupancy, limitedBy = self.allocatedOccupancy(threads, registers, shmem)
+
+        # Candidate grid; -1 stands for "as launched"
+        if blockSizes is None:
+            blockSizes = np.arange(cc.warp_size, cc.max_threads_per_blk + 1, cc.warp_size)
+        gridThreads, gridRegisters, gridShmem = (g.reshape(-1) for g in np.meshgrid(
+            np.asarray(blockSizes, dtype=np.int64),
+            np.asarray([-1] if registersPerThread is None else registersPerThread, dtype=np.int64),
+            np.asarray([-1] if sharedMemory is None else sharedMemory, dtype=np.int64),
+            indexing="ij"
+        ))
+        candThreads = np.broadcast_to(gridThreads[None, :], (len(distinct), len(gridThreads)))
+        candRegisters = np.where(gridRegisters[None, :] < 0, registers[:, None], gridRegisters[None, :])
+        ownShmem = shmem[:, None]
+        if scaleSharedMemory:
+            ownShmem = -(-ownShmem * candThreads // np.maximum(threads[:, None], 1))
+        candShmem = np.where(gridShmem[None, :] < 0, ownShmem, gridShmem[None, :])
+        candOccupancy, candLimitedBy = self.allocatedOccupancy(candThreads, candRegisters, candShmem)
+
+        # Rank within each kernel
+        kernel = np.broadcast_to(np.arange(len(distinct))[:, None], candThreads.shape)
+        order = np.lexsort((
+            -candShmem.reshape(-1), -candRegisters.reshape(-1),
+            np.abs(candThreads - threads[:, None]).reshape(-1),
+            -candOccupancy.reshape(-1), kernel.reshape(-1)
+        ))
+        keep = np.ones(len(order), dtype=bool)
+        if onlyImprovements:
+            keep &= (candOccupancy - occupancy[:, None]).reshape(-1)[order] > 0
+        order = order[keep]
+        owner = kernel.reshape(-1)[order]
+        # Rank = position within the kernel's run of kept candidates
+        runStart = np.concatenate(([0], np.flatnonzero(np.diff(owner)) + 1))
+        rank = np.arange(len(order)) - np.repeat(runStart, np.diff(np.concatenate((runStart, [len(order)]))))
+        if top is not None:
+            order = order[rank < top]
+            owner = owner[rank < top]
+            rank = rank[rank < top]
+        # Kernels by descending total time, keeping the candidate order
+        byTime = np.lexsort((rank, -totalTime[owner]))
+        order, owner, rank = order[byTime], owner[byTime], rank[byTime]
+
+        columns = {
+            nameColumn: names[owner],
+            "blockSize": threads[owner],
+            "registersPerThread": registers[owner],
+            "sharedMemory": shmem[owner],
+            "count": count[owner],
+            "totalTime": totalTime[owner],
+            "occupancy": occupancy[owner],
+            "limitedBy": limitedBy[owner],
+            "rank": rank,
+            "candidateBlockSize": candThreads.reshape(-1)[order],
+            "candidateRegistersPerThread": candRegisters.reshape(-1)[order],
+            "candidateSharedMemory": candShmem.reshape(-1)[order],
+            "candidateOccupancy": candOccupancy.reshape(-1)[order],
+            "candidateLimitedBy": candLimitedBy.reshape(-1)[order],
+            "gain": candOccupancy.reshape(-1)[order] - occupancy[owner],
+        }
+        if db is not None:
+            columns["name"] = db.resolveStringColumn(columns[nameColumn])
+        return ColumnarTable(columns)
 
 class A10(Device):
     def __init__(self):
-        self.ver_major = 8
-        self.ver_minor = 6
+        self.ver_major, self.ver_minor, self.num_sms = DEVICES["A10"]
         self.compute_capability = CC86()
-        self.num_sms = 72
 
 class L4(Device):
     def __init__(self):
-        self.ver_major = 8
-        self.ver_minor = 9
+        self.ver_major, self.ver_minor, self.num_sms = DEVICES["L4"]
         self.compute_capability = CC89()
-        self.num_sms = 58
-
-
-
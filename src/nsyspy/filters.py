@@ -3,6 +3,8 @@ from .analysis import CuptiActivityKindKernel
 def filterKernelsByStream(kernels: list[CuptiActivityKindKernel]) -> dict[int, CuptiActivityKindKernel]:
     """
     Filters a list of kernels into separate lists corresponding to streams.
+    To do this in SQL without loading other kernels, see
+    NsysSqlite.kernels().groupByStream().
 
     Parameters
     ----------
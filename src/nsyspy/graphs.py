@@ -0,0 +1,256 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .analysis import NsysSqlite, KernelTable
+
+import dataclasses
+import numpy as np
+
+from .columnar import ColumnarTable
+from .intervals import mergeIntervals, reduceSegments
+from .stats import groupedSummary, groupLabels
+
+@dataclasses.dataclass
+class GraphLaunches:
+    """
+    Kernels of CUDA Graph launches, grouped per launch and per graph node.
+
+    launches has one row per graph launch, in start order, with columns
+    globalPid, graphId, correlationId (of the cudaGraphLaunch call), kernels,
+    start, end, span, busy (union of kernel intervals), idle (span - busy),
+    gaps (number of idle gaps inside the launch) and longestGap.
+
+    nodes has one row per (globalPid, graphId, graphNodeId), with columns
+    globalPid, graphId, graphNodeId, shortName, the duration statistics of
+    stats.groupedSummary() over the node's launches (count, total, min, max,
+    mean, stddev and percentiles), and how much the node drives the tail of
+    its graph's span:
+
+    - varianceShare: cov(node duration, launch span) / var(launch span).
+      Over all nodes of a graph these add up to about 1 when the nodes run
+      one after the other, so a node near 1 explains the launch to launch
+      jitter by itself.
+    - tailExcess: mean duration in the tail launches (span at or above the
+      tailPercentile of the graph) minus the mean over all launches.
+    - tailShare: tailExcess over the same excess of the span.
+    - dominant: True for the fewest nodes, by descending tailShare, that
+      together account for at least the coverage fraction of the tail excess.
+
+    launchOfKernel maps rows of kernels to rows of launches (-1 for kernels
+    not launched from a graph).
+    """
+    kernels: KernelTable
+    launches: ColumnarTable
+    nodes: ColumnarTable
+    launchOfKernel: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.launches)
+
+    def summarize(self, percentiles: list[float] | tuple[float, ...] = (50, 90, 99)) -> ColumnarTable:
+        """
+        Span statistics per graph.
+
+        Returns
+        -------
+        summary : ColumnarTable
+            One row per graph (by globalPid, graphId), by descending total
+            span, with the columns of stats.groupedSummary() for the span,
+            plus globalPid, graphId, nodes, busy and idle (both summed).
+        """
+        launches = self.launches
+        graph, first = groupLabels(launches.globalPid, launches.graphId)
+        summary = groupedSummary(graph, launches.span, percentiles, keyName="graph")
+        graphs = summary.graph
+        nodeGraph = groupLabels(self.nodes.globalPid, self.nodes.graphId)[0]
+        # Nodes are sorted by (globalPid, graphId) as well, so the labels agree
+        columns = {
+            "globalPid": launches.globalPid[first][graphs],
+            "graphId": launches.graphId[first][graphs],
+            "nodes": np.bincount(nodeGraph, minlength=len(first))[graphs],
+        }
+        columns.update((name, col) for name, col in summary.columns.items() if name != "graph")
+        columns["busy"] = np.bincount(graph, weights=launches.busy, minlength=len(first)).astype(np.int64)[graphs]
+        columns["idle"] = np.bincount(graph, weights=launches.idle, minlength=len(first)).astype(np.int64)[graphs]
+        return ColumnarTable(columns)
+
+    def dominantNodes(self, db: NsysSqlite | None = None) -> ColumnarTable:
+        """
+        The nodes flagged as dominating their graph's tail latency, by
+        descending tailShare, with names resolved if db is given.
+        """
+        nodes = self.nodes[np.flatnonzero(self.nodes.dominant)]
+        nodes = nodes[np.argsort(-nodes.tailShare, kind="stable")]
+        if db is not None:
+            nodes.columns["name"] = db.resolveStringColumn(nodes.shortName)
+        return nodes
+
+def analyzeGraphLaunches(
+    kernels: KernelTable,
+    tailPercentile: float = 90,
+    coverage: float = 0.8,
+    percentiles: list[float] | tuple[float, ...] = (50, 90, 99)
+) -> GraphLaunches:
+    """
+    Groups the kernels of CUDA Graph launches into launches and nodes.
+
+    All kernels of one graph launch carry the correlationId of its
+    cudaGraphLaunch call, so a launch is a distinct (globalPid, graphId,
+    correlationId), and a node a distinct (globalPid, graphId, graphNodeId).
+    Both are found with one sort, and every per launch and per node figure
+    is a segmented reduction over it, so the cost does not depend on the
+    number of graphs, launches or nodes.
+
+    Parameters
+    ----------
+    kernels : KernelTable
+        The kernels, e.g. from getKernelsBetween(columnar=True). Kernels
+        without a graphId (or with graphId 0) are ignored.
+
+    tailPercentile : float
+        Launches whose span is at or above this percentile of their graph's
+        spans make up the tail. Defaults to 90.
+
+    coverage : float
+        Fraction of the tail excess the dominant nodes must account for.
+        Defaults to 0.8.
+
+    percentiles : list[float] | tuple[float, ...]
+        Percentiles of the node durations. Defaults to (50, 90, 99).
+
+    Returns
+    -------
+    graphLaunches : GraphLaunches
+        See GraphLaunches.
+    """
+    if "graphId" not in kernels:
+        raise KeyError("Could not find column: 'graphId'; the export is likely too old to record CUDA Graph launches.")
+    inGraph = np.flatnonzero(~kernels.nullMask("graphId") & (kernels.graphId != 0))
+    launchOfKernel = np.full(len(kernels), -1, dtype=np.int64)
+    pid = kernels.globalPid[inGraph]
+    graphId = kernels.graphId[inGraph]
+    start = kernels.start[inGraph]
+    end = kernels.end[inGraph]
+    duration = end - start
+
+    # Launches
+    launch, first = groupLabels(pid, graphId, kernels.correlationId[inGraph])
+    numLaunches = len(first)
+    mStart, mEnd, mLaunch = mergeIntervals(start, end, launch)
+    pieces = np.bincount(mLaunch, minlength=numLaunches)
+    busy = np.bincount(mLaunch, weights=mEnd - mStart, minlength=numLaunches).astype(np.int64)
+    # Merged pieces are sorted by launch, then start; gaps lie between
+    # consecutive pieces of the same launch
+    inside = np.flatnonzero(mLaunch[1:] == mLaunch[:-1])
+    longestGap = np.zeros(numLaunches, dtype=np.int64)
+    np.maximum.at(longestGap, mLaunch[inside], mStart[inside + 1] - mEnd[inside])
+
+    offsets = np.zeros(numLaunches + 1, dtype=np.int64)
+    np.cumsum(np.bincount(launch, minlength=numLaunches), out=offsets[1:])
+    byLaunch = np.argsort(launch, kind="stable")
+    launchStart = reduceSegments(np.minimum, start[byLaunch], offsets)
+    launchEnd = reduceSegments(np.maximum, end[byLaunch], offsets)
+    span = launchEnd - launchStart
+
+    # Launches in start order
+    inStartOrder = np.argsort(launchStart, kind="stable")
+    rank = np.empty(numLaunches, dtype=np.int64)
+    rank[inStartOrder] = np.arange(numLaunches)
+    launchOfKernel[inGraph] = rank[launch]
+    launches = ColumnarTable({
+        "globalPid": pid[first],
+        "graphId": graphId[first],
+        "correlationId": kernels.correlationId[inGraph][first],
+        "kernels": np.diff(offsets),
+        "start": launchStart,
+        "end": launchEnd,
+        "span": span,
+        "busy": busy,
+        "idle": span - busy,
+        "gaps": np.maximum(pieces - 1, 0),
+        "longestGap": longestGap,
+    })[inStartOrder]
+
+    # Nodes, with their duration statistics over launches
+    node, nodeFirst = groupLabels(pid, graphId, kernels.graphNodeId[inGraph])
+    numNodes = len(nodeFirst)
+    summary = groupedSummary(node, duration, percentiles, keyName="node")
+    stats = summary[np.argsort(summary.node, kind="stable")]
+
+    # Tail attribution: each kernel row pairs a node duration with the span
+    # of the launch it ran in
+    graph, graphFirst = groupLabels(pid, graphId)
+    numGraphs = len(graphFirst)
+    launchGraph = graph[first]
+    nodeGraph = graph[nodeFirst]
+    kernelSpan = span[launch].astype(np.float64)
+
+    def perNode(values):
+        return np.bincount(node, weights=values, minlength=numNodes)
+
+    def perGraph(values):
+        return np.bincount(launchGraph, weights=values, minlength=numGraphs)
+
+    launchesPerGraph = np.bincount(launchGraph, minlength=numGraphs)
+    meanSpan = perGraph(span) / np.maximum(launchesPerGraph, 1)
+    spanVariance = perGraph((span - meanSpan[launchGraph]) ** 2) / np.maximum(launchesPerGraph, 1)
+    count = np.bincount(node, minlength=numNodes)
+    meanDuration = perNode(duration) / np.maximum(count, 1)
+    covariance = perNode(
+        (duration - meanDuration[node]) * (kernelSpan - meanSpan[graph])) / np.maximum(count, 1)
+
+    threshold = _groupPercentile(span, launchGraph, numGraphs, tailPercentile)
+    inTail = span >= threshold[launchGraph]
+    tailLaunches = perGraph(inTail)
+    spanExcess = perGraph(np.where(inTail, span, 0)) / np.maximum(tailLaunches, 1) - meanSpan
+    kernelInTail = inTail[launch]
+    tailCount = np.bincount(node[kernelInTail], minlength=numNodes)
+    tailMean = perNode(np.where(kernelInTail, duration, 0)) / np.maximum(tailCount, 1)
+    tailExcess = np.where(tailCount > 0, tailMean - meanDuration, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        varianceShare = np.where(spanVariance[nodeGraph] > 0, covariance / spanVariance[nodeGraph], 0.0)
+        tailShare = np.where(spanExcess[nodeGraph] > 0, tailExcess / spanExcess[nodeGraph], 0.0)
+
+    # Fewest nodes per graph, by descending tail share, reaching coverage
+    byShare = np.lexsort((-tailShare, nodeGraph))
+    sortedShare = np.maximum(tailShare[byShare], 0)
+    cumulative = np.cumsum(sortedShare)
+    graphStart = np.searchsorted(nodeGraph[byShare], np.arange(numGraphs))
+    before = cumulative - sortedShare - (cumulative - sortedShare)[graphStart][nodeGraph[byShare]]
+    dominant = np.zeros(numNodes, dtype=bool)
+    dominant[byShare] = (sortedShare > 0) & (before < coverage)
+
+    columns = {
+        "globalPid": pid[nodeFirst],
+        "graphId": graphId[nodeFirst],
+        "graphNodeId": kernels.graphNodeId[inGraph][nodeFirst],
+        "shortName": kernels.shortName[inGraph][nodeFirst],
+    }
+    columns.update((name, col) for name, col in stats.columns.items() if name != "node")
+    columns["varianceShare"] = varianceShare
+    columns["tailExcess"] = tailExcess
+    columns["tailShare"] = tailShare
+    columns["dominant"] = dominant
+    return GraphLaunches(
+        kernels=kernels,
+        launches=launches,
+        nodes=ColumnarTable(columns),
+        launchOfKernel=launchOfKernel,
+    )
+
+def _groupPercentile(values: np.ndarray, groups: np.ndarray, numGroups: int, q: float) -> np.ndarray:
+    # Percentile (linear interpolation, as np.percentile) of values per group
+    out = np.full(numGroups, np.nan)
+    if len(values) == 0:
+        return out
+    order = np.lexsort((values, groups))
+    sortedValues = values[order].astype(np.float64)
+    count = np.bincount(groups, minlength=numGroups)
+    first = np.cumsum(count) - count
+    present = count > 0
+    position = first[present] + q / 100 * (count[present] - 1)
+    below = np.floor(position).astype(np.int64)
+    above = np.minimum(below + 1, (first + count - 1)[present])
+    weight = position - below
+    out[present] = sortedValues[below] * (1 - weight) + sortedValues[above] * weight
+    return out
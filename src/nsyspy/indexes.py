@@ -0,0 +1,128 @@
+from __future__ import annotations
+import dataclasses
+import os
+import sqlite3
+
+@dataclasses.dataclass
+class IndexSpec:
+    """
+    An index that nsyspy queries benefit from, but which nsys does not create.
+    """
+    name: str
+    table: str
+    columns: list[str]
+
+    def createStatement(self, schema: str = "main") -> str:
+        cols = ", ".join(f'"{c}"' for c in self.columns)
+        return f'create index if not exists {schema}."{self.name}" on "{self.table}" ({cols})'
+
+INDEX_SPECS = [
+    IndexSpec("nsyspy_kernel_start_end", "CUPTI_ACTIVITY_KIND_KERNEL", ["start", "end"]),
+    IndexSpec("nsyspy_kernel_correlationId", "CUPTI_ACTIVITY_KIND_KERNEL", ["correlationId"]),
+    IndexSpec("nsyspy_kernel_shortName", "CUPTI_ACTIVITY_KIND_KERNEL", ["shortName"]),
+    IndexSpec("nsyspy_kernel_demangledName", "CUPTI_ACTIVITY_KIND_KERNEL", ["demangledName"]),
+    IndexSpec("nsyspy_runtime_start_end", "CUPTI_ACTIVITY_KIND_RUNTIME", ["start", "end"]),
+    IndexSpec("nsyspy_runtime_correlationId", "CUPTI_ACTIVITY_KIND_RUNTIME", ["correlationId"]),
+    IndexSpec("nsyspy_nvtx_start_end", "NVTX_EVENTS", ["start", "end"]),
+    IndexSpec("nsyspy_memcpy_start_end", "CUPTI_ACTIVITY_KIND_MEMCPY", ["start", "end"]),
+    IndexSpec("nsyspy_memset_start_end", "CUPTI_ACTIVITY_KIND_MEMSET", ["start", "end"]),
+]
+
+SIDECAR_SCHEMA = "nsyspy_idx"
+
+def defaultSidecarPath(dbpath: str) -> str:
+    return os.path.splitext(dbpath)[0] + ".nsyspy-idx.sqlite"
+
+def sourceStamp(dbpath: str) -> str:
+    """
+    Cheap fingerprint of a database file, used to invalidate derived files.
+    """
+    st = os.stat(dbpath)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+def leadingIndexColumns(con: sqlite3.Connection, table: str, schema: str = "main") -> list[tuple[str, ...]]:
+    """
+    Lists the column tuples of every index on a table, in index order.
+    """
+    results = list()
+    for idx in con.execute(f'pragma {schema}.index_list("{table}")').fetchall():
+        cols = con.execute(f'pragma {schema}.index_info("{idx[1]}")').fetchall()
+        results.append(tuple(c[2] for c in sorted(cols, key=lambda c: c[0])))
+    return results
+
+def hasIndexFor(con: sqlite3.Connection, spec: IndexSpec, schema: str = "main") -> bool:
+    """
+    True if some index on the table (not necessarily ours) starts with the spec's columns.
+    """
+    n = len(spec.columns)
+    return any(
+        cols[:n] == tuple(spec.columns)
+        for cols in leadingIndexColumns(con, spec.table, schema)
+    )
+
+def sidecarColumns(table: str) -> list[str]:
+    """
+    Columns mirrored into the sidecar for a table; the union of its index specs.
+    """
+    columns = list()
+    for spec in INDEX_SPECS:
+        if spec.table == table:
+            columns.extend(c for c in spec.columns if c not in columns)
+    return columns
+
+def buildSidecar(con: sqlite3.Connection, tables: list[str], stamp: str):
+    """
+    Mirrors the filter columns of each table (keyed by the source rowid) into the
+    attached sidecar schema and indexes them there. The source is not modified.
+    """
+    s = SIDECAR_SCHEMA
+    con.execute(f"create table if not exists {s}.nsyspy_meta (key text primary key, value text)")
+    for table in tables:
+        columns = sidecarColumns(table)
+        quoted = ", ".join(f'"{c}"' for c in columns)
+        con.execute(f'drop table if exists {s}."{table}"')
+        con.execute(
+            f'create table {s}."{table}" (id integer primary key, '
+            + ", ".join(f'"{c}" integer' for c in columns) + ")"
+        )
+        con.execute(
+            f'insert into {s}."{table}" (id, {quoted}) select rowid, {quoted} from main."{table}"'
+        )
+        for spec in INDEX_SPECS:
+            if spec.table == table:
+                con.execute(spec.createStatement(s))
+    con.execute(f"insert or replace into {s}.nsyspy_meta values ('source', ?)", (stamp,))
+    con.commit()
+
+def sidecarIsValid(con: sqlite3.Connection, stamp: str, tables: list[str] = ()) -> bool:
+    """
+    True if the attached sidecar was built from this version of the export
+    and mirrors all of the given tables.
+    """
+    try:
+        row = con.execute(
+            f"select value from {SIDECAR_SCHEMA}.nsyspy_meta where key = 'source'"
+        ).fetchone()
+        mirrored = {
+            r[0] for r in con.execute(f"select name from {SIDECAR_SCHEMA}.sqlite_master where type = 'table'")
+        }
+    except sqlite3.OperationalError:
+        return False
+    return row is not None and row[0] == stamp and set(tables) <= mirrored
+
+def fullScans(plan: list[str]) -> list[str]:
+    """
+    Picks out the steps of an EXPLAIN QUERY PLAN that scan a whole table
+    without the help of any index.
+    """
+    return [
+        detail for detail in plan
+        if detail.startswith("SCAN") and "USING" not in detail
+        and "CONSTANT ROW" not in detail
+    ]
+
+def usesIndex(plan: list[str]) -> bool:
+    """
+    True if no step of an EXPLAIN QUERY PLAN is a bare table scan.
+    """
+    return len(fullScans(plan)) == 0
@@ -0,0 +1,230 @@
+from __future__ import annotations
+import dataclasses
+import sqlite3
+import sys
+import time
+from collections.abc import Callable
+
+from . import indexes
+
+@dataclasses.dataclass
+class QueryRecord:
+    """
+    Measurements of one SQL statement executed by NsysSqlite.
+
+    seconds covers executing the statement and fetching its rows;
+    constructSeconds is the time spent turning the rows into dataclasses
+    or columnar tables, excluding any fetching done meanwhile.
+    """
+    statement: str
+    params: tuple
+    seconds: float = 0.0
+    rows: int = 0
+    bytes: int = 0
+    constructSeconds: float = 0.0
+    plan: list[str] = dataclasses.field(default_factory=list)
+
+    @property
+    def totalSeconds(self) -> float:
+        return self.seconds + self.constructSeconds
+
+    @property
+    def fullScans(self) -> list[str]:
+        """
+        Steps of the query plan that scan a whole table without an index.
+        """
+        return indexes.fullScans(self.plan)
+
+class QueryProfiler:
+    """
+    Collects a QueryRecord for every statement an NsysSqlite executes while
+    instrumentation is enabled. See NsysSqlite.enableInstrumentation().
+    """
+    def __init__(
+        self,
+        callback: Callable[[QueryRecord], None] | None = None,
+        explain: bool = True,
+        measureBytes: bool = True
+    ):
+        """
+        Parameters
+        ----------
+        callback : Callable[[QueryRecord], None] | None
+            Called with each record once its cursor is closed, e.g. to
+            forward it to other telemetry. Defaults to None.
+
+        explain : bool
+            Record the EXPLAIN QUERY PLAN of each distinct statement.
+            Defaults to True.
+
+        measureBytes : bool
+            Record the in-memory size of the fetched rows. This walks every
+            value, so it slows down large fetches. Defaults to True.
+        """
+        self.records: list[QueryRecord] = list()
+        self.callback = callback
+        self.explain = explain
+        self.measureBytes = measureBytes
+        self._plans: dict[str, list[str]] = dict()
+
+    def _finish(self, record: QueryRecord):
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def clear(self):
+        self.records.clear()
+
+    @property
+    def totalSeconds(self) -> float:
+        return sum(r.totalSeconds for r in self.records)
+
+    def slowest(self, n: int = 10) -> list[QueryRecord]:
+        """
+        The n records with the largest totalSeconds, slowest first.
+        """
+        return sorted(self.records, key=lambda r: r.totalSeconds, reverse=True)[:n]
+
+    def fullScans(self) -> list[QueryRecord]:
+        """
+        Records of statements whose plan has at least one full table scan.
+        """
+        return [r for r in self.records if len(r.fullScans) > 0]
+
+    def byStatement(self) -> dict[str, QueryRecord]:
+        """
+        Records summed per distinct statement text (params are dropped).
+        """
+        totals = dict()
+        for r in self.records:
+            total = totals.get(r.statement)
+            if total is None:
+                total = totals[r.statement] = QueryRecord(r.statement, (), plan=r.plan)
+            total.seconds += r.seconds
+            total.rows += r.rows
+            total.bytes += r.bytes
+            total.constructSeconds += r.constructSeconds
+        return totals
+
+    def report(self, top: int = 10) -> str:
+        """
+        Human readable summary: totals, the top slowest statements
+        (aggregated over repeats) and full table scan warnings.
+        """
+        lines = [
+            f"{len(self.records)} queries, {self.totalSeconds:.3f}s total "
+            f"({sum(r.seconds for r in self.records):.3f}s sql, "
+            f"{sum(r.constructSeconds for r in self.records):.3f}s construction), "
+            f"{sum(r.rows for r in self.records)} rows, "
+            f"{sum(r.bytes for r in self.records) / 2**20:.1f} MiB"
+        ]
+        counts = dict()
+        for r in self.records:
+            counts[r.statement] = counts.get(r.statement, 0) + 1
+        grouped = sorted(self.byStatement().values(), key=lambda r: r.totalSeconds, reverse=True)
+        lines.append(f"Top {min(top, len(grouped))} statements by time:")
+        for r in grouped[:top]:
+            lines.append(
+                f"  {r.totalSeconds:9.3f}s  x{counts[r.statement]:<5} {r.rows:>10} rows  "
+                f"{r.constructSeconds:7.3f}s construct  {_shorten(r.statement)}"
+            )
+        scans = [r for r in grouped if len(r.fullScans) > 0]
+        if scans:
+            lines.append("Full table scans:")
+            for r in scans:
+                lines.append(f"  {', '.join(r.fullScans)}  in  {_shorten(r.statement)}")
+        return "\n".join(lines)
+
+def _shorten(statement: str, width: int = 100) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= width else statement[:width - 3] + "..."
+
+class InstrumentedCursor:
+    """
+    Wraps an sqlite3.Cursor, timing and counting everything fetched through it.
+    The record is handed to the profiler when the cursor is closed.
+    """
+    def __init__(self, cursor: sqlite3.Cursor, record: QueryRecord, profiler: QueryProfiler):
+        self._cursor = cursor
+        self.record = record
+        self._profiler = profiler
+        self._finished = False
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _count(self, rows: list) -> list:
+        self.record.rows += len(rows)
+        if self._profiler.measureBytes:
+            self.record.bytes += sum(
+                sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row) for row in rows
+            )
+        return rows
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = self._cursor.fetchone()
+        self.record.seconds += time.perf_counter() - t0
+        if row is not None:
+            self._count([row])
+        return row
+
+    def fetchmany(self, size: int | None = None) -> list:
+        t0 = time.perf_counter()
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        self.record.seconds += time.perf_counter() - t0
+        return self._count(rows)
+
+    def fetchall(self) -> list:
+        t0 = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self.record.seconds += time.perf_counter() - t0
+        return self._count(rows)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._cursor.close()
+        if not self._finished:
+            self._finished = True
+            self._profiler._finish(self.record)
+
+    def __del__(self):
+        if not self._finished:
+            self._finished = True
+            self._profiler._finish(self.record)
+
+    def constructing(self) -> _Construction:
+        """
+        Context manager timing the construction of objects from fetched rows.
+        """
+        return _Construction(self.record)
+
+class _Construction:
+    def __init__(self, record: QueryRecord):
+        self._record = record
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._fetched = self._record.seconds
+
+    def __exit__(self, type, value, traceback):
+        elapsed = time.perf_counter() - self._start
+        # Exclude fetches made inside the block; they were already counted
+        self._record.constructSeconds += elapsed - (self._record.seconds - self._fetched)
+
+class _NoConstruction:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, type, value, traceback):
+        pass
+
+NO_CONSTRUCTION = _NoConstruction()
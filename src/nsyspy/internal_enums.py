@@ -23,3 +23,18 @@ class EnumCudaKernelLaunchType(EnumIdNameLabel):
         self.CUDA_KERNEL_LAUNCH_TYPE_REGULAR = 1
         self.CUDA_KERNEL_LAUNCH_TYPE_COOPERATIVE_SINGLE_DEVICE = 2
         self.CUDA_KERNEL_LAUNCH_TYPE_COOPERATIVE_MULTI_DEVICE = 3
+
+class EnumCudaMemcpyOper(EnumIdNameLabel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.CUDA_MEMCPY_KIND_UNKNOWN = 0
+        self.CUDA_MEMCPY_KIND_HTOD = 1
+        self.CUDA_MEMCPY_KIND_DTOH = 2
+        self.CUDA_MEMCPY_KIND_HTOA = 3
+        self.CUDA_MEMCPY_KIND_ATOH = 4
+        self.CUDA_MEMCPY_KIND_ATOA = 5
+        self.CUDA_MEMCPY_KIND_ATOD = 6
+        self.CUDA_MEMCPY_KIND_DTOA = 7
+        self.CUDA_MEMCPY_KIND_DTOD = 8
+        self.CUDA_MEMCPY_KIND_HTOH = 9
+        self.CUDA_MEMCPY_KIND_PTOP = 10
@@ -0,0 +1,171 @@
+from __future__ import annotations
+import numpy as np
+
+# Vectorized helpers for sets of [start, end) intervals, optionally split into
+# independent segments (e.g. one segment per NVTX range, device or stream).
+
+def mergeIntervals(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    segments: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Merges overlapping (or touching) intervals, separately within each segment.
+
+    Parameters
+    ----------
+    starts : np.ndarray
+        Interval start times.
+
+    ends : np.ndarray
+        Interval end times.
+
+    segments : np.ndarray | None
+        Non-negative integer segment label of each interval.
+        Intervals in different segments are never merged.
+        Defaults to None, which places everything in segment 0.
+
+    Returns
+    -------
+    mergedStarts : np.ndarray
+        Start of each merged interval.
+
+    mergedEnds : np.ndarray
+        End of each merged interval.
+
+    mergedSegments : np.ndarray
+        Segment of each merged interval. Output is sorted by segment, then start.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    n = len(starts)
+    if segments is None:
+        segments = np.zeros(n, dtype=np.int64)
+    segments = np.asarray(segments, dtype=np.int64)
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty.copy(), empty.copy()
+
+    # Shift each segment into its own disjoint key range; a single running
+    # maximum then never leaks across segments
+    lo = min(int(np.min(starts)), int(np.min(ends)))
+    width = max(int(np.max(starts)), int(np.max(ends))) - lo + 1
+    if (int(np.max(segments)) + 1) * width < 2**62:
+        keyS = segments * width + (starts - lo)
+        order = np.argsort(keyS)
+        s = starts[order]
+        e = ends[order]
+        g = segments[order]
+        keyS = keyS[order]
+        keyE = g * width + (e - lo)
+    else:
+        order = np.lexsort((starts, segments))
+        s = starts[order]
+        e = ends[order]
+        g = segments[order]
+        # Too wide to shift directly: replace times by their rank among all
+        # boundaries first, so the keys cannot overflow
+        boundaries = np.sort(np.concatenate((s, e)))
+        # Deduplicate by hand; np.unique hashes integers, which is far slower here
+        boundaries = boundaries[np.concatenate(([True], boundaries[1:] != boundaries[:-1]))]
+        width = len(boundaries)
+        keyS = g * width + np.searchsorted(boundaries, s)
+        keyE = g * width + np.searchsorted(boundaries, e)
+    runningEnd = np.maximum.accumulate(keyE)
+
+    newPiece = np.empty(n, dtype=bool)
+    newPiece[0] = True
+    newPiece[1:] = keyS[1:] > runningEnd[:-1]
+    first = np.flatnonzero(newPiece)
+
+    return s[first], np.maximum.reduceat(e, first), g[first]
+
+def unionLength(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    segments: np.ndarray | None = None,
+    numSegments: int | None = None
+) -> int | np.ndarray:
+    """
+    Total time covered by at least one interval (i.e. busy time).
+
+    Returns a single integer if segments is None, otherwise an array
+    of length numSegments (defaults to max(segments) + 1).
+    """
+    mStarts, mEnds, mSegs = mergeIntervals(starts, ends, segments)
+    if segments is None:
+        return int(np.sum(mEnds - mStarts))
+    if numSegments is None:
+        numSegments = int(np.max(segments)) + 1 if len(segments) > 0 else 0
+    total = np.zeros(numSegments, dtype=np.int64)
+    np.add.at(total, mSegs, mEnds - mStarts)
+    return total
+
+def coveredLength(
+    mergedStarts: np.ndarray,
+    mergedEnds: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray
+) -> np.ndarray:
+    """
+    Time within each query interval [starts[i], ends[i]) that is covered by a
+    set of disjoint, sorted intervals, e.g. one segment of mergeIntervals().
+
+    Uses the cumulative covered time up to each query boundary (a prefix sum
+    over the merged intervals plus the partial one the boundary falls in),
+    so it is O((n + m) log m) for n queries and m merged intervals.
+    """
+    mergedStarts = np.asarray(mergedStarts, dtype=np.int64)
+    mergedEnds = np.asarray(mergedEnds, dtype=np.int64)
+    if len(mergedStarts) == 0:
+        return np.zeros(len(starts), dtype=np.int64)
+    lengths = mergedEnds - mergedStarts
+    before = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=before[1:])
+
+    def covered(t):
+        t = np.asarray(t, dtype=np.int64)
+        # Last merged interval starting at or before t, if any
+        i = np.searchsorted(mergedStarts, t, side="right") - 1
+        j = np.maximum(i, 0)
+        partial = np.clip(t - mergedStarts[j], 0, lengths[j])
+        return np.where(i >= 0, before[j] + partial, 0)
+
+    return covered(ends) - covered(starts)
+
+def reduceSegments(
+    ufunc: np.ufunc,
+    values: np.ndarray,
+    offsets: np.ndarray,
+    empty=0
+) -> np.ndarray:
+    """
+    Applies ufunc.reduce to each contiguous segment values[offsets[i]:offsets[i+1]].
+
+    Unlike ufunc.reduceat, empty segments are allowed and are set to empty.
+    """
+    offsets = np.asarray(offsets)
+    counts = np.diff(offsets)
+    out = np.full(len(counts), empty, dtype=np.result_type(values, type(empty)))
+    nonEmpty = counts > 0
+    if np.any(nonEmpty):
+        out[nonEmpty] = ufunc.reduceat(values, offsets[:-1][nonEmpty])
+    return out
+
+def expandRanges(lo: np.ndarray, hi: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized equivalent of concatenating range(lo[i], hi[i]) for every i.
+
+    Returns
+    -------
+    owner : np.ndarray
+        For each output element, the i that produced it.
+
+    index : np.ndarray
+        The output elements themselves.
+    """
+    counts = np.maximum(np.asarray(hi) - np.asarray(lo), 0)
+    owner = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    index = np.asarray(lo)[owner] + (np.arange(len(owner)) - starts[owner])
+    return owner, index
@@ -0,0 +1,302 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .analysis import NsysSqlite, NvtxTable, LaunchTable
+
+import dataclasses
+import numpy as np
+
+from .columnar import ColumnarTable
+from .intervals import unionLength
+
+# NVTX_EVENTS.eventType of push/pop ranges, the only ones guaranteed to nest
+_NVTX_PUSHPOP_RANGE = 59
+
+@dataclasses.dataclass
+class NvtxTree:
+    """
+    The push/pop nesting of NVTX ranges on every thread, indexed for
+    stabbing queries ("which ranges were open at time t on thread g").
+
+    Row i of every array belongs to range nvtx[i]. Ranges are sorted by
+    globalTid, then start, with enclosing ranges before the ones they
+    contain; the ranges of thread threadIds[k] are rows
+    threadOffsets[k]:threadOffsets[k + 1]. parent is -1 for outermost ranges.
+
+    CPU times are wall clock times of the ranges: inclusive is the duration,
+    exclusive leaves out the time spent in child ranges. GPU times are busy
+    times (union of kernel intervals) of the kernels whose launching runtime
+    call started inside the range (inclusive), or inside the range but not
+    in any child (exclusive); None if no launches were given.
+    """
+    nvtx: NvtxTable
+    parent: np.ndarray
+    depth: np.ndarray
+    exclusive: np.ndarray
+    threadIds: np.ndarray
+    threadOffsets: np.ndarray
+    gpuInclusive: np.ndarray | None = None
+    gpuExclusive: np.ndarray | None = None
+    # Innermost range of each launch's runtime call (-1 if none)
+    launches: LaunchTable | None = None
+    launchRange: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    @property
+    def inclusive(self) -> np.ndarray:
+        return self.nvtx.end - self.nvtx.start
+
+    @property
+    def roots(self) -> np.ndarray:
+        return np.flatnonzero(self.parent < 0)
+
+    @property
+    def maxDepth(self) -> int:
+        return int(np.max(self.depth)) if len(self) > 0 else -1
+
+    def children(self, i: int) -> np.ndarray:
+        return np.flatnonzero(self.parent == i)
+
+    def ancestors(self, i: int) -> np.ndarray:
+        """
+        Range i followed by its parent, grandparent etc.
+        """
+        chain = list()
+        while i >= 0:
+            chain.append(i)
+            i = int(self.parent[i])
+        return np.array(chain, dtype=np.int64)
+
+    def innermost(self, times: np.ndarray, globalTids: np.ndarray | int) -> np.ndarray:
+        """
+        Innermost range open at each time on the given thread.
+
+        A range [start, end) is open at t if start <= t < end. Each query is
+        one binary search among the ranges of its thread for the last range
+        starting at or before t; if that range has already ended, the answer
+        is its nearest ancestor still open, found by stepping all such
+        queries up the tree together, at most maxDepth times.
+
+        Parameters
+        ----------
+        times : np.ndarray
+            Query timestamps, e.g. LaunchTable.apiStart.
+
+        globalTids : np.ndarray | int
+            Thread of each query, or one thread for all of them.
+
+        Returns
+        -------
+        ranges : np.ndarray
+            Row of the innermost open range for each query; -1 if none.
+        """
+        times = np.asarray(times, dtype=np.int64)
+        globalTids = np.broadcast_to(np.asarray(globalTids, dtype=np.int64), times.shape)
+        result = np.full(len(times), -1, dtype=np.int64)
+        starts = self.nvtx.start
+        ends = self.nvtx.end
+        for k, tid in enumerate(self.threadIds.tolist()):
+            sel = np.flatnonzero(globalTids == tid)
+            a, b = self.threadOffsets[k], self.threadOffsets[k + 1]
+            result[sel] = a + np.searchsorted(starts[a:b], times[sel], side="right") - 1
+            result[sel[result[sel] < a]] = -1
+
+        pending = np.flatnonzero(result >= 0)
+        while len(pending) > 0:
+            closed = ends[result[pending]] <= times[pending]
+            pending = pending[closed]
+            result[pending] = self.parent[result[pending]]
+            pending = pending[result[pending] >= 0]
+        return result
+
+    def enclosing(self, times: np.ndarray, globalTids: np.ndarray | int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        All ranges open at each time on the given thread, i.e. the innermost
+        one and its ancestors.
+
+        Returns
+        -------
+        query : np.ndarray
+            For each output pair, the index of the query.
+
+        ranges : np.ndarray
+            The open ranges. Pairs are sorted by query, then from the
+            innermost range outwards.
+        """
+        current = self.innermost(times, globalTids)
+        query = np.arange(len(current))
+        queries = [np.zeros(0, dtype=np.int64)]
+        ranges = [np.zeros(0, dtype=np.int64)]
+        while len(query) > 0:
+            found = current >= 0
+            query = query[found]
+            current = current[found]
+            queries.append(query)
+            ranges.append(current)
+            current = self.parent[current]
+        query = np.concatenate(queries)
+        ranges = np.concatenate(ranges)
+        levels = np.repeat(np.arange(len(queries)), [len(q) for q in queries])
+        order = np.lexsort((levels, query))
+        return query[order], ranges[order]
+
+    def names(self, db: NsysSqlite) -> np.ndarray:
+        """
+        Name of each range: its registered string (textId) if any, else its text.
+        """
+        names = np.array(self.nvtx.text, dtype=object)
+        registered = ~self.nvtx.nullMask("textId")
+        names[registered] = db.resolveStringColumn(self.nvtx.textId[registered])
+        return names
+
+    def summarize(self, db: NsysSqlite | None = None) -> ColumnarTable:
+        """
+        Totals per range name.
+
+        Nested ranges of the same name are each counted, so inclusive times
+        of recursive ranges add up to more than the wall clock time.
+
+        Parameters
+        ----------
+        db : NsysSqlite | None
+            Database to resolve names with. Defaults to None, which groups
+            by textId (-1 for ranges named by text only).
+
+        Returns
+        -------
+        summary : ColumnarTable
+            One row per name, by descending inclusive time, with columns
+            name (or textId), count, inclusive, exclusive and, if launches
+            were given, gpuInclusive and gpuExclusive.
+        """
+        if db is None:
+            keyName = "textId"
+            keys = np.where(self.nvtx.nullMask("textId"), -1, self.nvtx.textId)
+        else:
+            keyName = "name"
+            keys = self.names(db).astype(str)
+        uniqueKeys, inverse = np.unique(keys, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        n = len(uniqueKeys)
+
+        def total(values):
+            return np.bincount(inverse, weights=values, minlength=n).astype(np.int64)
+
+        inclusive = total(self.inclusive)
+        order = np.argsort(-inclusive, kind="stable")
+        columns = {
+            keyName: uniqueKeys.astype(object)[order] if db is not None else uniqueKeys[order],
+            "count": np.bincount(inverse, minlength=n)[order],
+            "inclusive": inclusive[order],
+            "exclusive": total(self.exclusive)[order],
+        }
+        if self.gpuInclusive is not None:
+            columns["gpuInclusive"] = total(self.gpuInclusive)[order]
+            columns["gpuExclusive"] = total(self.gpuExclusive)[order]
+        return ColumnarTable(columns)
+
+def buildNvtxTree(nvtx: NvtxTable, launches: LaunchTable | None = None) -> NvtxTree:
+    """
+    Reconstructs the push/pop nesting of NVTX ranges, per thread.
+
+    After one sort by (globalTid, start, -end), the depth of a range is the
+    number of earlier ranges of its thread that have not ended by its start,
+    which one binary search over the sorted ends of the thread gives. Its
+    parent is then the last earlier range one level up, found for all
+    ranges at once with a single search over (depth, position) keys.
+    Ranges that cross instead of nesting get the innermost enclosing
+    range found on the way up as parent.
+
+    Parameters
+    ----------
+    nvtx : NvtxTable
+        NVTX events, e.g. from getNvtxBetween(columnar=True). Only push/pop
+        ranges are kept; marks and start/end ranges, which need not nest,
+        are dropped.
+
+    launches : LaunchTable | None
+        Kernels with their launching runtime calls, e.g. from
+        getKernelLaunchesBetween(), to compute GPU times with.
+        Defaults to None, which skips GPU times.
+
+    Returns
+    -------
+    tree : NvtxTree
+        See NvtxTree.
+    """
+    keep = (
+        (nvtx.eventType == _NVTX_PUSHPOP_RANGE)
+        & ~nvtx.nullMask("end") & ~nvtx.nullMask("globalTid")
+    )
+    nvtx = nvtx[np.flatnonzero(keep)]
+    order = np.lexsort((-nvtx.end, nvtx.start, nvtx.globalTid))
+    nvtx = nvtx[order]
+    n = len(nvtx)
+    starts = nvtx.start
+    ends = nvtx.end
+
+    threadIds, threadOffsets = np.unique(nvtx.globalTid, return_index=True)
+    threadOffsets = np.append(threadOffsets, n).astype(np.int64)
+    depth = np.zeros(n, dtype=np.int64)
+    # Empty ranges count as lasting 1ns, so they never close before they open
+    openEnds = np.maximum(ends, starts + 1)
+    for k in range(len(threadIds)):
+        a, b = threadOffsets[k], threadOffsets[k + 1]
+        # Ranges opened before each start, minus those already closed by then
+        closed = np.searchsorted(np.sort(openEnds[a:b]), starts[a:b], side="right")
+        depth[a:b] = np.maximum(np.arange(b - a) - closed, 0)
+
+    # Last earlier range of depth d - 1; as that level's ranges only close
+    # after their children, it is always on the same thread
+    parent = np.full(n, -1, dtype=np.int64)
+    position = np.arange(n, dtype=np.int64)
+    keys = depth * n + position
+    byKey = np.argsort(keys)
+    nested = np.flatnonzero(depth > 0)
+    parent[nested] = byKey[np.searchsorted(keys[byKey], (depth[nested] - 1) * n + nested) - 1]
+
+    # Push/pop ranges of one thread cannot cross, but ranges that were
+    # merged or made up might; move such a range up until its parent
+    # encloses it, and count the levels again
+    crossing = nested[ends[nested] > ends[parent[nested]]]
+    if len(crossing) > 0:
+        while len(crossing) > 0:
+            parent[crossing] = parent[parent[crossing]]
+            crossing = crossing[parent[crossing] >= 0]
+            crossing = crossing[ends[crossing] > ends[parent[crossing]]]
+        depth = np.zeros(n, dtype=np.int64)
+        hasParent = parent >= 0
+        for _ in range(n):
+            levels = np.where(hasParent, depth[parent] + 1, 0)
+            if np.array_equal(levels, depth):
+                break
+            depth = levels
+
+    # Children may overlap each other if they crossed, so subtract their union
+    hasParent = np.flatnonzero(parent >= 0)
+    exclusive = (ends - starts) - unionLength(starts[hasParent], ends[hasParent], parent[hasParent], n)
+
+    tree = NvtxTree(
+        nvtx=nvtx,
+        parent=parent,
+        depth=depth,
+        exclusive=exclusive,
+        threadIds=threadIds,
+        threadOffsets=threadOffsets,
+    )
+    if launches is not None:
+        kStart = launches.start
+        kEnd = launches.end
+        query, ranges = tree.enclosing(launches.apiStart, launches.apiGlobalTid)
+        tree.gpuInclusive = unionLength(kStart[query], kEnd[query], ranges, n)
+        # The innermost range is the first of each launch's pairs
+        innermost = np.full(len(launches), -1, dtype=np.int64)
+        first = np.concatenate(([True], query[1:] != query[:-1])) if len(query) > 0 else np.zeros(0, dtype=bool)
+        innermost[query[first]] = ranges[first]
+        attributed = innermost >= 0
+        tree.gpuExclusive = unionLength(kStart[attributed], kEnd[attributed], innermost[attributed], n)
+        tree.launches = launches
+        tree.launchRange = innermost
+    return tree
@@ -0,0 +1,135 @@
+from __future__ import annotations
+import pathlib
+import sqlite3
+import threading
+
+class ConnectionPool:
+    """
+    Read-only sqlite connections to one export, one per thread.
+
+    sqlite connections must not be used from several threads at once, so
+    each thread that queries gets its own connection, opened on first use
+    and reused afterwards. Connections are opened through a URI with
+    mode=ro (and immutable=1 if requested), so they never take locks or
+    write, and are tuned for large read-mostly scans.
+    """
+    # Address space for memory mapped I/O; only pages actually read use memory
+    MMAP_SIZE = 1 << 30
+    # Page cache per connection, in KiB
+    CACHE_SIZE_KIB = 64 * 1024
+
+    def __init__(
+        self,
+        dbpath: str,
+        immutable: bool = True,
+        mmapSize: int | None = None,
+        cacheSizeKiB: int | None = None
+    ):
+        """
+        Parameters
+        ----------
+        dbpath : str
+            Path to the sqlite file.
+
+        immutable : bool
+            Promise sqlite that nothing modifies the file while it is open,
+            which skips all locking and change detection. Do not use on an
+            export that is still being written. Defaults to True.
+
+        mmapSize : int | None
+            PRAGMA mmap_size in bytes. Defaults to MMAP_SIZE.
+
+        cacheSizeKiB : int | None
+            PRAGMA cache_size in KiB. Defaults to CACHE_SIZE_KIB.
+        """
+        self._dbpath = dbpath
+        self._uri = self.uriFor(dbpath, immutable)
+        self._mmapSize = self.MMAP_SIZE if mmapSize is None else mmapSize
+        self._cacheSizeKiB = self.CACHE_SIZE_KIB if cacheSizeKiB is None else cacheSizeKiB
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[sqlite3.Connection] = list()
+        # schema -> uri of databases attached to every connection; each thread
+        # applies changes to its own connection (see connection())
+        self._attached: dict[str, str] = dict()
+        self._attachedVersion = 0
+        self._closed = False
+
+    @staticmethod
+    def uriFor(path: str, immutable: bool = False) -> str:
+        uri = pathlib.Path(path).absolute().as_uri() + "?mode=ro"
+        return uri + "&immutable=1" if immutable else uri
+
+    @property
+    def dbpath(self) -> str:
+        return self._dbpath
+
+    def __len__(self) -> int:
+        """
+        Number of connections currently open.
+        """
+        return len(self._connections)
+
+    def _open(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+        con.execute(f"pragma mmap_size = {int(self._mmapSize)}")
+        con.execute(f"pragma cache_size = {-int(self._cacheSizeKiB)}")
+        con.execute("pragma temp_store = memory")
+        con.execute("pragma query_only = 1")
+        return con
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        The calling thread's connection, opened if needed, with every
+        database attached so far (see attach()).
+        """
+        con = getattr(self._local, "con", None)
+        if con is None:
+            with self._lock:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Cannot use a closed ConnectionPool")
+                con = self._open()
+                self._connections.append(con)
+            self._local.con = con
+            self._local.attached = dict()
+            self._local.attachedVersion = -1
+        if self._local.attachedVersion != self._attachedVersion:
+            self._applyAttached(con)
+        return con
+
+    def _applyAttached(self, con: sqlite3.Connection):
+        # Runs on the thread that owns con, so connections are never used
+        # from another thread
+        with self._lock:
+            wanted = dict(self._attached)
+            version = self._attachedVersion
+        current = self._local.attached
+        for schema, uri in wanted.items():
+            if current.get(schema) == uri:
+                continue
+            if schema in current:
+                con.execute(f"detach database {schema}")
+            con.execute(f"attach database ? as {schema}", (uri,))
+            current[schema] = uri
+        self._local.attachedVersion = version
+
+    def attach(self, path: str, schema: str):
+        """
+        Attaches another sqlite file (read-only) to every connection,
+        including ones opened later. The attachment is only recorded here;
+        each thread's connection picks it up the next time that thread
+        calls connection().
+        """
+        with self._lock:
+            self._attached[schema] = self.uriFor(path)
+            self._attachedVersion += 1
+
+    def close(self):
+        """
+        Closes all connections. The pool cannot be used afterwards.
+        """
+        with self._lock:
+            self._closed = True
+            for con in self._connections:
+                con.close()
+            self._connections.clear()
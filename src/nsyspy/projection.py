@@ -0,0 +1,126 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .analysis import NvtxTable, KernelTable
+
+import dataclasses
+import numpy as np
+
+from .intervals import unionLength, reduceSegments, expandRanges
+
+@dataclasses.dataclass
+class NvtxProjection:
+    """
+    Result of projecting many NVTX ranges onto the GPU kernels they launched.
+
+    The kernels of range i are kernels[kernelIndices[offsets[i]:offsets[i+1]]];
+    use kernelsFor(i) for convenience. A kernel launched inside nested ranges
+    appears once for each of them.
+    """
+    nvtx: NvtxTable
+    kernels: KernelTable
+    offsets: np.ndarray
+    kernelIndices: np.ndarray
+    gpuStart: np.ndarray
+    gpuEnd: np.ndarray
+    gpuBusy: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def kernelCount(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @property
+    def gpuSpan(self) -> np.ndarray:
+        """
+        Time from the first kernel start to the last kernel end of each range;
+        0 for ranges without kernels.
+        """
+        return self.gpuEnd - self.gpuStart
+
+    def kernelsFor(self, i: int) -> KernelTable:
+        return self.kernels[self.kernelIndices[self.offsets[i]:self.offsets[i + 1]]]
+
+def projectRanges(nvtx: NvtxTable, launches: KernelTable) -> NvtxProjection:
+    """
+    Sort-merge sweep matching each NVTX range to the kernels whose launching
+    runtime call lies entirely inside the range, on the same thread.
+
+    Parameters
+    ----------
+    nvtx : NvtxTable
+        The ranges. Rows with a NULL end (marks) get no kernels.
+
+    launches : KernelTable
+        Kernels with the extra columns apiStart, apiEnd and apiGlobalTid
+        describing the runtime call that launched each of them.
+
+    Returns
+    -------
+    projection : NvtxProjection
+        See NvtxProjection.
+    """
+    numRanges = len(nvtx)
+    rangeStart = nvtx.start
+    rangeEnd = nvtx.end
+
+    # Sort launches by thread, then call start, so that each range maps to
+    # one contiguous slice of calls. Each call is keyed by (thread, start)
+    # packed into one increasing int64, so a single searchsorted finds the
+    # slices of all ranges, on all threads, at once
+    order = np.lexsort((launches.apiStart, launches.apiGlobalTid))
+    tids = launches.apiGlobalTid[order]
+    apiStart = launches.apiStart[order]
+    apiEnd = launches.apiEnd[order]
+
+    newTid = np.ones(len(tids), dtype=bool)
+    newTid[1:] = tids[1:] != tids[:-1]
+    uniqueTids = tids[newTid]
+    launchTidRank = np.cumsum(newTid) - 1
+    lo = int(np.min(apiStart)) if len(apiStart) > 0 else 0
+    width = int(np.max(apiStart)) - lo + 2 if len(apiStart) > 0 else 1
+    if len(uniqueTids) * width < 2**62:
+        # Range bounds outside the calls' span clip to one past either end
+        keys = launchTidRank * width + (apiStart - lo)
+        first = np.clip(rangeStart - lo, 0, width - 1)
+        last = np.clip(rangeEnd - lo, -1, width - 2)
+    else:
+        # Too wide to pack directly: use ranks among the call starts instead
+        times = np.sort(apiStart)
+        times = times[np.concatenate(([True], times[1:] != times[:-1]))]
+        width = len(times) + 1
+        keys = launchTidRank * width + np.searchsorted(times, apiStart)
+        first = np.searchsorted(times, rangeStart, side="left")
+        last = np.searchsorted(times, rangeEnd, side="right") - 1
+
+    # Marks, and ranges on threads that launched nothing, get no kernels
+    tidRank = np.searchsorted(uniqueTids, nvtx.globalTid)
+    valid = ~nvtx.nullMask("end") & ~nvtx.nullMask("globalTid") & (tidRank < len(uniqueTids))
+    valid[valid] = uniqueTids[tidRank[valid]] == nvtx.globalTid[valid]
+    rangeLo = np.zeros(numRanges, dtype=np.int64)
+    rangeHi = np.zeros(numRanges, dtype=np.int64)
+    rangeLo[valid] = np.searchsorted(keys, tidRank[valid] * width + first[valid], side="left")
+    rangeHi[valid] = np.searchsorted(keys, tidRank[valid] * width + last[valid], side="right")
+
+    owner, candidate = expandRanges(rangeLo, rangeHi)
+    keep = apiEnd[candidate] <= rangeEnd[owner]
+    owner = owner[keep]
+    kernelIndices = order[candidate[keep]]
+
+    counts = np.bincount(owner, minlength=numRanges)
+    offsets = np.zeros(numRanges + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    kStart = launches.start[kernelIndices]
+    kEnd = launches.end[kernelIndices]
+    return NvtxProjection(
+        nvtx=nvtx,
+        kernels=launches,
+        offsets=offsets,
+        kernelIndices=kernelIndices,
+        gpuStart=reduceSegments(np.minimum, kStart, offsets),
+        gpuEnd=reduceSegments(np.maximum, kEnd, offsets),
+        gpuBusy=unionLength(kStart, kEnd, owner, numRanges),
+    )
@@ -0,0 +1,267 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .analysis import NsysSqlite, CuptiActivityKindKernel, KernelTable
+    from .columnar import ColumnarTable
+
+import copy
+from collections.abc import Iterator
+
+import numpy as np
+
+from . import indexes
+
+def likePattern(text: str) -> str:
+    """
+    LIKE pattern matching values that contain text literally; use with ESCAPE '\\'.
+    """
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+class TableQuery:
+    """
+    Lazy, composable query on one table of an export.
+
+    Every method returns a new query with one more predicate (or ordering or
+    limit), leaving the original untouched, so partial queries can be reused.
+    Nothing is executed until the query is iterated, or toColumns() or
+    count() is called; all predicates are then compiled into a single
+    parameterized statement.
+    """
+    def __init__(
+        self,
+        db: NsysSqlite,
+        tablename: str,
+        tableType: type[ColumnarTable],
+        rowType: type
+    ):
+        self._db = db
+        self._tablename = tablename
+        self._tableType = tableType
+        self._rowType = rowType
+        # (sql, params, columns referenced)
+        self._predicates: list[tuple[str, tuple, tuple[str, ...]]] = list()
+        self._orderBy: list[str] | None = None
+        self._limit: int | None = None
+
+    def _with(self, sql: str | None = None, params: tuple = (), columns: tuple[str, ...] = ()):
+        query = copy.copy(self)
+        query._predicates = list(self._predicates)
+        if sql is not None:
+            query._predicates.append((sql, tuple(params), columns))
+        return query
+
+    def where(self, sql: str, *params):
+        """
+        Adds a raw SQL predicate with ? placeholders, e.g. where("gridX > ?", 1).
+        """
+        # Unknown columns: never moved into a sidecar lookup
+        return self._with(sql, params, ("*",))
+
+    def between(self, start: float = 0.0, end: float | None = None):
+        """
+        Rows starting at or after start and, if given, ending at or before end.
+        """
+        query = self._with("start >= ?", (start,), ("start",))
+        if end is not None:
+            query = query._with("end <= ?", (end,), ("end",))
+        return query
+
+    def orderBy(self, *columns: str):
+        query = self._with()
+        query._orderBy = list(columns)
+        return query
+
+    def limit(self, count: int):
+        query = self._with()
+        query._limit = count
+        return query
+
+    def compile(self, columns: str = "rowid, *") -> tuple[str, list]:
+        """
+        Returns the SQL statement and parameters this query would execute.
+        """
+        conditions, params = self._conditions()
+        stmt = self._db._makeSelectStatement(columns, self._tablename, conditions, self._orderBy, True)
+        if self._limit is not None:
+            stmt += " limit ?"
+            params.append(self._limit)
+        return stmt, params
+
+    def _conditions(self) -> tuple[list[str] | None, list]:
+        # Predicates only on columns mirrored in a sidecar go through its
+        # indexes as one rowid lookup; everything else filters the main table
+        mirrored = set()
+        if self._tablename in self._db._sidecarTables:
+            mirrored = set(indexes.sidecarColumns(self._tablename))
+        viaSidecar = [p for p in self._predicates if mirrored and set(p[2]) <= mirrored]
+        direct = [p for p in self._predicates if p not in viaSidecar]
+        conditions = list()
+        params = list()
+        if viaSidecar:
+            conditions.extend(self._db._viaSidecar(self._tablename, [f"({p[0]})" for p in viaSidecar]))
+            params.extend(v for p in viaSidecar for v in p[1])
+        # Parenthesized, so an 'or' in a raw predicate cannot escape it
+        conditions.extend(f"({p[0]})" for p in direct)
+        params.extend(v for p in direct for v in p[1])
+        return conditions or None, params
+
+    def __iter__(self) -> Iterator:
+        """
+        Executes the query, yielding one row dataclass per row.
+        """
+        conditions, params = self._conditions()
+        yield from self._db._iterSelect(
+            self._tableType, self._tablename, conditions, params, None, False,
+            rowType=self._rowType, orderBy=self._orderBy, limit=self._limit
+        )
+
+    def toColumns(self, batchSize: int | None = None) -> ColumnarTable:
+        """
+        Executes the query into a columnar table.
+        """
+        conditions, params = self._conditions()
+        return self._db._selectColumnar(
+            self._tableType, self._tablename, "rowid, *", conditions, params,
+            orderBy=self._orderBy, limit=self._limit, batchSize=batchSize
+        )
+
+    def iterColumns(self, batchSize: int | None = None) -> Iterator[ColumnarTable]:
+        """
+        Executes the query, yielding one columnar table per batch of rows.
+        """
+        conditions, params = self._conditions()
+        yield from self._db._iterSelect(
+            self._tableType, self._tablename, conditions, params, batchSize, True,
+            orderBy=self._orderBy, limit=self._limit
+        )
+
+    def count(self) -> int:
+        """
+        Number of matching rows (ignoring any limit), counted by sqlite.
+        """
+        conditions, params = self._conditions()
+        cur = self._db._executeSelect(self._tablename, "count(*)", conditions, params)
+        count = cur.fetchone()[0]
+        cur.close()
+        return count
+
+    def __repr__(self) -> str:
+        stmt, params = self.compile()
+        return f"{type(self).__name__}({stmt!r}, {params!r})"
+
+class KernelQuery(TableQuery):
+    """
+    Lazy query on CUPTI_ACTIVITY_KIND_KERNEL; see NsysSqlite.kernels().
+
+        kernels = (
+            db.kernels()
+            .named("gemm")
+            .between(t0, t1)
+            .onStream(7)
+            .withGrid(minBlocks=80)
+            .limit(1000)
+            .toColumns()
+        )
+    """
+    _NAME_COLUMNS = ("shortName", "demangledName", "mangledName")
+
+    def named(self, *patterns: str, column: str = "shortName", exact: bool = False):
+        """
+        Kernels whose name contains any of the patterns (case insensitive
+        for ASCII, like sqlite's LIKE), or equals one of them if exact.
+
+        Parameters
+        ----------
+        *patterns : str
+            Substrings (or full names) to match.
+
+        column : str
+            One of 'shortName', 'demangledName' or 'mangledName'.
+            Defaults to 'shortName'.
+
+        exact : bool
+            Match whole names instead of substrings. Defaults to False.
+        """
+        if column not in self._NAME_COLUMNS:
+            raise ValueError(f"column must be one of {self._NAME_COLUMNS}, not {column!r}")
+        if len(patterns) == 0:
+            raise ValueError("Must provide at least one name")
+        if exact:
+            match = f"value in ({','.join('?' * len(patterns))})"
+            params = patterns
+        else:
+            match = " or ".join(["value like ? escape '\\'"] * len(patterns))
+            params = tuple(likePattern(p) for p in patterns)
+        return self._with(f"{column} in (select id from StringIds where {match})", params, (column,))
+
+    def onStream(self, *streamIds: int):
+        """
+        Kernels on any of the given streams.
+        """
+        return self._with(f"streamId in ({','.join('?' * len(streamIds))})", streamIds, ("streamId",))
+
+    def onDevice(self, *deviceIds: int):
+        """
+        Kernels on any of the given devices.
+        """
+        return self._with(f"deviceId in ({','.join('?' * len(deviceIds))})", deviceIds, ("deviceId",))
+
+    def withCorrelationIds(self, *correlationIds: int):
+        """
+        Kernels with any of the given correlationIds. Each id is a bound
+        parameter, so keep the count under sqlite's limit (999 on older builds).
+        """
+        return self._with(
+            f"correlationId in ({','.join('?' * len(correlationIds))})", correlationIds, ("correlationId",))
+
+    def withGrid(self, minBlocks: int | None = None, maxBlocks: int | None = None):
+        """
+        Kernels launched with a total number of blocks (gridX * gridY * gridZ) in a range.
+        """
+        query = self
+        if minBlocks is not None:
+            query = query._with("gridX * gridY * gridZ >= ?", (minBlocks,), ("gridX", "gridY", "gridZ"))
+        if maxBlocks is not None:
+            query = query._with("gridX * gridY * gridZ <= ?", (maxBlocks,), ("gridX", "gridY", "gridZ"))
+        return query
+
+    def withBlock(self, minThreads: int | None = None, maxThreads: int | None = None):
+        """
+        Kernels launched with a number of threads per block in a range.
+        """
+        query = self
+        if minThreads is not None:
+            query = query._with("blockX * blockY * blockZ >= ?", (minThreads,), ("blockX", "blockY", "blockZ"))
+        if maxThreads is not None:
+            query = query._with("blockX * blockY * blockZ <= ?", (maxThreads,), ("blockX", "blockY", "blockZ"))
+        return query
+
+    def groupByStream(self, columnar: bool = False) -> dict[int, list[CuptiActivityKindKernel]] | dict[int, KernelTable]:
+        """
+        Executes the query with the rows ordered by stream in SQL, and splits
+        them at the stream boundaries. Like filters.filterKernelsByStream(),
+        but without loading anything that does not match.
+
+        Returns
+        -------
+        kernels : dict[int, list[CuptiActivityKindKernel]] | dict[int, KernelTable]
+            Key is the streamId. Within a stream, rows keep any orderBy() given
+            on this query, or table (rowid) order otherwise.
+        """
+        query = self.orderBy("streamId", *(self._orderBy or ["rowid"]))
+        if not columnar:
+            grouped = dict()
+            for kernel in query:
+                grouped.setdefault(kernel.streamId, list()).append(kernel)
+            return grouped
+        table = query.toColumns()
+        if len(table) == 0:
+            return dict()
+        boundaries = np.flatnonzero(np.diff(table.streamId)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(table)]))
+        return {
+            int(table.streamId[a]): table[a:b]
+            for a, b in zip(starts.tolist(), ends.tolist())
+        }
@@ -0,0 +1,244 @@
+from __future__ import annotations
+import glob
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing.util import Finalize
+from typing import Callable
+
+import numpy as np
+
+from .analysis import NsysSqlite, KernelTable
+from .columnar import ColumnarTable
+
+class _OpenReports:
+    """
+    Read-only connections to the reports a ReportSet (or one of its worker
+    processes) has touched, so repeated queries do not reopen the files.
+
+    The connections are opened with immutable=1, so each one is keyed on
+    the file's mtime and size as well as its path: a report re-exported at
+    the same path gets a fresh connection instead of stale reads.
+    """
+    def __init__(self):
+        self._reports: dict[str, tuple[tuple[int, int], NsysSqlite]] = dict()
+
+    def get(self, path: str) -> NsysSqlite:
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self._reports.get(path)
+        if cached is not None:
+            if cached[0] == stamp:
+                return cached[1]
+            cached[1].close()
+        db = NsysSqlite(path, readOnly=True)
+        self._reports[path] = (stamp, db)
+        return db
+
+    def close(self):
+        for _, db in self._reports.values():
+            db.close()
+        self._reports.clear()
+
+# Connections of this worker process, set up by _initWorker()
+_workerReports: _OpenReports | None = None
+
+def _initWorker():
+    global _workerReports
+    _workerReports = _OpenReports()
+    # Runs when the worker exits, i.e. when the ReportSet shuts the pool down
+    Finalize(_workerReports, _workerReports.close, exitpriority=10)
+
+def _runOn(path: str, func: Callable, args: tuple, kwargs: dict):
+    return func(_workerReports.get(path), *args, **kwargs)
+
+def kernelsBetween(db: NsysSqlite, start: float = 0.0, end: float | None = None) -> KernelTable:
+    return db.getKernelsBetween(start, end, columnar=True)
+
+def kernelSummary(db: NsysSqlite, start: float = 0.0, end: float | None = None, **kwargs) -> ColumnarTable:
+    """
+    Per kernel name duration statistics of one report. See NsysSqlite.kernelSummary().
+    """
+    return db.kernelSummary(start=start, end=end, **kwargs)
+
+def occupancies(db: NsysSqlite, device, start: float = 0.0, end: float | None = None) -> ColumnarTable:
+    """
+    Theoretical and launch occupancy of every kernel of one report on a device.
+    """
+    kernels = db.getKernelsBetween(start, end, columnar=True)
+    occ, limitedBy = device.theoreticalOccupancies(kernels)
+    return ColumnarTable({
+        "rowid": kernels.rowid,
+        "shortName": kernels.shortNameStrings(db),
+        "streamId": kernels.streamId,
+        "duration": kernels.duration,
+        "theoreticalOccupancy": occ,
+        "limitedBy": limitedBy,
+        "launchOccupancy": device.launchOccupancies(kernels),
+    })
+
+def nvtxProjections(db: NsysSqlite, start: float = 0.0, end: float | None = None) -> ColumnarTable:
+    """
+    GPU kernel count, start, end and busy time of every NVTX range of one report.
+    """
+    nvtx = db.getNvtxBetween(start, end, columnar=True)
+    projection = db.projectNvtxToKernels(nvtx)
+    # Registered strings take precedence over inline text
+    text = nvtx.text.copy()
+    hasTextId = ~nvtx.nullMask("textId")
+    text[hasTextId] = db.resolveStringColumn(nvtx.textId[hasTextId])
+    return ColumnarTable({
+        "rowid": nvtx.rowid,
+        "start": nvtx.start,
+        "end": nvtx.end,
+        "globalTid": nvtx.globalTid,
+        "text": text,
+        "kernelCount": projection.kernelCount,
+        "gpuStart": projection.gpuStart,
+        "gpuEnd": projection.gpuEnd,
+        "gpuBusy": projection.gpuBusy,
+    })
+
+class ReportSet:
+    """
+    A collection of nsys sqlite exports that are analyzed together.
+
+    Work is fanned out over a process pool with one task per report; each
+    worker opens its own connection to each report it handles. Results come
+    back as columnar tables (plain NumPy arrays pickle cheaply, unlike lists
+    of dataclasses), and are merged into a single table with an extra
+    'report' column holding the index of the source report in paths.
+
+        with ReportSet("nightly/*.sqlite") as reports:
+            summary = reports.kernelSummary()
+    """
+    def __init__(
+        self,
+        reports: str | list[str],
+        maxWorkers: int | None = None,
+        parallel: bool = True
+    ):
+        """
+        Parameters
+        ----------
+        reports : str | list[str]
+            Paths or glob patterns of the sqlite exports.
+
+        maxWorkers : int | None
+            Number of worker processes. Defaults to None, which uses the number of CPUs.
+
+        parallel : bool
+            If False, everything runs serially in this process. Useful for debugging.
+            Defaults to True.
+        """
+        patterns = [reports] if isinstance(reports, str) else reports
+        paths = list()
+        for pattern in patterns:
+            matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+            paths.extend(matches)
+        for path in paths:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Could not find {path}")
+        self._paths = paths
+        self._maxWorkers = maxWorkers
+        self._parallel = parallel
+        self._executor: Executor | None = None
+        # Connections used when not running in parallel
+        self._openReports = _OpenReports()
+
+    @property
+    def paths(self) -> list[str]:
+        return self._paths
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Shuts down the worker processes, if any were started, and closes
+        all connections to the reports.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._openReports.close()
+
+    def map(self, func: Callable, *args, **kwargs) -> list:
+        """
+        Calls func(db, *args, **kwargs) for every report.
+
+        func must be picklable (i.e. a module-level function) when running in
+        parallel, and should return something cheap to pickle.
+
+        Returns
+        -------
+        results : list
+            One result per report, in the same order as paths.
+        """
+        if not self._parallel:
+            return [func(self._openReports.get(path), *args, **kwargs) for path in self._paths]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self._maxWorkers, initializer=_initWorker)
+        futures = [
+            self._executor.submit(_runOn, path, func, args, kwargs)
+            for path in self._paths
+        ]
+        return [f.result() for f in futures]
+
+    def gather(self, func: Callable, *args, **kwargs) -> ColumnarTable:
+        """
+        Like map(), but func must return a ColumnarTable. The results are
+        concatenated, with an added 'report' column. Only columns present in
+        every report are kept (exports from different nsys versions may differ).
+        """
+        return self.merge(self.map(func, *args, **kwargs))
+
+    @staticmethod
+    def merge(tables: list[ColumnarTable]) -> ColumnarTable:
+        """
+        Concatenates one table per report, tagging each row with its report index.
+        """
+        if len(tables) == 0:
+            return ColumnarTable({"report": np.zeros(0, dtype=np.int64)})
+        common = [
+            name for name in tables[0].columnNames
+            if all(name in t for t in tables[1:])
+        ]
+        tableType = type(tables[0])
+        tagged = list()
+        for i, t in enumerate(tables):
+            columns = {name: t[name] for name in common}
+            columns["report"] = np.full(len(t), i, dtype=np.int64)
+            nullMasks = {name: m for name, m in t.nullMasks.items() if name in columns}
+            tagged.append(tableType(columns, nullMasks))
+        return tableType.concatenate(tagged)
+
+    def getKernelsBetween(self, start: float = 0.0, end: float | None = None) -> KernelTable:
+        return self.gather(kernelsBetween, start, end)
+
+    def kernelSummary(self, start: float = 0.0, end: float | None = None, **kwargs) -> ColumnarTable:
+        """
+        Per report, per kernel duration statistics. Ids differ between
+        reports, so use the 'name' column to match kernels across them.
+        Keyword arguments are passed to NsysSqlite.kernelSummary().
+        """
+        return self.gather(kernelSummary, start, end, **kwargs)
+
+    def occupancies(self, device, start: float = 0.0, end: float | None = None) -> ColumnarTable:
+        """
+        Per kernel occupancy on a device.Device (e.g. device.A10()) for every report.
+        See reports.occupancies().
+        """
+        return self.gather(occupancies, device, start, end)
+
+    def nvtxProjections(self, start: float = 0.0, end: float | None = None) -> ColumnarTable:
+        """
+        Per NVTX range GPU projection for every report.
+        See reports.nvtxProjections().
+        """
+        return self.gather(nvtxProjections, start, end)
@@ -1,13 +1,121 @@
+from __future__ import annotations
 import subprocess
 import os
 import datetime as dt
+import dataclasses
+import hashlib
+import json
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
 from .analysis import NsysSqlite
+from .columnar import ColumnarTable
+from .stats import steadyStateStarts, medianConfidenceIntervals
+
+@dataclasses.dataclass
+class Job:
+    """
+    One unit of work for Runner.runJobs(): profile a target (if given), then
+    export the report to sqlite.
+
+    If target is None, reportname must name an existing report, which is only exported.
+    """
+    target: list[str] | str | None = None
+    reportname: str | None = None
+    profile_args: tuple = ()
+    export_args: tuple = ()
+
+@dataclasses.dataclass
+class JobResult:
+    job: Job
+    reportname: str | None = None
+    sqlitepath: str | None = None
+    # Return code of the last command that was run (None if nothing ran)
+    returncode: int | None = None
+    stdout: str = ""
+    stderr: str = ""
+    # False if an up-to-date sqlite already existed and export was skipped
+    exported: bool = False
+    error: Exception | None = None
+    db: NsysSqlite | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+@dataclasses.dataclass
+class BenchmarkResult:
+    """
+    Output of Runner.benchmark().
+
+    runs has one row per (run, kernel name), with columns run, name,
+    launches, warmup (launches discarded as warm-up) and median (of the
+    steady state launches). summary has one row per kernel name, by
+    descending steady state time, with columns name, runs, launches,
+    warmup, total (steady state time over all runs), median (of the
+    per run medians), ciLow, ciHigh and relativeError (half the interval
+    width over the median).
+    """
+    reportnames: list[str]
+    sqlitepaths: list[str]
+    runs: ColumnarTable
+    summary: ColumnarTable
+    # True if the run stopped early because every interval was within tolerance
+    stable: bool = False
+
+    @property
+    def numRuns(self) -> int:
+        return len(self.reportnames)
+
+def _fileStamp(path: str, withHash: bool = True) -> dict:
+    st = os.stat(path)
+    stamp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if withHash:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        stamp["sha256"] = h.hexdigest()
+    return stamp
+
+def _stampPath(sqlitepath: str) -> str:
+    return sqlitepath + ".nsyspy-stamp"
+
+def _autoReportName(prefix: str = "report") -> str:
+    # Timestamped for readability; the random suffix keeps names unique when
+    # reports are started within the same second (e.g. from several threads)
+    now = int(dt.datetime.now().timestamp())
+    return f"{prefix}_{now}_{uuid.uuid4().hex[:8]}.nsys-rep"
+
+def exportIsUpToDate(reportname: str, sqlitepath: str) -> bool:
+    """
+    Checks whether an existing sqlite export still matches its report.
+
+    After each export, Runner records the size, mtime and hash of the report
+    next to the sqlite file. The export is up to date if the report's size
+    and mtime still match, or failing that, if its hash still matches (e.g.
+    the report was copied). Exports without a record are up to date if the
+    sqlite file is newer than the report.
+    """
+    if not os.path.exists(sqlitepath):
+        return False
+    stampPath = _stampPath(sqlitepath)
+    if not os.path.exists(stampPath):
+        return os.path.getmtime(sqlitepath) >= os.path.getmtime(reportname)
+    with open(stampPath) as f:
+        recorded = json.load(f)
+    current = _fileStamp(reportname, withHash=False)
+    if current["size"] != recorded.get("size"):
+        return False
+    if current["mtime_ns"] == recorded.get("mtime_ns"):
+        return True
+    return _fileStamp(reportname)["sha256"] == recorded.get("sha256")
 
 class Runner:
     def __init__(self, nsys_path: str = "nsys"):
         self._nsys_path = nsys_path
 
-    def execute(self, command: list | str, verbose: bool = False):
+    def execute(self, command: list | str, verbose: bool = False, capture: bool = False) -> subprocess.CompletedProcess:
         """
         Generic method to execute a nsys command.
         Use this if none of the convenience functions match your use-case.
@@ -19,6 +127,14 @@ class Runner:
 
         verbose : bool
             Prints the command being executed if True. Defaults to False.
+
+        capture : bool
+            Captures stdout and stderr (as text) instead of printing them. Defaults to False.
+
+        Returns
+        -------
+        result : subprocess.CompletedProcess
+            The finished process, including the return code.
         """
         if isinstance(command, str):
             command = [command]
@@ -26,7 +142,7 @@ class Runner:
         c.extend(command)
         if verbose:
             print(c)
-        subprocess.run(c)
+        return subprocess.run(c, capture_output=capture, text=capture)
 
     def profile(self, target: list[str] | str, *profile_args, reportname: str | None = None, verbose: bool = False) -> str:
         """
@@ -39,7 +155,8 @@ class Runner:
 
         reportname : str | None
             Output report name. Is passed to '--output'.
-            Automatically generated with the current timestamp if left as None.
+            Automatically generated from the current timestamp and a random
+            suffix if left as None.
 
         verbose : bool
             See execute() for details.
@@ -51,18 +168,22 @@ class Runner:
         -------
         reportname : str
             The output report name. Useful if it was automatically generated.
+
+        Raises
+        ------
+        subprocess.CalledProcessError
+            If nsys profile exits with a non-zero return code.
         """
         if reportname is None:
-            now = dt.datetime.now().timestamp()
-            reportname = f"report_{int(now)}.nsys-rep"
+            reportname = _autoReportName()
         command = ["profile", f"--output={reportname}", *profile_args]
         command.extend(target)
-        self.execute(command, verbose)
+        self.execute(command, verbose).check_returncode()
         if not os.path.exists(reportname):
             raise FileNotFoundError(f"Could not find {reportname}")
         return reportname
 
-    def export(self, reportname: str, *export_args, verbose: bool = False) -> NsysSqlite:
+    def export(self, reportname: str, *export_args, verbose: bool = False, skipIfUpToDate: bool = True) -> NsysSqlite:
         """
         Convenience function to execute 'nsys export'.
         Fixed to sqlite output formats (for now at least).
@@ -79,16 +200,324 @@ class Runner:
         *export_args
             Additional arguments to pass to nsys export.
 
+        skipIfUpToDate : bool
+            Does not re-run the export if the sqlite file already exists and
+            matches the report (see exportIsUpToDate()). Defaults to True.
+
         Returns
         -------
         db : NsysSqlite
             Instance of NsysSqlite, which is the container for the generated database.
+
+        Raises
+        ------
+        subprocess.CalledProcessError
+            If nsys export exits with a non-zero return code.
         """
+        outputname = self._export(reportname, export_args, verbose, skipIfUpToDate)[0]
+        return NsysSqlite(outputname)
+
+    def _export(
+        self,
+        reportname: str,
+        export_args: tuple,
+        verbose: bool,
+        skipIfUpToDate: bool,
+        capture: bool = False
+    ) -> tuple[str, subprocess.CompletedProcess | None]:
+        if not os.path.exists(reportname):
+            raise FileNotFoundError(f"Could not find {reportname}")
+        outputname = os.path.splitext(reportname)[0] + ".sqlite"
+        if skipIfUpToDate and exportIsUpToDate(reportname, outputname):
+            return outputname, None
+        stampPath = _stampPath(outputname)
+        if os.path.exists(stampPath):
+            os.remove(stampPath)
         # Enforce sqlite
         command = ["export", "--type=sqlite", *export_args, reportname]
-        outputname = os.path.splitext(reportname)[0] + ".sqlite"
-        self.execute(command, verbose)
+        result = self.execute(command, verbose, capture)
+        if result.returncode != 0 and os.path.exists(outputname):
+            # An empty record never matches, so neither a stale nor a partly
+            # written export is taken as up to date afterwards
+            with open(stampPath, "w") as f:
+                json.dump({}, f)
+        result.check_returncode()
         if not os.path.exists(outputname):
             raise FileNotFoundError(f"Could not find {outputname}")
-        return NsysSqlite(outputname)
+        with open(stampPath, "w") as f:
+            json.dump(_fileStamp(reportname), f)
+        return outputname, result
+
+    def _runJob(self, job: Job, reportname: str | None, verbose: bool) -> JobResult:
+        # Runs in a worker thread; the database is opened later by the caller,
+        # since sqlite connections should stay on the thread that made them
+        r = JobResult(job, reportname)
+        try:
+            if job.target is not None:
+                target = [job.target] if isinstance(job.target, str) else job.target
+                command = ["profile", f"--output={reportname}", *job.profile_args, *target]
+                result = self.execute(command, verbose, capture=True)
+                r.returncode, r.stdout, r.stderr = result.returncode, result.stdout, result.stderr
+                # A report left over from an earlier run must not be exported instead
+                result.check_returncode()
+                if not os.path.exists(reportname):
+                    raise FileNotFoundError(f"Could not find {reportname}")
+            elif reportname is None:
+                raise ValueError("Job needs a target to profile or a reportname to export")
+            try:
+                r.sqlitepath, result = self._export(reportname, job.export_args, verbose, True, capture=True)
+            except subprocess.CalledProcessError as e:
+                r.returncode = e.returncode
+                r.stdout += e.stdout or ""
+                r.stderr += e.stderr or ""
+                raise
+            if result is not None:
+                r.exported = True
+                r.returncode = result.returncode
+                r.stdout += result.stdout
+                r.stderr += result.stderr
+        except Exception as e:
+            r.error = e
+        return r
+
+    def runJobs(
+        self,
+        jobs: list[Job],
+        maxConcurrent: int = 4,
+        verbose: bool = False,
+        openDatabases: bool = True
+    ) -> list[JobResult]:
+        """
+        Runs many profile/export jobs concurrently, and returns once all of
+        them have finished.
+
+        Each job's nsys commands run one after the other, while up to maxConcurrent
+        jobs run at the same time. Exports are skipped if an up-to-date sqlite
+        file already exists. Output of every command is captured rather than printed.
+        Jobs without a reportname that have a target get a unique generated one.
+
+        Parameters
+        ----------
+        jobs : list[Job]
+            The jobs to run.
+
+        maxConcurrent : int
+            Maximum number of jobs running at once. Defaults to 4.
+
+        verbose : bool
+            See execute() for details.
+
+        openDatabases : bool
+            Opens an NsysSqlite for each successful job as JobResult.db. Defaults to True.
+
+        Returns
+        -------
+        results : list[JobResult]
+            One result per job, in the same order as jobs.
+            Failures, including nsys commands exiting with a non-zero return
+            code (subprocess.CalledProcessError), are reported through
+            JobResult.error rather than raised.
+        """
+        with ThreadPoolExecutor(maxConcurrent) as executor:
+            futures = list()
+            for job in jobs:
+                reportname = job.reportname
+                if reportname is None and job.target is not None:
+                    reportname = _autoReportName()
+                futures.append(executor.submit(self._runJob, job, reportname, verbose))
+            results = [future.result() for future in futures]
+        if openDatabases:
+            for r in results:
+                if r.ok:
+                    try:
+                        r.db = NsysSqlite(r.sqlitepath)
+                    except Exception as e:
+                        r.error = e
+        return results
+
+    def benchmark(
+        self,
+        target: list[str] | str,
+        *profile_args,
+        runs: int = 10,
+        minRuns: int = 3,
+        tolerance: float | None = None,
+        confidence: float = 0.95,
+        reportname: str | None = None,
+        export_args: tuple = (),
+        nameColumn: str = "shortName",
+        verbose: bool = False
+    ) -> BenchmarkResult:
+        """
+        Profiles a target repeatedly and summarizes the kernel durations.
+
+        Each run's report is exported and its kernels extracted in a
+        background thread while the next run is being profiled, so a run
+        costs little more than the profile itself. Within each run, the
+        durations of every kernel name (in launch order) are stripped of
+        their warm-up launches (see stats.steadyStateStarts()) and reduced
+        to their median. The per run medians of every name are then combined
+        into a median with a confidence interval (see
+        stats.medianConfidenceIntervals()), so run to run variation is what
+        the interval measures.
+
+        Any executable that understands 'profile --output=<report> ...' and
+        'export --type=sqlite ... <report>' can stand in for nsys (see
+        Runner(nsys_path=...)), e.g. a script writing nsyspy.synthetic traces.
+
+        Parameters
+        ----------
+        target : list[str] | str
+            Target executable, along with additional command line arguments.
+
+        *profile_args
+            Additional arguments to pass to nsys profile (these come before the target).
+
+        runs : int
+            Maximum number of runs. Defaults to 10.
+
+        minRuns : int
+            Minimum number of runs before stopping early. Defaults to 3.
+
+        tolerance : float | None
+            Stop early once every kernel's relativeError is at most this,
+            e.g. 0.01 for +-1%. Defaults to None, which always does all runs.
+
+        confidence : float
+            Confidence level of the intervals. Defaults to 0.95.
+
+        reportname : str | None
+            Prefix of the report names; run i writes '<prefix>_<i>.nsys-rep'.
+            Automatically generated from the current timestamp and a random
+            suffix if left as None.
+
+        export_args : tuple
+            Additional arguments to pass to nsys export.
+
+        nameColumn : str
+            Kernel name column to group by: 'shortName', 'demangledName' or
+            'mangledName'. Defaults to 'shortName'.
+
+        verbose : bool
+            See execute() for details.
+
+        Returns
+        -------
+        result : BenchmarkResult
+            Per run and per kernel summaries, and the reports that were written.
+        """
+        if runs < 1:
+            raise ValueError("runs must be at least 1")
+        if isinstance(target, str):
+            target = [target]
+        if reportname is None:
+            reportname = _autoReportName("benchmark")
+        reportname = reportname.removesuffix(".nsys-rep")
+
+        reportnames = list()
+        extracted = list()
+        stable = False
+        with ThreadPoolExecutor(1) as executor:
+            pending: Future | None = None
+            for i in range(runs):
+                if tolerance is not None and len(extracted) >= minRuns:
+                    summary = _summarizeRuns(extracted, confidence)
+                    if np.all(summary.relativeError <= tolerance):
+                        stable = True
+                        break
+                reportnames.append(self.profile(
+                    target, *profile_args, reportname=f"{reportname}_{i}.nsys-rep", verbose=verbose))
+                # The previous run was exported while this one was profiled
+                if pending is not None:
+                    extracted.append(pending.result())
+                pending = executor.submit(
+                    self._extractRun, reportnames[-1], export_args, nameColumn, verbose)
+            if pending is not None:
+                extracted.append(pending.result())
+
+        perRun = list()
+        for i, (_, table) in enumerate(extracted):
+            table.columns["run"] = np.full(len(table), i, dtype=np.int64)
+            perRun.append(table)
+        return BenchmarkResult(
+            reportnames=reportnames,
+            sqlitepaths=[path for path, _ in extracted],
+            runs=ColumnarTable({
+                name: np.concatenate([table.columns[name] for table in perRun])
+                for name in ("run", "name", "launches", "warmup", "median")
+            }),
+            summary=_summarizeRuns(extracted, confidence),
+            stable=stable,
+        )
+
+    def _extractRun(
+        self,
+        reportname: str,
+        export_args: tuple,
+        nameColumn: str,
+        verbose: bool
+    ) -> tuple[str, ColumnarTable]:
+        # Runs in the benchmark's worker thread, so the database is opened
+        # and closed here
+        sqlitepath = self._export(reportname, export_args, verbose, True, capture=True)[0]
+        db = NsysSqlite(sqlitepath)
+        try:
+            kernels = db.getKernelsBetween(columnar=True)
+            names = db.resolveStringColumn(kernels.columns[nameColumn])
+        finally:
+            db.close()
+        # One duration series per name, in launch (start) order
+        uniqueNames, inverse = np.unique(names.astype(str), return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = np.lexsort((kernels.start, inverse))
+        durations = kernels.duration[order]
+        counts = np.bincount(inverse, minlength=len(uniqueNames))
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        warmup = steadyStateStarts(durations, offsets)
+        steady = np.arange(len(durations)) - np.repeat(offsets[:-1] + warmup, counts) >= 0
+        steadyOffsets = offsets - np.concatenate(([0], np.cumsum(warmup)))
+        median = medianConfidenceIntervals(durations[steady], steadyOffsets)[0]
+        return sqlitepath, ColumnarTable({
+            "name": uniqueNames.astype(object),
+            "launches": counts - warmup,
+            "warmup": warmup,
+            "median": median,
+            "total": np.bincount(inverse[order][steady], weights=durations[steady],
+                                 minlength=len(counts)).astype(np.int64),
+        })
+
+def _summarizeRuns(extracted: list[tuple[str, ColumnarTable]], confidence: float) -> ColumnarTable:
+    # Combines the per run medians of every kernel name across runs
+    names = np.concatenate([table.name for _, table in extracted])
+    uniqueNames, inverse = np.unique(names.astype(str), return_inverse=True)
+    inverse = inverse.reshape(-1)
+    n = len(uniqueNames)
+
+    def total(column):
+        values = np.concatenate([table.columns[column] for _, table in extracted])
+        return np.bincount(inverse, weights=values, minlength=n).astype(np.int64)
+
+    counts = np.bincount(inverse, minlength=n)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    medians = np.concatenate([table.median for _, table in extracted])
+    median, low, high = medianConfidenceIntervals(
+        medians[np.argsort(inverse, kind="stable")], offsets, confidence)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relativeError = np.where(median > 0, (high - low) / 2 / median, np.inf)
 
+    steadyTime = total("total")
+    order = np.argsort(-steadyTime, kind="stable")
+    return ColumnarTable({
+        "name": uniqueNames.astype(object)[order],
+        "runs": counts[order],
+        "launches": total("launches")[order],
+        "warmup": total("warmup")[order],
+        "total": steadyTime[order],
+        "median": median[order],
+        "ciLow": low[order],
+        "ciHigh": high[order],
+        "relativeError": relativeError[order],
+    })
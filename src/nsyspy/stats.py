@@ -0,0 +1,370 @@
+from __future__ import annotations
+import math
+from statistics import NormalDist
+import numpy as np
+
+from .columnar import ColumnarTable
+from .intervals import reduceSegments
+
+# Helpers for per-group summary statistics, either exact from the raw values
+# or from aggregates (e.g. the histograms NsysSqlite.kernelSummary() builds
+# inside sqlite).
+
+def groupLabels(*keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Groups rows by one or more key columns, like np.unique() over the rows
+    of np.column_stack(keys) with axis=0, return_index=True and
+    return_inverse=True, but without sorting rows as opaque bytes, which is
+    slow for millions of rows.
+
+    Non-negative integer keys whose ranges multiply to less than 2**62 are
+    packed into one int64 per row and sorted once; any other keys are
+    grouped with one lexsort.
+
+    Parameters
+    ----------
+    *keys : np.ndarray
+        Key columns, all of the same length.
+
+    Returns
+    -------
+    labels : np.ndarray
+        Group of each row. Groups are numbered in lexicographic key order.
+
+    first : np.ndarray
+        Index of the first row of each group, so that keys[i][first] are
+        the distinct keys.
+    """
+    keys = [np.asarray(key) for key in keys]
+    n = len(keys[0])
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    if all(key.dtype.kind in "biu" for key in keys) and min(int(np.min(key)) for key in keys) >= 0:
+        radix = [int(np.max(key)) + 1 for key in keys]
+        if math.prod(radix) < 2**62:
+            packed = np.zeros(n, dtype=np.int64)
+            for key, r in zip(keys, radix):
+                packed = packed * r + key.astype(np.int64)
+            keys = [packed]
+    order = np.lexsort(keys[::-1]) if len(keys) > 1 else np.argsort(keys[0], kind="stable")
+    changed = np.zeros(n, dtype=bool)
+    changed[0] = True
+    for key in keys:
+        sortedKey = key[order]
+        changed[1:] |= sortedKey[1:] != sortedKey[:-1]
+    labels = np.empty(n, dtype=np.int64)
+    labels[order] = np.cumsum(changed) - 1
+    return labels, order[changed]
+
+def groupedSummary(
+    keys: np.ndarray,
+    values: np.ndarray,
+    percentiles: list[float] | tuple[float, ...] = (50, 90, 99),
+    keyName: str = "key"
+) -> ColumnarTable:
+    """
+    Exact count, total, min, max, mean, stddev and percentiles of values per key.
+
+    Uses one sort of all values, so it is O(n log n) regardless of the
+    number of groups.
+
+    Parameters
+    ----------
+    keys : np.ndarray
+        Group key of each value.
+
+    values : np.ndarray
+        The values to summarize.
+
+    percentiles : list[float] | tuple[float, ...]
+        Percentiles to compute, from 0 to 100, with linear interpolation
+        (like np.percentile); each becomes a column named e.g. 'p50'.
+        Defaults to (50, 90, 99).
+
+    keyName : str
+        Name of the key column in the output. Defaults to 'key'.
+
+    Returns
+    -------
+    summary : ColumnarTable
+        One row per distinct key, by descending total. Same columns as
+        NsysSqlite.kernelSummary(): the key, count, total, min, max, mean,
+        stddev (sample) and the percentiles.
+    """
+    keys = np.asarray(keys)
+    values = np.asarray(values)
+    uniqueKeys, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    numGroups = len(uniqueKeys)
+
+    order = np.lexsort((values, inverse))
+    sortedValues = values[order]
+    count = np.bincount(inverse, minlength=numGroups)
+    offsets = np.zeros(numGroups + 1, dtype=np.int64)
+    np.cumsum(count, out=offsets[1:])
+    first = offsets[:-1]
+
+    total = np.zeros(numGroups, dtype=values.dtype)
+    np.add.at(total, inverse, values)
+    mean = total / np.maximum(count, 1)
+    deviations = values - mean[inverse]
+    sumSquares = np.bincount(inverse, weights=deviations * deviations, minlength=numGroups)
+
+    columns = {
+        keyName: uniqueKeys,
+        "count": count,
+        "total": total,
+        "min": sortedValues[first] if len(values) > 0 else np.zeros(0, dtype=values.dtype),
+        "max": sortedValues[offsets[1:] - 1] if len(values) > 0 else np.zeros(0, dtype=values.dtype),
+        "mean": mean,
+        "stddev": np.sqrt(sumSquares / np.maximum(count - 1, 1)),
+    }
+    for q in percentiles:
+        position = first + q / 100 * (count - 1)
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, offsets[1:] - 1)
+        weight = position - below
+        columns[f"p{q:g}"] = sortedValues[below] * (1 - weight) + sortedValues[above] * weight
+
+    byTotal = np.argsort(-total, kind="stable")
+    return ColumnarTable({name: col[byTotal] for name, col in columns.items()})
+
+def histogramPercentiles(
+    groups: np.ndarray,
+    buckets: np.ndarray,
+    counts: np.ndarray,
+    lo: np.ndarray,
+    hi: np.ndarray,
+    numBins: int,
+    percentiles: list[float] | tuple[float, ...]
+) -> np.ndarray:
+    """
+    Approximate percentiles of many groups from sparse, equal width histograms.
+
+    Group g spans [lo[g], hi[g]] and is split into numBins buckets of width
+    (hi[g] - lo[g] + 1) / numBins; each row (groups[i], buckets[i], counts[i])
+    says how many values of the group fell into that bucket. Values are
+    assumed to be spread evenly inside a bucket, so the error is at most
+    one bucket width. Percentile 0 and 100 are exact (lo and hi).
+
+    Parameters
+    ----------
+    groups : np.ndarray
+        Group index of each histogram row, in 0 .. len(lo) - 1.
+
+    buckets : np.ndarray
+        Bucket index of each histogram row, in 0 .. numBins - 1.
+
+    counts : np.ndarray
+        Number of values in each histogram row.
+
+    lo : np.ndarray
+        Minimum value of each group.
+
+    hi : np.ndarray
+        Maximum value of each group.
+
+    numBins : int
+        Number of buckets each group range was split into.
+
+    percentiles : list[float] | tuple[float, ...]
+        Percentiles to estimate, from 0 to 100.
+
+    Returns
+    -------
+    values : np.ndarray
+        Array of shape (len(lo), len(percentiles)). Groups without any
+        histogram rows get NaN.
+    """
+    lo = np.asarray(lo, dtype=np.float64)
+    hi = np.asarray(hi, dtype=np.float64)
+    numGroups = len(lo)
+    out = np.full((numGroups, len(percentiles)), np.nan)
+
+    order = np.lexsort((buckets, groups))
+    groups = np.asarray(groups)[order]
+    buckets = np.asarray(buckets)[order]
+    counts = np.asarray(counts, dtype=np.int64)[order]
+    if len(counts) == 0:
+        return out
+
+    # One running total over all rows; each group's ranks are offset by the
+    # number of values in the groups before it, so a single searchsorted
+    # locates the bucket of every (group, percentile) pair
+    cumulative = np.cumsum(counts)
+    totals = np.bincount(groups, weights=counts, minlength=numGroups).astype(np.int64)
+    base = np.cumsum(totals) - totals
+    present = np.flatnonzero(totals > 0)
+    width = (hi - lo + 1) / numBins
+
+    for j, q in enumerate(percentiles):
+        if q <= 0:
+            out[present, j] = lo[present]
+            continue
+        if q >= 100:
+            out[present, j] = hi[present]
+            continue
+        # Rank of the percentile within its group, as in numpy's "linear" method
+        rank = q / 100 * (totals[present] - 1)
+        row = np.searchsorted(cumulative, base[present] + rank, side="right")
+        before = cumulative[row] - counts[row] - base[present]
+        fraction = (rank - before + 0.5) / counts[row]
+        value = lo[present] + (buckets[row] + fraction) * width[present]
+        out[present, j] = np.clip(value, lo[present], hi[present])
+    return out
+
+def steadyStateStarts(
+    values: np.ndarray,
+    offsets: np.ndarray,
+    maxFraction: float = 0.5
+) -> np.ndarray:
+    """
+    Start of the steady state of each of many series, e.g. the durations of
+    each kernel name in launch order, so that warm-up values can be dropped.
+
+    Uses the MSER rule: the warm-up length d of a series x of length n is
+    the one minimizing the squared standard error of the mean of what is
+    left, sum((x[d:] - mean(x[d:]))**2) / (n - d)**2, over d up to
+    maxFraction * n. A transient that pulls the mean away inflates the
+    statistic until it is cut off, while cutting off steady values only
+    shrinks the denominator. All candidate d of all series are scored at
+    once from per series suffix sums, so there is no loop over series.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        All series, one after the other.
+
+    offsets : np.ndarray
+        Series i is values[offsets[i]:offsets[i + 1]].
+
+    maxFraction : float
+        Largest fraction of a series that may be discarded. Defaults to 0.5.
+
+    Returns
+    -------
+    starts : np.ndarray
+        Index of the first steady value of each series, relative to the
+        start of the series. Series shorter than 3 values are never cut.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    numSeries = len(counts)
+    starts = np.zeros(numSeries, dtype=np.int64)
+    if len(values) == 0:
+        return starts
+
+    series = np.repeat(np.arange(numSeries), counts)
+    position = np.arange(len(values)) - offsets[:-1][series]
+    remaining = (counts[series] - position).astype(np.float64)
+    # Center each series first, so the sums of squares do not cancel badly
+    means = reduceSegments(np.add, values, offsets, 0.0) / np.maximum(counts, 1)
+    x = values - means[series]
+
+    def suffixSums(v):
+        # Sum of v from each position to the end of its series
+        prefix = np.zeros(len(v) + 1)
+        np.cumsum(v, out=prefix[1:])
+        return prefix[offsets[1:]][series] - prefix[:-1]
+
+    s1 = suffixSums(x)
+    s2 = suffixSums(x * x)
+    statistic = np.maximum(s2 - s1 * s1 / remaining, 0.0) / (remaining * remaining)
+    valid = (position <= maxFraction * counts[series]) & (remaining >= 2) & (counts[series] >= 3)
+    statistic = np.where(valid, statistic, np.inf)
+
+    best = reduceSegments(np.minimum, statistic, offsets, np.inf)
+    # First (i.e. shortest) truncation reaching each series' minimum
+    hits = np.flatnonzero(valid & (statistic <= best[series]))
+    if len(hits) > 0:
+        first = np.concatenate(([True], series[hits[1:]] != series[hits[:-1]]))
+        starts[series[hits[first]]] = position[hits[first]]
+    return starts
+
+def medianConfidenceIntervals(
+    values: np.ndarray,
+    offsets: np.ndarray,
+    confidence: float = 0.95
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Median of each of many groups of values, with a distribution free
+    confidence interval.
+
+    The interval is the pair of order statistics x[j] <= median <= x[n-1-j]
+    with the largest j whose binomial coverage 1 - 2 * P(Binomial(n, 1/2) <= j)
+    is still at least confidence. Small groups cannot reach every confidence
+    level (e.g. 5 values give at most 93.75%); they get their min and max.
+    Groups of more than 10000 values use the normal approximation of the
+    binomial instead, which gives the same or the next wider interval.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        All groups, one after the other, in any order within a group.
+
+    offsets : np.ndarray
+        Group i is values[offsets[i]:offsets[i + 1]].
+
+    confidence : float
+        Confidence level, between 0 and 1. Defaults to 0.95.
+
+    Returns
+    -------
+    median : np.ndarray
+        Median of each group; NaN for empty groups.
+
+    low : np.ndarray
+        Lower end of each interval.
+
+    high : np.ndarray
+        Upper end of each interval.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    numGroups = len(counts)
+    median = np.full(numGroups, np.nan)
+    low = np.full(numGroups, np.nan)
+    high = np.full(numGroups, np.nan)
+    present = np.flatnonzero(counts > 0)
+    if len(present) == 0:
+        return median, low, high
+
+    groups = np.repeat(np.arange(numGroups), counts)
+    sortedValues = values[np.lexsort((values, groups))]
+    first = offsets[:-1][present]
+    n = counts[present]
+    median[present] = (sortedValues[first + (n - 1) // 2] + sortedValues[first + n // 2]) / 2
+
+    # j only depends on the group size, of which there are few distinct ones
+    sizes = np.unique(n)
+    ranks = np.array([_medianRank(int(size), confidence) for size in sizes.tolist()], dtype=np.int64)
+    j = ranks[np.searchsorted(sizes, n)]
+    low[present] = sortedValues[first + j]
+    high[present] = sortedValues[first + n - 1 - j]
+    return median, low, high
+
+# Above this group size, _medianRank() uses the normal approximation
+_EXACT_MEDIAN_RANK_LIMIT = 10000
+
+def _medianRank(n: int, confidence: float) -> int:
+    # Largest j with 1 - 2 * P(B <= j) >= confidence for B ~ Binomial(n, 1/2)
+    if n > _EXACT_MEDIAN_RANK_LIMIT:
+        # Never above the exact rank, and at most one below it
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        return max(math.floor((n - z * math.sqrt(n)) / 2) - 1, 0)
+    # Terms are summed in log space, since 0.5 ** n underflows from n = 1075 on
+    logHalfPower = n * math.log(0.5)
+    logBudget = math.log((1 - confidence) / 2)
+    j = 0
+    logCdf = logHalfPower
+    while j + 1 < n - 1 - j:
+        k = j + 1
+        logTerm = math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1) + logHalfPower
+        logNext = max(logCdf, logTerm) + math.log1p(math.exp(-abs(logCdf - logTerm)))
+        if logNext > logBudget:
+            break
+        logCdf = logNext
+        j = k
+    return j
@@ -0,0 +1,46 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+
+class StringCache:
+    """
+    Bounded least-recently-used cache of StringIds id -> value.
+
+    nsys stores every kernel/NVTX/API name as an integer referencing the
+    StringIds table, so the same few ids are looked up over and over.
+    Safe to share between threads.
+    """
+    def __init__(self, maxSize: int = 65536):
+        if maxSize <= 0:
+            raise ValueError("maxSize must be positive")
+        self._maxSize = maxSize
+        self._cache: OrderedDict[int, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def maxSize(self) -> int:
+        return self._maxSize
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __contains__(self, id: int) -> bool:
+        return id in self._cache
+
+    def get(self, id: int) -> str | None:
+        with self._lock:
+            value = self._cache.get(id)
+            if value is not None:
+                self._cache.move_to_end(id)
+            return value
+
+    def put(self, id: int, value: str):
+        with self._lock:
+            self._cache[id] = value
+            self._cache.move_to_end(id)
+            while len(self._cache) > self._maxSize:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
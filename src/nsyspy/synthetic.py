@@ -0,0 +1,351 @@
+from __future__ import annotations
+import os
+import sqlite3
+
+import numpy as np
+
+# Generator of synthetic nsys sqlite exports, for benchmarks and for trying
+# out the analysis code without a GPU or nsys. Table layouts follow real
+# exports, but only the tables and columns nsyspy reads are written.
+
+SCHEMA = """
+CREATE TABLE StringIds (id INTEGER NOT NULL PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE ENUM_CUDA_KERNEL_LAUNCH_TYPE (id INTEGER NOT NULL PRIMARY KEY, name TEXT NOT NULL, label TEXT NOT NULL);
+CREATE TABLE ENUM_CUPTI_STREAM_TYPE (id INTEGER NOT NULL PRIMARY KEY, name TEXT NOT NULL, label TEXT NOT NULL);
+CREATE TABLE TARGET_INFO_CUDA_STREAM (streamId INTEGER NOT NULL, hwId INTEGER NOT NULL, vmId INTEGER NOT NULL, processId INTEGER NOT NULL, contextId INTEGER NOT NULL, priority INTEGER NOT NULL, flag INTEGER NOT NULL);
+CREATE TABLE CUPTI_ACTIVITY_KIND_KERNEL (start INTEGER NOT NULL, end INTEGER NOT NULL, deviceId INTEGER NOT NULL, contextId INTEGER NOT NULL, greenContextId INTEGER, streamId INTEGER NOT NULL, correlationId INTEGER, globalPid INTEGER, demangledName INTEGER NOT NULL, shortName INTEGER NOT NULL, mangledName INTEGER, launchType INTEGER, cacheConfig INTEGER, registersPerThread INTEGER NOT NULL, gridX INTEGER NOT NULL, gridY INTEGER NOT NULL, gridZ INTEGER NOT NULL, blockX INTEGER NOT NULL, blockY INTEGER NOT NULL, blockZ INTEGER NOT NULL, staticSharedMemory INTEGER NOT NULL, dynamicSharedMemory INTEGER NOT NULL, localMemoryPerThread INTEGER NOT NULL, localMemoryTotal INTEGER NOT NULL, gridId INTEGER NOT NULL, sharedMemoryExecuted INTEGER, graphNodeId INTEGER, sharedMemoryLimitConfig INTEGER, qmdBulkReleaseDone INTEGER, qmdPreexitDone INTEGER, qmdLastCtaDone INTEGER, graphId INTEGER);
+CREATE TABLE CUPTI_ACTIVITY_KIND_RUNTIME (start INTEGER NOT NULL, end INTEGER NOT NULL, eventClass INTEGER NOT NULL, globalTid INTEGER, correlationId INTEGER, nameId INTEGER NOT NULL, returnValue INTEGER NOT NULL, callchainId INTEGER);
+CREATE TABLE ENUM_CUDA_MEMCPY_OPER (id INTEGER NOT NULL PRIMARY KEY, name TEXT NOT NULL, label TEXT NOT NULL);
+CREATE TABLE CUPTI_ACTIVITY_KIND_MEMCPY (start INTEGER NOT NULL, end INTEGER NOT NULL, deviceId INTEGER NOT NULL, contextId INTEGER NOT NULL, greenContextId INTEGER, streamId INTEGER NOT NULL, correlationId INTEGER, globalPid INTEGER, bytes INTEGER NOT NULL, copyKind INTEGER NOT NULL, deprecatedSrcId INTEGER, srcKind INTEGER, dstKind INTEGER, srcDeviceId INTEGER, srcContextId INTEGER, dstDeviceId INTEGER, dstContextId INTEGER, migrationCause INTEGER, graphNodeId INTEGER, virtualAddress INTEGER);
+CREATE TABLE CUPTI_ACTIVITY_KIND_MEMSET (start INTEGER NOT NULL, end INTEGER NOT NULL, deviceId INTEGER NOT NULL, contextId INTEGER NOT NULL, greenContextId INTEGER, streamId INTEGER NOT NULL, correlationId INTEGER, globalPid INTEGER, value INTEGER NOT NULL, bytes INTEGER NOT NULL, graphNodeId INTEGER, memKind INTEGER);
+CREATE TABLE NVTX_EVENTS (start INTEGER NOT NULL, end INTEGER, eventType INTEGER NOT NULL, rangeId INTEGER, category INTEGER, color INTEGER, text TEXT, globalTid INTEGER, endGlobalTid INTEGER, textId INTEGER, domainId INTEGER, uint64Value INTEGER, int64Value INTEGER, doubleValue REAL, uint32Value INTEGER, int32Value INTEGER, floatValue REAL, jsonTextId INTEGER, jsonText TEXT, binaryData BLOB);
+"""
+
+KERNEL_LAUNCH_TYPES = [
+    (0, "CUDA_KERNEL_LAUNCH_TYPE_REGULAR", "Regular"),
+    (1, "CUDA_KERNEL_LAUNCH_TYPE_COOPERATIVE_SINGLE_DEVICE", "Cooperative single device"),
+    (2, "CUDA_KERNEL_LAUNCH_TYPE_COOPERATIVE_MULTI_DEVICE", "Cooperative multi device"),
+]
+
+STREAM_TYPES = [
+    (0, "CUPTI_STREAM_TYPE_NON_BLOCKING", "Non-blocking stream"),
+    (1, "CUPTI_STREAM_TYPE_DEFAULT", "Default stream"),
+    (2, "CUPTI_STREAM_TYPE_NULL", "Null stream"),
+]
+
+MEMCPY_OPERS = [
+    (0, "CUDA_MEMCPY_KIND_UNKNOWN", "Unknown"),
+    (1, "CUDA_MEMCPY_KIND_HTOD", "Host-to-Device"),
+    (2, "CUDA_MEMCPY_KIND_DTOH", "Device-to-Host"),
+    (8, "CUDA_MEMCPY_KIND_DTOD", "Device-to-Device"),
+]
+
+# Bytes per nanosecond (GB/s) of the synthetic copies, by copyKind, and of memsets
+_COPY_BANDWIDTH = {1: 12.0, 2: 13.0, 8: 300.0}
+_MEMSET_BANDWIDTH = 500.0
+
+# nsys packs the process id into the upper bits of globalTid/globalPid
+_PID_SHIFT = 24
+_NVTX_PUSHPOP_RANGE = 59
+
+def generateTrace(
+    path: str,
+    numKernels: int = 10000,
+    numStreams: int = 4,
+    numNames: int = 50,
+    numDevices: int = 1,
+    numThreads: int = 1,
+    kernelsPerRange: int = 10,
+    rangesPerOuterRange: int = 10,
+    seed: int = 0,
+    chunkSize: int = 200000,
+    numMemcpys: int = 0,
+    numMemsets: int = 0,
+    warmup: int = 0
+):
+    """
+    Writes a synthetic, schema compatible nsys sqlite export.
+
+    Every kernel is launched by a cudaLaunchKernel call on one of the host
+    threads; calls on a thread never overlap, and kernels on a stream run in
+    launch order without overlapping. Every kernelsPerRange consecutive
+    launches of a thread are wrapped in an NVTX push/pop range, and every
+    rangesPerOuterRange of those in an enclosing outer range. Columns are
+    generated in NumPy chunks of chunkSize rows, so 10M+ kernel traces only
+    take as long as sqlite needs to insert them.
+
+    Memcpys and memsets, if any, are issued (with cudaMemcpyAsync and
+    cudaMemsetAsync) on the same streams as the kernels, randomly
+    interleaved with the launches, so they overlap kernels on other streams.
+
+    Parameters
+    ----------
+    path : str
+        Output path. An existing file is overwritten.
+
+    numKernels : int
+        Number of kernels (and launching runtime calls). Defaults to 10000.
+
+    numStreams : int
+        Number of streams per device. Defaults to 4.
+
+    numNames : int
+        Number of distinct kernel names. Defaults to 50.
+
+    numDevices : int
+        Number of devices. Defaults to 1.
+
+    numThreads : int
+        Number of launching host threads, all in one process. Defaults to 1.
+
+    kernelsPerRange : int
+        Launches per inner NVTX range; 0 disables NVTX. Defaults to 10.
+
+    rangesPerOuterRange : int
+        Inner ranges per outer NVTX range; 0 disables outer ranges. Defaults to 10.
+
+    seed : int
+        Random seed; the same arguments always produce the same trace. Defaults to 0.
+
+    chunkSize : int
+        Rows generated and inserted at a time. Defaults to 200000.
+
+    numMemcpys : int
+        Number of memcpys, on top of the kernels. Defaults to 0.
+
+    numMemsets : int
+        Number of memsets, on top of the kernels. Defaults to 0.
+
+    warmup : int
+        Number of warm-up launches of every kernel name: the first launch
+        takes 3x its usual duration, and the excess decays linearly to
+        nothing over this many launches. Defaults to 0.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    rng = np.random.default_rng(seed)
+    con = sqlite3.connect(path)
+    con.executescript(SCHEMA)
+    con.executemany("insert into ENUM_CUDA_KERNEL_LAUNCH_TYPE values (?,?,?)", KERNEL_LAUNCH_TYPES)
+    con.executemany("insert into ENUM_CUPTI_STREAM_TYPE values (?,?,?)", STREAM_TYPES)
+    con.executemany("insert into ENUM_CUDA_MEMCPY_OPER values (?,?,?)", MEMCPY_OPERS)
+
+    # Strings: the launch API name first, then the kernel names, then NVTX
+    # range names, then the other API names
+    strings = ["cudaLaunchKernel_v7000"]
+    launchNameId = 1
+    shortIds = np.arange(numNames) + len(strings) + 1
+    strings.extend(f"kernel_{i}" for i in range(numNames))
+    demangledIds = np.arange(numNames) + len(strings) + 1
+    strings.extend(f"void kernel_{i}<float, {32 * (i % 4 + 1)}>(float const*, float*, int)" for i in range(numNames))
+    mangledIds = np.arange(numNames) + len(strings) + 1
+    strings.extend(f"_Z8kernel_{i}ILi{32 * (i % 4 + 1)}EEvPKfPfi" for i in range(numNames))
+    innerRangeId = len(strings) + 1
+    outerRangeId = len(strings) + 2
+    strings.extend(["step", "iteration"])
+    memcpyNameId = len(strings) + 1
+    memsetNameId = len(strings) + 2
+    strings.extend(["cudaMemcpyAsync_v3020", "cudaMemsetAsync_v3020"])
+    con.executemany("insert into StringIds values (?,?)", enumerate(strings, start=1))
+
+    pid = 100
+    globalPid = pid << _PID_SHIFT
+    tids = globalPid + 1 + np.arange(numThreads)
+    streamIds = np.arange(numStreams * numDevices).reshape(numDevices, numStreams) + 7
+    con.executemany(
+        "insert into TARGET_INFO_CUDA_STREAM values (?,?,?,?,?,?,?)",
+        [
+            (int(streamIds[d, s]), d, 0, pid, d + 1, 0, 1 if s == 0 else 0)
+            for d in range(numDevices) for s in range(numStreams)
+        ]
+    )
+
+    # Per kernel name launch configuration and typical duration
+    nameGrid = rng.choice([1, 32, 128, 1024, 8192], size=numNames)
+    nameBlock = rng.choice([64, 128, 256, 512, 1024], size=numNames)
+    nameRegisters = rng.choice([16, 32, 40, 64, 96], size=numNames)
+    nameShmem = rng.choice([0, 0, 4096, 16384, 49152], size=numNames)
+    nameDuration = rng.lognormal(np.log(5000), 1.0, size=numNames)
+
+    threadClock = np.full(numThreads, 1000, dtype=np.int64)
+    threadLaunches = np.zeros(numThreads, dtype=np.int64)
+    streamFree = np.zeros(numStreams * numDevices, dtype=np.int64)
+    nameLaunches = np.zeros(numNames, dtype=np.int64)
+    openRanges = {tid: None for tid in range(numThreads)}
+    # 0 for a kernel, 1 for a memcpy, 2 for a memset; only drawn if needed,
+    # so kernel-only traces do not change
+    numOps = numKernels + numMemcpys + numMemsets
+    opKind = None
+    if numMemcpys + numMemsets > 0:
+        opKind = rng.permutation(np.repeat(np.arange(3, dtype=np.int8), [numKernels, numMemcpys, numMemsets]))
+    for first in range(0, numOps, chunkSize):
+        n = min(chunkSize, numOps - first)
+        thread = rng.integers(0, numThreads, n)
+        name = rng.integers(0, numNames, n)
+        stream = rng.integers(0, numStreams * numDevices, n)
+
+        # Host side: back to back calls per thread, with some think time between
+        overhead = rng.integers(2000, 8000, n)
+        hostGap = rng.integers(0, 3000, n)
+        apiStart = np.zeros(n, dtype=np.int64)
+        for t in range(numThreads):
+            sel = np.flatnonzero(thread == t)
+            step = overhead[sel] + hostGap[sel]
+            apiStart[sel] = threadClock[t] + np.cumsum(step) - step
+            if len(sel) > 0:
+                threadClock[t] = apiStart[sel[-1]] + step[-1]
+        apiEnd = apiStart + overhead
+
+        # Device side: a kernel starts after its launch is submitted and after
+        # the previous kernel on its stream; end[i] = max(ready[i], end[i-1]) + d[i]
+        # is solved per stream with a running maximum
+        duration = np.maximum(rng.normal(nameDuration[name], nameDuration[name] * 0.1), 500).astype(np.int64)
+        kind = np.zeros(n, dtype=np.int8) if opKind is None else opKind[first:first + n]
+        if opKind is not None:
+            numBytes = rng.choice([4096, 65536, 1 << 20, 16 << 20, 64 << 20], size=n)
+            copyKind = rng.choice(list(_COPY_BANDWIDTH), size=n, p=[0.45, 0.35, 0.2])
+            copyBandwidth = np.array([_COPY_BANDWIDTH.get(k, 0.0) for k in range(max(_COPY_BANDWIDTH) + 1)])
+            bandwidth = np.where(kind == 1, copyBandwidth[copyKind], _MEMSET_BANDWIDTH)
+            # Fixed start up cost plus the bytes at a slightly noisy bandwidth
+            transferDuration = (1500 + numBytes / (bandwidth * rng.uniform(0.8, 1.0, n))).astype(np.int64)
+            duration = np.where(kind == 0, duration, transferDuration)
+        if warmup > 0:
+            # Launch number of each kernel among those of its name, counting
+            # earlier chunks too
+            isKernel = np.flatnonzero(kind == 0)
+            kernelNames = name[isKernel]
+            byName = np.argsort(kernelNames, kind="stable")
+            perName = np.bincount(kernelNames, minlength=numNames)
+            occurrence = np.empty(len(isKernel), dtype=np.int64)
+            occurrence[byName] = np.arange(len(isKernel)) - np.repeat(np.cumsum(perName) - perName, perName)
+            occurrence += nameLaunches[kernelNames]
+            nameLaunches += perName
+            slowdown = 1 + 2 * np.clip(1 - occurrence / warmup, 0, 1)
+            duration[isKernel] = (duration[isKernel] * slowdown).astype(np.int64)
+        ready = apiEnd + rng.integers(1000, 5000, n)
+        order = np.argsort(apiStart, kind="stable")
+        kStart = np.zeros(n, dtype=np.int64)
+        for s in range(numStreams * numDevices):
+            sel = order[stream[order] == s]
+            if len(sel) == 0:
+                continue
+            cumulative = np.cumsum(duration[sel])
+            before = cumulative - duration[sel]
+            end = cumulative + np.maximum.accumulate(
+                np.maximum(ready[sel], streamFree[s]) - before)
+            kStart[sel] = end - duration[sel]
+            streamFree[s] = end[-1]
+        kEnd = kStart + duration
+
+        correlationId = first + 1 + np.arange(n)
+        device = stream // numStreams
+        apiNameId = np.choose(kind, [launchNameId, memcpyNameId, memsetNameId])
+        _insertColumns(con, "CUPTI_ACTIVITY_KIND_RUNTIME", [
+            apiStart, apiEnd, np.ones(n, dtype=np.int64), tids[thread], correlationId,
+            apiNameId, np.zeros(n, dtype=np.int64), None,
+        ], n)
+        if opKind is not None:
+            for k, table in ((1, "CUPTI_ACTIVITY_KIND_MEMCPY"), (2, "CUPTI_ACTIVITY_KIND_MEMSET")):
+                sel = kind == k
+                m = int(np.sum(sel))
+                common = [
+                    kStart[sel], kEnd[sel], device[sel], device[sel] + 1, None,
+                    streamIds.reshape(-1)[stream[sel]], correlationId[sel], np.full(m, globalPid),
+                ]
+                if k == 1:
+                    columns = common + [numBytes[sel], copyKind[sel]] + [None] * 10
+                else:
+                    columns = common + [np.zeros(m, dtype=np.int64), numBytes[sel], None, None]
+                _insertColumns(con, table, columns, m)
+            sel = kind == 0
+            (kStart, kEnd, device, stream, correlationId, name) = (
+                kStart[sel], kEnd[sel], device[sel], stream[sel], correlationId[sel], name[sel])
+        k = len(kStart)
+        zeros = np.zeros(k, dtype=np.int64)
+        kernelColumns = [
+            kStart, kEnd, device, device + 1, None, streamIds.reshape(-1)[stream],
+            correlationId, np.full(k, globalPid), demangledIds[name], shortIds[name],
+            mangledIds[name], zeros, zeros, nameRegisters[name],
+            nameGrid[name], np.ones(k, dtype=np.int64), np.ones(k, dtype=np.int64),
+            nameBlock[name], np.ones(k, dtype=np.int64), np.ones(k, dtype=np.int64),
+            zeros, nameShmem[name], zeros, zeros, correlationId,
+            nameShmem[name], zeros, zeros, None, None, None, None,
+        ]
+        _insertColumns(con, "CUPTI_ACTIVITY_KIND_KERNEL", kernelColumns, k)
+
+        if kernelsPerRange > 0:
+            for t in range(numThreads):
+                sel = np.flatnonzero(thread == t)
+                _insertRanges(
+                    con, tids[t], threadLaunches[t], apiStart[sel], apiEnd[sel],
+                    kernelsPerRange, rangesPerOuterRange, innerRangeId, outerRangeId,
+                    openRanges, t
+                )
+                threadLaunches[t] += len(sel)
+
+    # Close the ranges left open at the end of the trace
+    for t, pending in openRanges.items():
+        for rangeStart, textId, lastEnd in (pending or dict()).values():
+            con.execute(
+                "insert into NVTX_EVENTS (start, end, eventType, globalTid, textId, domainId) values (?,?,?,?,?,?)",
+                (rangeStart, lastEnd + 1, _NVTX_PUSHPOP_RANGE, int(tids[t]), textId, 0)
+            )
+    con.commit()
+    con.close()
+
+def _insertColumns(con: sqlite3.Connection, tablename: str, columns: list, n: int):
+    # None columns become NULL; everything else is converted to Python ints
+    # in one go, which is far cheaper than per element conversion
+    values = [
+        [None] * n if col is None else np.asarray(col).tolist()
+        for col in columns
+    ]
+    con.executemany(
+        f"insert into {tablename} values ({','.join('?' * len(columns))})",
+        zip(*values)
+    )
+
+def _insertRanges(
+    con: sqlite3.Connection,
+    globalTid: int,
+    launchOffset: int,
+    apiStart: np.ndarray,
+    apiEnd: np.ndarray,
+    kernelsPerRange: int,
+    rangesPerOuterRange: int,
+    innerRangeId: int,
+    outerRangeId: int,
+    openRanges: dict,
+    thread: int
+):
+    # Ranges are cut at fixed launch counts of each thread; a range that
+    # straddles two chunks is kept open in openRanges until it is complete
+    pending = openRanges[thread] or dict()
+    levels = [("inner", kernelsPerRange, innerRangeId)]
+    if rangesPerOuterRange > 0:
+        levels.append(("outer", kernelsPerRange * rangesPerOuterRange, outerRangeId))
+    rows = list()
+    launchIndex = launchOffset + np.arange(len(apiStart))
+    for level, size, textId in levels:
+        opens = np.flatnonzero(launchIndex % size == 0)
+        closes = np.flatnonzero(launchIndex % size == size - 1)
+        events = sorted([(int(i), True) for i in opens] + [(int(i), False) for i in closes])
+        for i, isOpen in events:
+            if isOpen:
+                # Outer ranges open slightly before, and close slightly after,
+                # the inner ranges they contain
+                margin = 2 if level == "outer" else 1
+                pending[level] = (int(apiStart[i]) - margin, textId, int(apiEnd[i]))
+            elif level in pending:
+                rangeStart, rangeTextId, _ = pending.pop(level)
+                margin = 2 if level == "outer" else 1
+                rows.append((rangeStart, int(apiEnd[i]) + margin, _NVTX_PUSHPOP_RANGE,
+                             int(globalTid), rangeTextId, 0))
+        if level in pending and len(apiEnd) > 0:
+            rangeStart, rangeTextId, _ = pending[level]
+            pending[level] = (rangeStart, rangeTextId, int(apiEnd[-1]))
+    openRanges[thread] = pending
+    con.executemany(
+        "insert into NVTX_EVENTS (start, end, eventType, globalTid, textId, domainId) values (?,?,?,?,?,?)",
+        rows
+    )
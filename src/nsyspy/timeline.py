@@ -0,0 +1,227 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .analysis import KernelTable
+    from .device import Device
+
+import dataclasses
+import numpy as np
+
+from .intervals import mergeIntervals
+from .stats import groupLabels
+
+@dataclasses.dataclass
+class UtilizationSeries:
+    """
+    GPU activity of a time window, downsampled into equal width buckets.
+
+    Row i of the device arrays belongs to deviceIds[i]; row j of the stream
+    arrays to the stream (streamDeviceIds[j], streamIds[j]). Columns are the
+    buckets, bucket b spanning [edges[b], edges[b + 1]).
+
+    busy is the fraction of the bucket during which at least one kernel ran.
+    kernels is the number of kernels running at any point in the bucket.
+    occupancy is the mean launch occupancy (see
+    device.Device.launchOccupancies()) of the kernels running in the
+    bucket, each weighted by how long it ran there; NaN for buckets without
+    kernels. summedOccupancy is the time average, over the whole bucket, of
+    the occupancies of the running kernels added up, so concurrent kernels
+    can take it past 1. Both are None if no device was given.
+    """
+    edges: np.ndarray
+    deviceIds: np.ndarray
+    deviceBusy: np.ndarray
+    deviceKernels: np.ndarray
+    deviceOccupancy: np.ndarray | None
+    deviceSummedOccupancy: np.ndarray | None
+    streamDeviceIds: np.ndarray
+    streamIds: np.ndarray
+    streamBusy: np.ndarray
+    streamKernels: np.ndarray
+    streamOccupancy: np.ndarray | None
+    streamSummedOccupancy: np.ndarray | None
+
+    def __len__(self) -> int:
+        return len(self.edges) - 1
+
+    @property
+    def bucketWidth(self) -> float:
+        return float(self.edges[1] - self.edges[0]) if len(self) > 0 else 0.0
+
+    @property
+    def centers(self) -> np.ndarray:
+        return (self.edges[:-1] + self.edges[1:]) / 2
+
+def utilizationSeries(
+    kernels: KernelTable,
+    numBuckets: int = 2000,
+    start: float | None = None,
+    end: float | None = None,
+    device: Device | dict[int, Device] | None = None
+) -> UtilizationSeries:
+    """
+    Bins GPU activity into numBuckets per device and per stream.
+
+    Every quantity is a sum over the buckets each kernel touches, computed
+    with no per-kernel loop: each kernel only marks its first and last
+    bucket in a difference array, and a prefix sum along the buckets fills
+    in everything between. The only sort is the one merging overlapping
+    kernels for busy, so a series of millions of kernels takes about as
+    long as loading them.
+
+    Parameters
+    ----------
+    kernels : KernelTable
+        The kernels, e.g. from getKernelsBetween(columnar=True). Kernels are
+        clipped to the window.
+
+    numBuckets : int
+        Number of buckets. Defaults to 2000.
+
+    start : float | None
+        Start of the window. Defaults to None, which uses the first kernel start.
+
+    end : float | None
+        End of the window. Defaults to None, which uses the last kernel end.
+
+    device : Device | dict[int, Device] | None
+        Device used to compute launch occupancy, or one per deviceId.
+        Defaults to None, which skips occupancy.
+
+    Returns
+    -------
+    series : UtilizationSeries
+        See UtilizationSeries.
+    """
+    if start is None:
+        start = float(np.min(kernels.start)) if len(kernels) > 0 else 0.0
+    if end is None:
+        end = float(np.max(kernels.end)) if len(kernels) > 0 else start
+    edges = np.linspace(start, end, numBuckets + 1)
+    span = end - start
+
+    # Window relative times; kernels outside the window drop out
+    kStart = np.clip(kernels.start - start, 0, span).astype(np.float64)
+    kEnd = np.clip(kernels.end - start, 0, span).astype(np.float64)
+    inside = kEnd > kStart
+    kStart = kStart[inside]
+    kEnd = kEnd[inside]
+    # Merging is exact on the integer times, and clipping the merged
+    # intervals to the window gives the same union as merging clipped ones
+    absStart = kernels.start[inside]
+    absEnd = kernels.end[inside]
+    deviceIds = kernels.deviceId[inside]
+    streams = kernels.streamId[inside]
+    localEdges = edges - start
+
+    occupancy = None
+    if device is not None:
+        if isinstance(device, dict):
+            occupancy = np.zeros(len(kernels))
+            for d in np.unique(deviceIds).tolist():
+                sel = kernels.deviceId == d
+                occupancy[sel] = device[d].launchOccupancies(kernels[sel])
+        else:
+            occupancy = device.launchOccupancies(kernels)
+        occupancy = occupancy[inside]
+
+    deviceSegments, deviceFirst = groupLabels(deviceIds)
+    streamSegments, streamFirst = groupLabels(deviceIds, streams)
+
+    width = np.diff(localEdges)
+    first, last = _bucketSpans(kStart, kEnd, localEdges)
+    results = list()
+    for segments, numSegments in ((deviceSegments, len(deviceFirst)), (streamSegments, len(streamFirst))):
+        mStart, mEnd, mSeg = mergeIntervals(absStart, absEnd, segments)
+        mStart = np.clip(mStart - start, 0, span).astype(np.float64)
+        mEnd = np.clip(mEnd - start, 0, span).astype(np.float64)
+        mFirst, mLast = _bucketSpans(mStart, mEnd, localEdges)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            busy = _bucketIntegrals(
+                mStart, mEnd, np.ones(len(mStart)), mSeg, numSegments, localEdges, mFirst, mLast) / width
+            occ = summed = None
+            if occupancy is not None:
+                weighted = _bucketIntegrals(
+                    kStart, kEnd, occupancy, segments, numSegments, localEdges, first, last)
+                running = _bucketIntegrals(
+                    kStart, kEnd, np.ones(len(kStart)), segments, numSegments, localEdges, first, last)
+                summed = weighted / width
+        counts = _bucketCounts(segments, numSegments, len(width), first, last)
+        if occupancy is not None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                occ = np.where(counts > 0, weighted / running, np.nan)
+        results.append((busy, counts, occ, summed))
+
+    return UtilizationSeries(
+        edges=edges,
+        deviceIds=deviceIds[deviceFirst],
+        deviceBusy=results[0][0],
+        deviceKernels=results[0][1],
+        deviceOccupancy=results[0][2],
+        deviceSummedOccupancy=results[0][3],
+        streamDeviceIds=deviceIds[streamFirst],
+        streamIds=streams[streamFirst],
+        streamBusy=results[1][0],
+        streamKernels=results[1][1],
+        streamOccupancy=results[1][2],
+        streamSummedOccupancy=results[1][3],
+    )
+
+def _bucketSpans(starts: np.ndarray, ends: np.ndarray, edges: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # First and last bucket touched by each [start, end) interval
+    last = len(edges) - 2
+    first = np.clip(np.searchsorted(edges, starts, side="right") - 1, 0, last)
+    final = np.clip(np.searchsorted(edges, ends, side="left") - 1, 0, last)
+    return first, np.maximum(final, first)
+
+def _bucketIntegrals(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    weights: np.ndarray,
+    segments: np.ndarray,
+    numSegments: int,
+    edges: np.ndarray,
+    first: np.ndarray,
+    last: np.ndarray
+) -> np.ndarray:
+    # Integral over each bucket of sum(weights of intervals covering t).
+    # Each interval adds its partial overlap to its first and last bucket,
+    # and w * bucket width to every bucket strictly in between; the latter
+    # is a difference array (+w after the first, -w at the last) whose
+    # prefix sum gives the total weight fully covering each bucket
+    numBuckets = len(edges) - 1
+    weights = np.asarray(weights, dtype=np.float64)
+    single = first == last
+    overlap = np.where(single, ends, edges[first + 1]) - starts
+    partial = _segmentSums(segments, numSegments, numBuckets, first, weights * overlap)
+    partial += _segmentSums(segments, numSegments, numBuckets, last, np.where(single, 0.0, weights * (ends - edges[last])))
+    diff = _segmentSums(segments, numSegments, numBuckets, first + 1, np.where(single, 0.0, weights))
+    diff -= _segmentSums(segments, numSegments, numBuckets, last, np.where(single, 0.0, weights))
+    return partial + np.cumsum(diff, axis=1) * np.diff(edges)[None, :]
+
+def _bucketCounts(
+    segments: np.ndarray,
+    numSegments: int,
+    numBuckets: int,
+    first: np.ndarray,
+    last: np.ndarray
+) -> np.ndarray:
+    # Intervals touching each bucket, as the prefix sum of +1 at each
+    # interval's first bucket and -1 after its last
+    ones = np.ones(len(first), dtype=np.int64)
+    diff = _segmentSums(segments, numSegments, numBuckets, first, ones)
+    diff -= _segmentSums(segments, numSegments, numBuckets, last + 1, ones)
+    return np.cumsum(diff, axis=1)
+
+def _segmentSums(
+    segments: np.ndarray,
+    numSegments: int,
+    numBuckets: int,
+    buckets: np.ndarray,
+    values: np.ndarray
+) -> np.ndarray:
+    # values summed into a (numSegments, numBuckets) grid; bucket numBuckets
+    # (one past the end) is accepted and dropped
+    stride = numBuckets + 1
+    sums = np.bincount(segments * stride + buckets, values, minlength=numSegments * stride)
+    return sums.reshape(numSegments, stride)[:, :numBuckets].astype(values.dtype)
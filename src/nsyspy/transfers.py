@@ -0,0 +1,128 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .analysis import KernelTable, TransferTable
+
+import dataclasses
+import numpy as np
+
+from .columnar import ColumnarTable
+from .intervals import mergeIntervals, coveredLength
+from .stats import groupLabels
+
+@dataclasses.dataclass
+class TransferOverlap:
+    """
+    How much of each memcpy/memset ran concurrently with kernels on other
+    streams of the same device, i.e. how well transfers were hidden behind
+    compute.
+
+    All arrays have one entry per transfer, in the order of the table that
+    was analyzed. copyKind is None for memsets.
+    """
+    deviceId: np.ndarray
+    streamId: np.ndarray
+    copyKind: np.ndarray | None
+    bytes: np.ndarray
+    duration: np.ndarray
+    # Time during which at least one kernel on another stream was running
+    overlap: np.ndarray
+
+    @property
+    def transferTime(self) -> int:
+        return int(np.sum(self.duration))
+
+    @property
+    def overlappedTime(self) -> int:
+        return int(np.sum(self.overlap))
+
+    @property
+    def exposedTime(self) -> int:
+        """
+        Transfer time not hidden behind any kernel.
+        """
+        return self.transferTime - self.overlappedTime
+
+    @property
+    def efficiency(self) -> float:
+        """
+        Fraction of the transfer time overlapped with compute.
+        """
+        return self.overlappedTime / self.transferTime if self.transferTime > 0 else 0.0
+
+    def summarize(self, by: str = "copyKind") -> ColumnarTable:
+        """
+        Totals per group of transfers.
+
+        Parameters
+        ----------
+        by : str
+            One of 'copyKind', 'deviceId' or 'streamId'. Defaults to 'copyKind'.
+
+        Returns
+        -------
+        summary : ColumnarTable
+            One row per group, by descending transfer time, with columns
+            by, count, bytes, time, overlapped, exposed and efficiency.
+        """
+        keys = getattr(self, by)
+        if keys is None:
+            raise ValueError(f"No {by} column; memsets have no copy kind")
+        uniqueKeys, inverse = np.unique(keys, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        n = len(uniqueKeys)
+        time = np.bincount(inverse, weights=self.duration, minlength=n).astype(np.int64)
+        overlapped = np.bincount(inverse, weights=self.overlap, minlength=n).astype(np.int64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            efficiency = np.where(time > 0, overlapped / time, 0.0)
+        order = np.argsort(-time, kind="stable")
+        return ColumnarTable({
+            by: uniqueKeys[order],
+            "count": np.bincount(inverse, minlength=n)[order],
+            "bytes": np.bincount(inverse, weights=self.bytes, minlength=n).astype(np.int64)[order],
+            "time": time[order],
+            "overlapped": overlapped[order],
+            "exposed": (time - overlapped)[order],
+            "efficiency": efficiency[order],
+        })
+
+def analyzeTransferOverlap(transfers: TransferTable, kernels: KernelTable) -> TransferOverlap:
+    """
+    Measures copy/compute overlap: for every transfer, the time during which
+    at least one kernel on a different stream of the same device was running.
+
+    Kernels are merged into busy intervals once per (device, transfer stream)
+    pair, and each transfer's overlap is then read off the cumulative busy
+    time at its start and end (see intervals.coveredLength()), so the cost is
+    O((n + m) log m) per pair for n transfers and m kernels, with no
+    per-transfer loop.
+
+    Parameters
+    ----------
+    transfers : TransferTable
+        A MemcpyTable or MemsetTable, e.g. from getMemcpyBetween(columnar=True).
+
+    kernels : KernelTable
+        The kernels of the same time range.
+
+    Returns
+    -------
+    overlap : TransferOverlap
+        Per transfer overlap, with totals and summaries.
+    """
+    overlap = np.zeros(len(transfers), dtype=np.int64)
+    _, pairs = groupLabels(transfers.deviceId, transfers.streamId)
+    for deviceId, streamId in zip(transfers.deviceId[pairs].tolist(), transfers.streamId[pairs].tolist()):
+        sel = np.flatnonzero((transfers.deviceId == deviceId) & (transfers.streamId == streamId))
+        other = (kernels.deviceId == deviceId) & (kernels.streamId != streamId)
+        mStarts, mEnds, _ = mergeIntervals(kernels.start[other], kernels.end[other])
+        overlap[sel] = coveredLength(mStarts, mEnds, transfers.start[sel], transfers.end[sel])
+
+    return TransferOverlap(
+        deviceId=transfers.deviceId,
+        streamId=transfers.streamId,
+        copyKind=transfers.copyKind if "copyKind" in transfers else None,
+        bytes=transfers.bytes,
+        duration=transfers.duration,
+        overlap=overlap,
+    )
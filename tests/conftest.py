@@ -0,0 +1,35 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from nsyspy import NsysSqlite
+from nsyspy.synthetic import generateTrace
+
+@pytest.fixture(scope="session")
+def tracePath(tmp_path_factory):
+    """
+    A small synthetic export shared by all tests; copy it (see traceCopy)
+    before writing to it.
+    """
+    path = str(tmp_path_factory.mktemp("trace") / "trace.sqlite")
+    generateTrace(
+        path, numKernels=3000, numStreams=3, numNames=8, numDevices=2, numThreads=2,
+        kernelsPerRange=5, rangesPerOuterRange=4, numMemcpys=300, numMemsets=100, seed=3
+    )
+    return path
+
+@pytest.fixture
+def traceCopy(tracePath, tmp_path):
+    path = str(tmp_path / "trace.sqlite")
+    shutil.copyfile(tracePath, path)
+    return path
+
+@pytest.fixture
+def db(tracePath):
+    db = NsysSqlite(tracePath)
+    yield db
+    db.close()
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from nsyspy import LaunchTable, NsysSqlite
+from nsyspy.stats import groupedSummary
+
+def _digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def test_kernelSummaryMatchesNumpy(db):
+    kernels = db.getKernelsBetween(columnar=True)
+    summary = db.kernelSummary(byStream=True, percentiles=(50, 90))
+    keys, group = np.unique(np.stack([kernels.shortName, kernels.streamId], axis=1), axis=0, return_inverse=True)
+    group = group.reshape(-1)
+    groupOf = {key: g for g, key in enumerate(map(tuple, keys.tolist()))}
+
+    assert len(summary) == len(keys)
+    assert np.all(np.diff(summary.total) <= 0)
+    width = (summary.max - summary.min + 1) / 1024
+    for i, key in enumerate(zip(summary.shortName.tolist(), summary.streamId.tolist())):
+        v = np.sort(kernels.duration[group == groupOf[key]])
+        assert (summary.count[i], summary.total[i]) == (len(v), np.sum(v))
+        assert (summary.min[i], summary.max[i]) == (v[0], v[-1])
+        assert summary.mean[i] == pytest.approx(np.mean(v))
+        assert summary.stddev[i] == pytest.approx(np.std(v, ddof=1))
+        # Percentiles are within one histogram bucket of the order
+        # statistics the exact percentile interpolates between
+        for q in (50, 90):
+            rank = q / 100 * (len(v) - 1)
+            lo, hi = v[int(np.floor(rank))], v[int(np.ceil(rank))]
+            assert lo - width[i] <= summary.columns[f"p{q}"][i] <= hi + width[i]
+    names = db.resolveStrings(summary.shortName.tolist())
+    assert summary.name.tolist() == [names[i] for i in summary.shortName.tolist()]
+
+def _replaceKernels(path, rows):
+    # Recreates the kernel table without NOT NULL constraints, holding
+    # copies of its first row with (shortName, gridX, duration) replaced
+    con = sqlite3.connect(path)
+    cur = con.execute("select * from CUPTI_ACTIVITY_KIND_KERNEL limit 1")
+    columns = [d[0] for d in cur.description]
+    template = list(cur.fetchone())
+    con.execute("create table k as select * from CUPTI_ACTIVITY_KIND_KERNEL where 0")
+    con.execute("drop table CUPTI_ACTIVITY_KIND_KERNEL")
+    con.execute("alter table k rename to CUPTI_ACTIVITY_KIND_KERNEL")
+    start = template[columns.index("start")]
+    for i, (shortName, gridX, duration) in enumerate(rows):
+        row = list(template)
+        row[columns.index("shortName")] = shortName
+        row[columns.index("gridX")] = gridX
+        row[columns.index("start")] = start + 1000 * i
+        row[columns.index("end")] = start + 1000 * i + duration
+        con.execute(f"insert into CUPTI_ACTIVITY_KIND_KERNEL values ({','.join('?' * len(row))})", row)
+    con.commit()
+    con.close()
+
+def test_kernelSummaryNullKeysAndTies(traceCopy):
+    # Three groups with the same total and mean, so only the keys tell them
+    # apart: the deviations of each group must stay with their own group
+    db = NsysSqlite(traceCopy)
+    ids = {name: i for i, name in db.findStringIdsContaining(["kernel_0", "kernel_1"]).items()}
+    kernel0, kernel1 = ids["kernel_0"], ids["kernel_1"]
+    db.close()
+    _replaceKernels(traceCopy, [
+        (kernel0, 1, 10), (kernel0, 1, 30),
+        (kernel1, 1, 20), (kernel1, 1, 20),
+        (kernel0, None, 5), (kernel0, None, 35),
+    ])
+    db = NsysSqlite(traceCopy)
+    try:
+        summary = db.kernelSummary(byLaunchConfig=True, percentiles=(0, 100))
+    finally:
+        db.close()
+    assert len(summary) == 3
+    assert summary.total.tolist() == [40, 40, 40]
+    assert summary.mean.tolist() == [20.0, 20.0, 20.0]
+    byKey = {
+        (s, None if null else g): i
+        for i, (s, g, null) in enumerate(zip(summary.shortName.tolist(), summary.gridX.tolist(),
+                                               summary.nullMask("gridX").tolist()))
+    }
+    assert set(byKey) == {(kernel0, 1), (kernel1, 1), (kernel0, None)}
+    expected = {(kernel0, 1): (10, 30), (kernel1, 1): (20, 20), (kernel0, None): (5, 35)}
+    for key, (lo, hi) in expected.items():
+        i = byKey[key]
+        assert summary.count[i] == 2
+        assert (summary.min[i], summary.max[i]) == (lo, hi)
+        assert (summary.p0[i], summary.p100[i]) == (lo, hi)
+        assert summary.stddev[i] == pytest.approx(np.std([lo, hi], ddof=1))
+
+def _launchKey(launches):
+    return np.lexsort((launches.apiStart, launches.rowid))
+
+def test_joinLaunchesMatchesSql(traceCopy):
+    # Repeat some runtime rows, so those kernels match several calls
+    con = sqlite3.connect(traceCopy)
+    con.execute(
+        "insert into CUPTI_ACTIVITY_KIND_RUNTIME select * from CUPTI_ACTIVITY_KIND_RUNTIME "
+        "where correlationId % 50 = 0")
+    duplicated = con.execute(
+        "select count(*) from CUPTI_ACTIVITY_KIND_KERNEL where correlationId % 50 = 0").fetchone()[0]
+    con.commit()
+    con.close()
+    plain = NsysSqlite(traceCopy)
+    cached = NsysSqlite(traceCopy, cache=True)
+    try:
+        viaSql = plain.getKernelLaunchesBetween()
+        viaCache = cached.getKernelLaunchesBetween()
+        numKernels = len(plain.getKernelsBetween(columnar=True))
+    finally:
+        plain.close()
+        cached.close()
+    assert duplicated > 0
+    assert len(viaSql) == len(viaCache) == numKernels + duplicated
+    viaSql = viaSql[_launchKey(viaSql)]
+    viaCache = viaCache[_launchKey(viaCache)]
+    for name in viaSql.columnNames:
+        assert np.array_equal(viaSql.columns[name], viaCache.columns[name]), name
+
+def test_launchLatency(db):
+    launches = db.getKernelLaunchesBetween()
+    runtime = db.getCudaApiCallsBetween(columnar=True)
+    assert isinstance(launches, LaunchTable)
+    assert len(launches) == len(db.getKernelsBetween(columnar=True))
+    # Every synthetic kernel has exactly one launching call
+    callOf = {c: i for i, c in enumerate(runtime.correlationId.tolist())}
+    call = np.array([callOf[c] for c in launches.correlationId.tolist()])
+    assert np.array_equal(launches.apiStart, runtime.start[call])
+    assert np.array_equal(launches.apiGlobalTid, runtime.globalTid[call])
+    assert np.array_equal(launches.launchOverhead, runtime.end[call] - runtime.start[call])
+    assert np.all(launches.launchLatency > launches.queueDelay)
+
+    summary = launches.summarize("launchLatency", by="apiGlobalTid")
+    exact = groupedSummary(launches.apiGlobalTid, launches.launchLatency, keyName="apiGlobalTid")
+    for name in exact.columnNames:
+        assert np.array_equal(summary.columns[name], exact.columns[name]), name
+    names = launches.summarize(db=db).name.tolist()
+    assert sorted(names) == sorted(db.kernelSummary().name.tolist())
+
+def test_readOnlyNeverWrites(traceCopy):
+    before = (_digest(traceCopy), os.stat(traceCopy).st_mtime_ns)
+    db = NsysSqlite(traceCopy, readOnly=True, indexes="sidecar")
+    try:
+        with pytest.raises(ValueError):
+            db.buildIndexes()
+        with pytest.raises(sqlite3.OperationalError):
+            db.con.execute("create table t (x integer)")
+        kernels = db.getKernelsBetween(columnar=True)
+        t = np.percentile(kernels.start, [0, 25, 50, 75, 100]).astype(np.int64).tolist()
+        with ThreadPoolExecutor(4) as executor:
+            counts = list(executor.map(lambda i: len(db.getKernelsBetween(t[i], t[i + 1], columnar=True)), range(4)))
+        expected = [np.sum((kernels.start >= t[i]) & (kernels.end <= t[i + 1])) for i in range(4)]
+        assert counts == expected
+    finally:
+        db.close()
+    assert (_digest(traceCopy), os.stat(traceCopy).st_mtime_ns) == before
+
+def test_readOnlyUsableFromWorkerThreads(traceCopy):
+    db = NsysSqlite(traceCopy, readOnly=True)
+    try:
+        def work(_):
+            status = db.indexStatus()
+            db.buildIndexes(sidecar=True)
+            db.execute("select count(*) as n from CUPTI_ACTIVITY_KIND_KERNEL")
+            assert db.fetchone()["n"] == len(db.getKernelsBetween(columnar=True))
+            return status, len(db.getKernelsBetween(columnar=True)), db.indexStatus()
+
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(work, range(8)))
+        assert len({count for _, count, _ in results}) == 1
+        assert all(all(after.values()) for _, _, after in results)
+    finally:
+        db.close()
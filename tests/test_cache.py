@@ -0,0 +1,117 @@
+import glob
+import os
+import sqlite3
+
+import numpy as np
+
+from nsyspy import NsysSqlite
+from nsyspy.cache import TraceCache, defaultCachePath
+
+def _assertTablesEqual(a, b):
+    assert a.columnNames == b.columnNames
+    assert len(a) == len(b)
+    for name in a.columnNames:
+        x, y = a.columns[name], b.columns[name]
+        if x.dtype == object:
+            assert x.tolist() == y.tolist(), name
+        else:
+            assert x.dtype == y.dtype, name
+            assert np.array_equal(x, y, equal_nan=x.dtype.kind == "f"), name
+        assert np.array_equal(a.nullMask(name), b.nullMask(name)), name
+
+def _addNvtxText(path):
+    # Synthetic ranges are named by textId only; give some of them text
+    # (and binary data) to exercise object columns
+    con = sqlite3.connect(path)
+    con.execute("update NVTX_EVENTS set text = 'range ' || rowid || ' é→' where rowid % 3 = 0")
+    con.execute("update NVTX_EVENTS set text = '' where rowid % 7 = 0")
+    con.execute("update NVTX_EVENTS set binaryData = x'00ff10' where rowid % 5 = 0")
+    con.commit()
+    con.close()
+
+def test_cacheRoundTrip(traceCopy):
+    _addNvtxText(traceCopy)
+    plain = NsysSqlite(traceCopy)
+    cached = NsysSqlite(traceCopy, cache=True)
+    try:
+        assert os.path.isdir(defaultCachePath(traceCopy))
+        for method in ("getKernelsBetween", "getNvtxBetween", "getCudaApiCallsBetween",
+                       "getMemcpyBetween", "getMemsetBetween"):
+            _assertTablesEqual(getattr(plain, method)(columnar=True), getattr(cached, method)(columnar=True))
+
+        kernels = plain.getKernelsBetween(columnar=True)
+        t0, t1 = int(kernels.start[100]), int(kernels.end[2000])
+        _assertTablesEqual(plain.getKernelsBetween(t0, t1, columnar=True), cached.getKernelsBetween(t0, t1, columnar=True))
+        _assertTablesEqual(plain.getKernelLaunchesBetween(t0, t1), cached.getKernelLaunchesBetween(t0, t1))
+
+        text = cached.getNvtxBetween(columnar=True).text
+        assert any(isinstance(t, str) and t.endswith("é→") for t in text)
+        assert "" in text.tolist() and None in text.tolist()
+        assert bytes.fromhex("00ff10") in cached.getNvtxBetween(columnar=True).binaryData.tolist()
+
+        names = np.unique(kernels.shortName)
+        assert cached._traceCache.resolveStrings(names.tolist()) == plain.resolveStrings(names.tolist())
+    finally:
+        plain.close()
+        cached.close()
+
+def test_cacheNeedsNoPickle(traceCopy):
+    _addNvtxText(traceCopy)
+    db = NsysSqlite(traceCopy)
+    try:
+        cache = db.snapshot()
+    finally:
+        db.close()
+    files = glob.glob(os.path.join(cache.directory, "**", "*.npy"), recursive=True)
+    assert len(files) > 0
+    for path in files:
+        assert np.load(path, allow_pickle=False).dtype != object
+
+def test_emptyTableRoundTrip(traceCopy):
+    con = sqlite3.connect(traceCopy)
+    con.execute("delete from NVTX_EVENTS")
+    con.commit()
+    con.close()
+    plain = NsysSqlite(traceCopy)
+    try:
+        cache = plain.snapshot()
+        # Numeric columns are still written, as zero-length memory maps
+        assert np.load(os.path.join(cache.directory, "NVTX_EVENTS", "start.npy")).shape == (0,)
+        cached = NsysSqlite(traceCopy)
+        try:
+            assert cached.loadCache()
+            nvtx = cached.getNvtxBetween(columnar=True)
+            assert len(nvtx) == 0
+            _assertTablesEqual(plain.getNvtxBetween(columnar=True), nvtx)
+            assert len(cached.projectNvtxToKernels(nvtx)) == 0
+        finally:
+            cached.close()
+    finally:
+        plain.close()
+
+def test_cacheInvalidatedByNewExport(traceCopy):
+    db = NsysSqlite(traceCopy)
+    try:
+        db.snapshot()
+        assert db.loadCache()
+    finally:
+        db.close()
+    directory = defaultCachePath(traceCopy)
+
+    # Rewriting the export changes its size or mtime, so the snapshot no longer matches it
+    con = sqlite3.connect(traceCopy)
+    con.execute("delete from CUPTI_ACTIVITY_KIND_KERNEL where rowid % 2 = 0")
+    con.commit()
+    con.execute("vacuum")
+    con.close()
+    db = NsysSqlite(traceCopy)
+    try:
+        assert not db.loadCache()
+        assert not TraceCache.isValid(directory, "0:0")
+        fresh = NsysSqlite(traceCopy, cache=True)
+        try:
+            assert len(fresh.getKernelsBetween(columnar=True)) == len(db.getKernelsBetween(columnar=True))
+        finally:
+            fresh.close()
+    finally:
+        db.close()
@@ -0,0 +1,90 @@
+import math
+
+import numpy as np
+import pytest
+
+from nsyspy import KernelTable, NvtxTable, RuntimeTable, MemcpyTable, MemsetTable
+
+def _sameValue(a, b):
+    # Float columns hold NULL as NaN, dataclasses as None
+    if isinstance(a, float) and math.isnan(a):
+        return b is None or (isinstance(b, float) and math.isnan(b))
+    return a == b
+
+@pytest.mark.parametrize("method, tableType", [
+    ("getKernelsBetween", KernelTable),
+    ("getNvtxBetween", NvtxTable),
+    ("getCudaApiCallsBetween", RuntimeTable),
+    ("getMemcpyBetween", MemcpyTable),
+    ("getMemsetBetween", MemsetTable),
+])
+def test_columnarMatchesDataclasses(db, method, tableType):
+    table = getattr(db, method)(columnar=True)
+    rows = getattr(db, method)()
+    assert isinstance(table, tableType)
+    assert len(table) == len(rows) > 0
+    assert all(type(r) is tableType.rowType for r in rows)
+
+    fromRecords = tableType.fromRecords(rows)
+    for name in table.columnNames:
+        isFloat = table.columns[name].dtype.kind == "f"
+        assert np.array_equal(table.columns[name], fromRecords.columns[name], equal_nan=isFloat), name
+        assert np.array_equal(table.nullMask(name), fromRecords.nullMask(name)), name
+
+    for i in (0, len(rows) // 2, len(rows) - 1):
+        row = table[i]
+        for field in table.columnNames:
+            assert _sameValue(getattr(row, field), getattr(rows[i], field)), field
+
+def test_timeRange(db):
+    kernels = db.getKernelsBetween(columnar=True)
+    t0, t1 = np.percentile(kernels.start, [25, 75]).astype(np.int64).tolist()
+    expected = kernels[(kernels.start >= t0) & (kernels.end <= t1)]
+    table = db.getKernelsBetween(t0, t1, columnar=True)
+    assert np.array_equal(table.rowid, expected.rowid)
+    assert [k.rowid for k in db.getKernelsBetween(t0, t1)] == expected.rowid.tolist()
+
+@pytest.mark.parametrize("method", ["iterKernelsBetween", "iterNvtxBetween", "iterCudaApiCallsBetween"])
+def test_batchedIterators(db, method):
+    full = getattr(db, method.replace("iter", "get"))(columnar=True)
+    t0, t1 = np.percentile(full.start, [20, 80]).astype(np.int64).tolist()
+    chunks = list(getattr(db, method)(t0, t1, batchSize=97, columnar=True))
+    assert all(len(c) == 97 for c in chunks[:-1]) and 0 < len(chunks[-1]) <= 97
+    expected = full[(full.start >= t0) & (full.end <= t1)]
+    assert np.array_equal(type(full).concatenate(chunks).rowid, expected.rowid)
+    rows = list(getattr(db, method)(t0, t1, batchSize=97))
+    assert all(type(r) is type(full).rowType for r in rows)
+    assert [r.rowid for r in rows] == expected.rowid.tolist()
+
+def test_kernelsAfter(db):
+    kernels = db.getKernelsBetween()
+    assert db.getKernelsAfter(kernels[10], 3) == kernels[11:14]
+    assert db.getKernelsAfter(kernels[10], 3, columnar=True).rowid.tolist() == [k.rowid for k in kernels[11:14]]
+    # Fewer kernels at the end of the table
+    assert db.getKernelsAfter(kernels[-2], 5) == kernels[-1:]
+
+def test_kernelsFromApiCalls(db):
+    calls = db.getCudaApiCallsBetween()[:50]
+    kernels = db.getKernelsFromApiCalls(calls)
+    # Some calls are memcpys and memsets, which launch no kernel
+    launched = set(db.getKernelsBetween(columnar=True).correlationId.tolist())
+    assert len(kernels) > 0
+    assert sorted(k.correlationId for k in kernels) == sorted(c.correlationId for c in calls if c.correlationId in launched)
+    assert db.getKernelsFromApiCalls(calls, columnar=True).rowid.tolist() == [k.rowid for k in kernels]
+
+def test_byName(db):
+    table = db.getKernels(viaShortNames="kernel_1", columnar=True)
+    rows = db.getKernels(viaShortNames="kernel_1")
+    assert len(table) == len(rows) > 0
+    assert table.rowid.tolist() == [k.rowid for k in rows]
+    assert len(np.unique(table.shortName)) == 1
+
+def test_indexing(db):
+    kernels = db.getKernelsBetween(columnar=True)
+    assert np.array_equal(kernels.duration, kernels.end - kernels.start)
+    assert np.array_equal(kernels.totalBlocks, kernels.gridX * kernels.gridY * kernels.gridZ)
+    subset = kernels[kernels.streamId == kernels.streamId[0]]
+    assert isinstance(subset, KernelTable)
+    assert np.all(subset.streamId == kernels.streamId[0])
+    assert np.array_equal(kernels[2:5].rowid, kernels.rowid[2:5])
+    assert np.array_equal(KernelTable.concatenate([kernels[:10], kernels[10:]]).start, kernels.start)
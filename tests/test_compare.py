@@ -0,0 +1,61 @@
+import shutil
+import sqlite3
+
+import numpy as np
+import pytest
+
+from nsyspy import NsysSqlite
+from nsyspy.compare import compareKernels, compareReports
+from nsyspy.columnar import ColumnarTable
+
+def test_slowedKernelIsARegression(tracePath, tmp_path):
+    afterPath = str(tmp_path / "after.sqlite")
+    shutil.copy(tracePath, afterPath)
+    con = sqlite3.connect(afterPath)
+    con.execute(
+        "update CUPTI_ACTIVITY_KIND_KERNEL set end = start + 2 * (end - start) "
+        "where shortName = (select id from StringIds where value = 'kernel_0')")
+    con.commit()
+    con.close()
+    before, after = NsysSqlite(tracePath), NsysSqlite(afterPath)
+    try:
+        comparison = compareReports(before, after, matchBy=[])
+        kernels = before.getKernelsBetween(columnar=True)
+        slowed = after.getKernelsBetween(columnar=True)
+    finally:
+        before.close()
+        after.close()
+    assert comparison.totalBefore == int(np.sum(kernels.duration))
+    assert comparison.totalChange == int(np.sum(slowed.duration - kernels.duration)) > 0
+    assert len(comparison.matched) == len(comparison.kernels) == 8
+    assert comparison.regressions(alpha=1e-6).name.tolist() == ["kernel_0"]
+    assert len(comparison.improvements()) == 0
+    row = comparison.kernels[comparison.kernels.name == "kernel_0"]
+    assert row.relativeChange[0] == pytest.approx(1.0, abs=0.01)
+
+def _kernels(names, durations, gridX):
+    start = np.arange(len(names), dtype=np.int64) * 1000
+    return ColumnarTable({
+        "shortName": np.array(names, dtype=np.int64),
+        "gridX": np.array(gridX, dtype=np.int64),
+        "start": start,
+        "end": start + np.array(durations, dtype=np.int64),
+        "duration": np.array(durations, dtype=np.int64),
+    })
+
+def test_mannWhitneyMatchesBruteForce():
+    rng = np.random.default_rng(4)
+    before = _kernels(rng.integers(1, 3, 60), rng.integers(0, 20, 60), rng.integers(0, 2, 60))
+    after = _kernels(rng.integers(1, 3, 50), rng.integers(5, 25, 50), rng.integers(0, 2, 50))
+    # Different ids for the same names in the two reports
+    comparison = compareKernels(before, after, {1: "a", 2: "b"}, {1: "a", 2: "b"}, matchBy=["gridX"])
+    names = {"a": 1, "b": 2}
+    assert len(comparison.kernels) == 4
+    for i in range(len(comparison.kernels)):
+        name, grid = names[comparison.kernels.name[i]], comparison.kernels.gridX[i]
+        x = before.duration[(before.shortName == name) & (before.gridX == grid)]
+        y = after.duration[(after.shortName == name) & (after.gridX == grid)]
+        u = np.sum(x[:, None] > y[None, :]) + 0.5 * np.sum(x[:, None] == y[None, :])
+        assert comparison.kernels.u[i] == pytest.approx(u)
+        assert comparison.kernels.countBefore[i] == len(x)
+        assert comparison.kernels.medianAfter[i] == np.median(y)
@@ -0,0 +1,57 @@
+import numpy as np
+
+from nsyspy import KernelTable
+from nsyspy.concurrency import analyzeConcurrency
+
+def _kernels(rows):
+    # (deviceId, streamId, start, end) per kernel
+    deviceId, streamId, start, end = (np.array(c, dtype=np.int64) for c in zip(*rows))
+    return KernelTable({"start": start, "end": end, "deviceId": deviceId, "streamId": streamId})
+
+def test_handBuiltTrace():
+    kernels = _kernels([
+        (0, 1, 0, 10),
+        (0, 1, 20, 30),
+        (0, 2, 5, 15),
+        (0, 2, 25, 40),
+        (1, 3, 100, 110),
+        (1, 3, 110, 120),   # back to back: no overlap and no gap
+        (1, 4, 130, 140),
+    ])
+    results = analyzeConcurrency(kernels)
+    assert sorted(results) == [0, 1]
+
+    d0 = results[0]
+    assert (d0.start, d0.end, d0.span) == (0, 40, 40)
+    assert d0.busyTime == 35
+    assert d0.idleTime == 5
+    assert d0.utilization == 35 / 40
+    # Idle 15..20, one kernel 0..5, 10..15, 20..25, 30..40, two 5..10, 25..30
+    assert d0.concurrencyTime.tolist() == [5, 25, 10]
+    assert d0.meanConcurrency == (25 + 2 * 10) / 35
+    assert d0.streamIds.tolist() == [1, 2]
+    assert d0.streamBusyTime.tolist() == [20, 25]
+    assert d0.gapStart.tolist() == [15]
+    assert d0.gapEnd.tolist() == [20]
+    assert d0.gapKernelBefore.tolist() == [2]
+    assert d0.gapKernelAfter.tolist() == [1]
+
+    d1 = results[1]
+    assert (d1.start, d1.end, d1.busyTime) == (100, 140, 30)
+    assert d1.concurrencyTime.tolist() == [10, 30]
+    assert d1.gapStart.tolist() == [120]
+    assert d1.gapKernelBefore.tolist() == [5]
+    assert d1.gapKernelAfter.tolist() == [6]
+
+def test_window():
+    kernels = _kernels([(0, 1, 0, 10), (0, 2, 5, 15), (0, 1, 30, 40)])
+    d0 = analyzeConcurrency(kernels, start=8, end=35)[0]
+    # Kernels are clipped to 8..35, which leaves one gap, from 15 to 30
+    assert d0.busyTime == 7 + 5
+    assert d0.gapStart.tolist() == [15]
+    assert d0.gapEnd.tolist() == [30]
+    assert d0.gapKernelBefore.tolist() == [1]
+    assert d0.gapKernelAfter.tolist() == [2]
+    assert d0.concurrencyTime.tolist() == [15, 10, 2]
+    assert int(np.sum(d0.concurrencyTime)) == d0.span
+    assert d0.longestIdleGaps(1).tolist() == [0]
@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from nsyspy import KernelTable, RuntimeTable
+from nsyspy.criticalpath import (
+    DependencyGraph, buildDependencyGraph, analyzeCriticalPath, STREAM_EDGE, HOST_EDGE, LAUNCH_EDGE, SYNC_EDGE
+)
+
+PID = 7 << 24
+TID = PID | 1
+LAUNCH, SYNC = 1, 2
+API_NAMES = {LAUNCH: "cudaLaunchKernel_v7000", SYNC: "cudaDeviceSynchronize_v3020"}
+
+def _trace():
+    # One thread launches A and B on stream 1 and C on stream 2, then waits
+    # for the device. A and B run back to back and end last, so the path is
+    # launch A -> A -> B -> synchronize; C finishes 15ns before it is needed.
+    kernels = KernelTable({
+        "start": np.array([10, 20, 12]),
+        "end": np.array([20, 45, 30]),
+        "deviceId": np.zeros(3, dtype=np.int64),
+        "streamId": np.array([1, 1, 2]),
+        "globalPid": np.full(3, PID),
+        "correlationId": np.array([1, 2, 3]),
+    })
+    runtime = RuntimeTable({
+        "start": np.array([0, 3, 5, 6]),
+        "end": np.array([2, 5, 6, 50]),
+        "globalTid": np.full(4, TID),
+        "correlationId": np.array([1, 2, 3, 4]),
+        "nameId": np.array([LAUNCH, LAUNCH, LAUNCH, SYNC]),
+    })
+    return kernels, runtime
+
+def test_dependencyGraph():
+    graph = buildDependencyGraph(*_trace(), API_NAMES)
+    assert len(graph) == 7
+    assert graph.numKernels == 3
+    edges = set(zip(graph.edgeSource.tolist(), graph.edgeTarget.tolist(), graph.edgeKind.tolist()))
+    assert edges == {
+        (0, 1, STREAM_EDGE),
+        (3, 4, HOST_EDGE), (4, 5, HOST_EDGE), (5, 6, HOST_EDGE),
+        (3, 0, LAUNCH_EDGE), (4, 1, LAUNCH_EDGE), (5, 2, LAUNCH_EDGE),
+        (1, 6, SYNC_EDGE), (2, 6, SYNC_EDGE),
+    }
+    # Kernels are ready when their launch call starts or the previous kernel
+    # of the stream ends; the synchronize call when the last kernel ends
+    assert graph.ready.tolist() == [0, 20, 5, 0, 2, 5, 45]
+    assert graph.cost.tolist() == [20, 25, 25, 2, 3, 1, 5]
+
+def test_criticalPath():
+    path = analyzeCriticalPath(buildDependencyGraph(*_trace(), API_NAMES))
+    assert path.path.tolist() == [3, 0, 1, 6]
+    assert path.length == 50
+    assert path.pathKernels.tolist() == [0, 1]
+    assert path.pathGpuTime == 45
+    assert path.binding.tolist() == [3, 0, 5, -1, 3, 4, 1]
+    assert path.slack.tolist() == [0, 0, 15, 0, 15, 15, 0]
+    assert path.kernelSlack.tolist() == [0, 0, 15]
+    assert path.onPath.tolist() == [True, True, False, True, False, False, True]
+
+    summary = path.summarize(nameColumn="streamId")
+    assert summary.streamId.tolist() == [1, 2]
+    assert summary.critical.tolist() == [2, 0]
+    assert summary.criticalTime.tolist() == [45, 0]
+    assert summary.minSlack.tolist() == [0, 15]
+
+def test_syntheticTrace(db):
+    graph = db.getDependencyGraph()
+    kernels = graph.kernels
+    assert graph.numKernels == len(kernels) > 0
+    # Every kernel of the synthetic trace has its launch call
+    assert np.sum(graph.edgeKind == LAUNCH_EDGE) == len(kernels)
+    assert np.all(graph.edgeArrival <= graph.end[graph.edgeTarget])
+
+    path = analyzeCriticalPath(graph)
+    assert path.length == int(graph.end.max() - graph.start[path.path[0]])
+    assert np.all(path.slack >= 0)
+    assert np.all(path.slack[path.path] == 0)
+    # Consecutive path nodes are joined by edges
+    edges = set(zip(graph.edgeSource.tolist(), graph.edgeTarget.tolist()))
+    assert all((a, b) in edges for a, b in zip(path.path[:-1].tolist(), path.path[1:].tolist()))
+
+def test_tiedReadyTimes():
+    # B takes no time and is ready when A ends, at 10, which is also when the
+    # synchronize call that waited for it is ready; by start time the call
+    # would come first. The call after it on the host ends last.
+    kernels = KernelTable({
+        "start": np.array([2, 10]),
+        "end": np.array([10, 10]),
+        "deviceId": np.zeros(2, dtype=np.int64),
+        "streamId": np.ones(2, dtype=np.int64),
+        "globalPid": np.full(2, PID),
+        "correlationId": np.array([1, 2]),
+    })
+    runtime = RuntimeTable({
+        "start": np.array([0, 1, 5, 20]),
+        "end": np.array([1, 2, 10, 21]),
+        "globalTid": np.full(4, TID),
+        "correlationId": np.array([1, 2, 3, 4]),
+        "nameId": np.array([LAUNCH, LAUNCH, SYNC, LAUNCH]),
+    })
+    graph = buildDependencyGraph(kernels, runtime, API_NAMES)
+    assert (1, 4, SYNC_EDGE) in set(zip(graph.edgeSource.tolist(), graph.edgeTarget.tolist(), graph.edgeKind.tolist()))
+    assert graph.ready[1] == graph.ready[4] == 10
+
+    path = analyzeCriticalPath(graph)
+    assert path.path.tolist() == [2, 0, 1, 4, 5]
+    assert path.slack.tolist() == [0, 0, 0, 8, 0, 0]
+
+def test_cycleIsRejected():
+    graph = DependencyGraph(
+        kernels=None, runtime=None, numKernels=2,
+        start=np.array([0, 0]), end=np.array([0, 0]), ready=np.array([0, 0]),
+        edgeSource=np.array([0, 1]), edgeTarget=np.array([1, 0]),
+        edgeKind=np.array([STREAM_EDGE, STREAM_EDGE], dtype=np.int8), edgeArrival=np.array([0, 0]),
+    )
+    with pytest.raises(ValueError):
+        analyzeCriticalPath(graph)
+
+def test_slackMatchesDefinition(db):
+    # slack[i] = min(end of graph - end[i], min over successors s of
+    # slack[s] + ready[s] - arrival(i, s)), visited in reverse time order
+    graph = db.getDependencyGraph(*np.percentile(db.getKernelsBetween(columnar=True).start, [40, 60]).tolist())
+    slack = analyzeCriticalPath(graph).slack
+    expected = graph.end.max() - graph.end
+    successors = dict()
+    for e, s in enumerate(graph.edgeSource.tolist()):
+        successors.setdefault(s, list()).append(e)
+    for v in np.lexsort((graph.end, graph.start, graph.ready))[::-1].tolist():
+        for e in successors.get(v, ()):
+            t = graph.edgeTarget[e]
+            expected[v] = min(expected[v], expected[t] + graph.ready[t] - graph.edgeArrival[e])
+    assert np.array_equal(slack, expected)
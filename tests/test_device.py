@@ -0,0 +1,62 @@
+import dataclasses
+
+import numpy as np
+import pytest
+
+from nsyspy.device import A10, CC75, L4, Device, computeCapability
+
+@pytest.mark.parametrize("deviceType", [A10, L4])
+def test_batchMatchesScalar(db, deviceType):
+    device = deviceType()
+    table = db.getKernelsBetween(columnar=True)
+    kernels = db.getKernelsBetween()
+
+    blocks, limits = device.maxKernelBlksPerSmBatch(table)
+    occupancy, _ = device.theoreticalOccupancies(table)
+    launchOccupancy = device.launchOccupancies(table)
+    for i, kernel in enumerate(kernels):
+        assert (blocks[i], limits[i]) == device.maxKernelBlksPerSm(kernel)
+        assert occupancy[i] == pytest.approx(device.theoreticalOccupancy(kernel)[0])
+        assert launchOccupancy[i] == pytest.approx(device.launchOccupancy(kernel))
+
+def test_changedCapabilityIsNotServedFromCache(db):
+    table = db.getKernelsBetween(columnar=True)
+    device = A10()
+    before, _ = device.maxKernelBlksPerSmBatch(table)
+
+    device.compute_capability = CC75()
+    after, _ = device.maxKernelBlksPerSmBatch(table)
+    fresh = A10()
+    fresh.compute_capability = CC75()
+    assert np.array_equal(after, fresh.maxKernelBlksPerSmBatch(table)[0])
+    assert not np.array_equal(before, after)
+
+    device.cc.max_shmem_per_sm = 0
+    assert np.all(device.maxKernelBlksPerSmBatch(table)[0][table.staticSharedMemory + table.dynamicSharedMemory > 0] == 0)
+
+def test_occupancySweep(db):
+    table = db.getKernelsBetween(columnar=True)
+    device = Device.fromName("A100")
+    sweep = device.occupancySweep(table, registersPerThread=[32, 64], top=3, db=db)
+    assert len(sweep) > 0
+    assert np.all(sweep.rank < 3)
+    assert np.all(sweep.gain > 0)
+    candidate, limitedBy = device.allocatedOccupancy(
+        sweep.candidateBlockSize, sweep.candidateRegistersPerThread, sweep.candidateSharedMemory)
+    assert np.array_equal(sweep.candidateOccupancy, candidate)
+    assert np.array_equal(sweep.candidateLimitedBy, limitedBy)
+    assert np.array_equal(sweep.gain, sweep.candidateOccupancy - sweep.occupancy)
+    # Kernels by descending total time, candidates by rank and never worse
+    # than the next one
+    assert np.all(np.diff(sweep.totalTime) <= 0)
+    same = np.diff(sweep.rank) == 1
+    assert np.all(np.diff(sweep.candidateOccupancy)[same] <= 0)
+    assert set(sweep.name.tolist()) <= set(db.resolveStringColumn(table.shortName).tolist())
+
+def test_registeredCapabilities():
+    assert dataclasses.astuple(Device.fromName("A10")) == dataclasses.astuple(A10())
+    # Orin: 8.0 shared memory, but only 48 resident warps per SM
+    assert computeCapability(8, 7).max_resident_warps_per_sm == 48
+    assert computeCapability(8, 7).max_shmem_per_sm == computeCapability(8, 0).max_shmem_per_sm
+    with pytest.raises(KeyError):
+        computeCapability(1, 0)
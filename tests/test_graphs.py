@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from nsyspy import KernelTable
+from nsyspy.graphs import analyzeGraphLaunches
+
+PID = 7 << 24
+
+def _kernels():
+    # Five launches of one graph, 100ns apart: node 1 (10ns), a 2ns gap, then
+    # node 2, which takes 10ns except in the last launch, where it takes 40ns.
+    # One more kernel was launched outside any graph.
+    rows = list()
+    for i in range(5):
+        t = 100 * i
+        rows.append((t, t + 10, 1, 1, 1, i + 1))
+        rows.append((t + 12, t + 12 + (40 if i == 4 else 10), 1, 2, 2, i + 1))
+    rows.append((600, 610, 0, 0, 3, 6))
+    start, end, graphId, graphNodeId, shortName, correlationId = (np.array(c) for c in zip(*rows))
+    return KernelTable({
+        "start": start, "end": end, "globalPid": np.full(len(start), PID),
+        "graphId": graphId, "graphNodeId": graphNodeId, "shortName": shortName,
+        "correlationId": correlationId,
+    })
+
+def test_launchesAndNodes():
+    result = analyzeGraphLaunches(_kernels())
+    launches = result.launches
+    assert len(result) == 5
+    assert launches.correlationId.tolist() == [1, 2, 3, 4, 5]
+    assert launches.kernels.tolist() == [2] * 5
+    assert launches.span.tolist() == [22, 22, 22, 22, 52]
+    assert launches.busy.tolist() == [20, 20, 20, 20, 50]
+    assert launches.idle.tolist() == [2] * 5
+    assert launches.gaps.tolist() == [1] * 5
+    assert launches.longestGap.tolist() == [2] * 5
+    assert result.launchOfKernel.tolist() == [0, 0, 1, 1, 2, 2, 3, 3, 4, 4, -1]
+
+    nodes = result.nodes
+    assert nodes.graphNodeId.tolist() == [1, 2]
+    assert nodes["count"].tolist() == [5, 5]
+    # Node 2 alone explains the jitter and the slow launch
+    assert nodes.varianceShare.tolist() == pytest.approx([0.0, 1.0])
+    assert nodes.tailExcess.tolist() == pytest.approx([0.0, 24.0])
+    assert nodes.tailShare.tolist() == pytest.approx([0.0, 1.0])
+    assert nodes.dominant.tolist() == [False, True]
+    assert result.dominantNodes().graphNodeId.tolist() == [2]
+
+    summary = result.summarize()
+    assert summary.graphId.tolist() == [1]
+    assert summary.nodes.tolist() == [2]
+    assert summary.total.tolist() == [140]
+    assert summary.busy.tolist() == [130]
+    assert summary.idle.tolist() == [10]
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import sqlite3
+
+import numpy as np
+import pytest
+
+from nsyspy import NsysSqlite
+from nsyspy.indexes import defaultSidecarPath
+
+def _digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _queries(db, t0, t1):
+    # Without an order by, an index may return rows in another order
+    calls = db.getCudaApiCallsBetween(t0, t1)
+    return (
+        sorted(db.getKernelsBetween(t0, t1, columnar=True).rowid.tolist()),
+        sorted(c.rowid for c in calls),
+        sorted(db.getNvtxBetween(t0, t1, columnar=True).rowid.tolist()),
+        sorted(k.rowid for k in db.getKernelsFromApiCalls(calls)),
+    )
+
+@pytest.mark.parametrize("mode", ["inplace", "sidecar"])
+def test_indexedQueriesMatch(traceCopy, mode):
+    plain = NsysSqlite(traceCopy)
+    try:
+        # Host side times, as transfers can leave the GPU far behind the CPU
+        calls = plain.getCudaApiCallsBetween(columnar=True)
+        t0, t1 = np.percentile(calls.start, [10, 20]).astype(np.int64).tolist()
+        expected = _queries(plain, t0, t1)
+        assert not plain.lastQueryUsedIndex()
+        assert not any(plain.indexStatus().values())
+    finally:
+        plain.close()
+
+    before = _digest(traceCopy)
+    db = NsysSqlite(traceCopy, indexes=mode)
+    try:
+        assert all(db.indexStatus().values())
+        db.getKernelsBetween(t0, t1)
+        assert db.lastQueryUsedIndex()
+        assert _queries(db, t0, t1) == expected
+        assert all(len(rows) > 0 for rows in expected)
+    finally:
+        db.close()
+    if mode == "sidecar":
+        assert _digest(traceCopy) == before
+        assert os.path.exists(defaultSidecarPath(traceCopy))
+
+def test_sidecarRebuiltOnlyWhenExportChanges(traceCopy):
+    NsysSqlite(traceCopy, indexes="sidecar").close()
+    sidecar = defaultSidecarPath(traceCopy)
+    builtAt = os.stat(sidecar).st_mtime_ns
+    NsysSqlite(traceCopy, indexes="sidecar").close()
+    assert os.stat(sidecar).st_mtime_ns == builtAt
+
+    con = sqlite3.connect(traceCopy)
+    con.execute("delete from CUPTI_ACTIVITY_KIND_KERNEL where rowid % 2 = 0")
+    con.commit()
+    con.close()
+    db = NsysSqlite(traceCopy, indexes="sidecar")
+    try:
+        assert os.stat(sidecar).st_mtime_ns != builtAt
+        assert np.all(db.getKernelsBetween(columnar=True).rowid % 2 == 1)
+        assert sorted(db.getKernelsBetween(0, 10**12, columnar=True).rowid.tolist()) == \
+            db.getKernelsBetween(columnar=True).rowid.tolist()
+    finally:
+        db.close()
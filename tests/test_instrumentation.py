@@ -0,0 +1,40 @@
+import numpy as np
+
+from nsyspy.instrumentation import InstrumentedCursor
+
+def test_recordsEveryStatement(db):
+    assert not isinstance(db._execute("select 1"), InstrumentedCursor)
+    finished = list()
+    profiler = db.enableInstrumentation(callback=finished.append)
+    kernels = db.getKernelsBetween(columnar=True)
+    rows = db.getKernelsBetween()
+    db.resolveStringColumn(kernels.shortName)
+    assert db.disableInstrumentation() is profiler
+
+    assert len(profiler.records) >= 3
+    assert finished == profiler.records
+    selects = [r for r in profiler.records if "CUPTI_ACTIVITY_KIND_KERNEL" in r.statement]
+    assert [r.rows for r in selects] == [len(kernels), len(rows)]
+    assert all(r.seconds > 0 and r.bytes > 0 and r.constructSeconds > 0 for r in selects)
+    # No time range, so the kernel table is scanned in full
+    assert all(len(r.fullScans) > 0 for r in selects)
+    assert profiler.fullScans() == selects
+    assert profiler.slowest(1)[0].totalSeconds == max(r.totalSeconds for r in profiler.records)
+    byStatement = profiler.byStatement()
+    assert sum(r.rows for r in byStatement.values()) == sum(r.rows for r in profiler.records)
+    assert f"{len(profiler.records)} queries" in profiler.report()
+
+    # Nothing is recorded once disabled
+    db.getKernelsBetween(columnar=True)
+    assert len(profiler.records) == len(finished)
+
+def test_instrumentedResultsMatch(db):
+    plain = db.kernelSummary()
+    db.enableInstrumentation(explain=False, measureBytes=False)
+    try:
+        instrumented = db.kernelSummary()
+    finally:
+        profiler = db.disableInstrumentation()
+    assert all(r.plan == [] and r.bytes == 0 for r in profiler.records)
+    for name in plain.columnNames:
+        assert np.array_equal(plain.columns[name], instrumented.columns[name]), name
@@ -0,0 +1,38 @@
+import numpy as np
+
+from nsyspy.intervals import mergeIntervals, unionLength, reduceSegments, expandRanges
+
+def _bruteUnion(starts, ends):
+    covered = set()
+    for s, e in zip(starts, ends):
+        covered.update(range(s, e))
+    return len(covered)
+
+def test_mergeIntervals():
+    starts = np.array([0, 5, 20, 30, 12, 0])
+    ends = np.array([10, 12, 25, 40, 15, 3])
+    segments = np.array([0, 0, 0, 0, 0, 1])
+    mStarts, mEnds, mSegs = mergeIntervals(starts, ends, segments)
+    # Touching intervals merge too: [0, 12) and [12, 15)
+    assert mStarts.tolist() == [0, 20, 30, 0]
+    assert mEnds.tolist() == [15, 25, 40, 3]
+    assert mSegs.tolist() == [0, 0, 0, 1]
+    assert [len(a) for a in mergeIntervals(np.zeros(0), np.zeros(0))] == [0, 0, 0]
+
+def test_unionLengthMatchesBruteForce():
+    rng = np.random.default_rng(0)
+    starts = rng.integers(0, 1000, 300)
+    ends = starts + rng.integers(0, 50, 300)
+    segments = rng.integers(0, 4, 300)
+    assert unionLength(starts, ends) == _bruteUnion(starts, ends)
+    perSegment = unionLength(starts, ends, segments, 5)
+    assert perSegment.tolist() == [_bruteUnion(starts[segments == g], ends[segments == g]) for g in range(5)]
+
+def test_reduceSegmentsAndExpandRanges():
+    values = np.array([3, 1, 4, 1, 5])
+    offsets = np.array([0, 2, 2, 5])
+    assert reduceSegments(np.minimum, values, offsets, empty=-1).tolist() == [1, -1, 1]
+    assert reduceSegments(np.add, values, offsets).tolist() == [4, 0, 10]
+    owner, index = expandRanges(np.array([2, 5, 0]), np.array([4, 5, 3]))
+    assert owner.tolist() == [0, 0, 2, 2, 2]
+    assert index.tolist() == [2, 3, 0, 1, 2]
@@ -0,0 +1,77 @@
+import numpy as np
+
+from nsyspy import NvtxTable
+from nsyspy.nvtxtree import buildNvtxTree
+
+PUSHPOP = 59
+MARK = 34
+
+def _nvtx(ranges):
+    # (globalTid, start, end, textId, eventType) per range
+    tid, start, end, textId, eventType = (np.array(c, dtype=np.int64) for c in zip(*ranges))
+    return NvtxTable({
+        "start": start, "end": end, "eventType": eventType, "globalTid": tid,
+        "textId": textId, "text": np.full(len(start), None, dtype=object),
+    })
+
+def test_handBuiltNesting():
+    a, b = 1 << 24 | 1, 1 << 24 | 2
+    nvtx = _nvtx([
+        (a, 0, 100, 1, PUSHPOP),    # outer
+        (a, 10, 50, 2, PUSHPOP),    #   inner
+        (a, 20, 30, 3, PUSHPOP),    #     innermost
+        (a, 60, 90, 2, PUSHPOP),    #   inner
+        (a, 40, 40, 4, MARK),       # dropped: not a push/pop range
+        (b, 5, 45, 1, PUSHPOP),     # other thread, overlapping in time
+        (b, 45, 80, 1, PUSHPOP),    # back to back with the previous one
+    ])
+    tree = buildNvtxTree(nvtx)
+    assert len(tree) == 6
+    assert tree.nvtx.start.tolist() == [0, 10, 20, 60, 5, 45]
+    assert tree.depth.tolist() == [0, 1, 2, 1, 0, 0]
+    assert tree.parent.tolist() == [-1, 0, 1, 0, -1, -1]
+    assert tree.maxDepth == 2
+    assert tree.roots.tolist() == [0, 4, 5]
+    assert tree.children(0).tolist() == [1, 3]
+    assert tree.ancestors(2).tolist() == [2, 1, 0]
+    assert tree.inclusive.tolist() == [100, 40, 10, 30, 40, 35]
+    assert tree.exclusive.tolist() == [30, 30, 10, 30, 40, 35]
+
+    # Ranges are half open: [start, end)
+    times = np.array([0, 25, 50, 55, 95, 100, 45, 44])
+    tids = np.array([a, a, a, a, a, a, b, b])
+    assert tree.innermost(times, tids).tolist() == [0, 2, 0, 0, 0, -1, 5, 4]
+    query, ranges = tree.enclosing(np.array([25, 55]), a)
+    assert query.tolist() == [0, 0, 0, 1]
+    assert ranges.tolist() == [2, 1, 0, 0]
+
+    summary = tree.summarize()
+    assert summary.textId.tolist() == [1, 2, 3]
+    assert summary.count.tolist() == [3, 2, 1]
+    assert summary.inclusive.tolist() == [175, 70, 10]
+
+def test_syntheticTrace(db):
+    nvtx = db.getNvtxBetween(columnar=True)
+    tree = db.getNvtxTree()
+    assert len(tree) == len(nvtx) > 0
+    # Outer ranges wrap the inner ones, which wrap the launches
+    assert set(tree.depth.tolist()) == {0, 1}
+
+    # Parent is the shortest other range on the same thread enclosing the range
+    starts, ends, tids = tree.nvtx.start, tree.nvtx.end, tree.nvtx.globalTid
+    for i in range(len(tree)):
+        encloses = (tids == tids[i]) & (starts <= starts[i]) & (ends >= ends[i])
+        encloses[i] = False
+        candidates = np.flatnonzero(encloses)
+        expected = candidates[np.argmin(ends[candidates] - starts[candidates])] if len(candidates) > 0 else -1
+        assert tree.parent[i] == expected
+        assert tree.depth[i] == (0 if expected < 0 else tree.depth[expected] + 1)
+
+    # Every launch of the trace is inside an inner range, and GPU time is
+    # attributed to it and all its ancestors
+    assert np.all(tree.launchRange >= 0)
+    assert np.all(tree.depth[tree.launchRange] == 1)
+    outer = tree.depth == 0
+    assert np.all(tree.gpuInclusive[outer] >= tree.gpuExclusive[outer])
+    assert np.all(tree.gpuExclusive[outer] == 0)
+    assert np.array_equal(tree.exclusive[~outer], tree.inclusive[~outer])
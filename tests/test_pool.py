@@ -0,0 +1,48 @@
+import sqlite3
+import threading
+
+from nsyspy.pool import ConnectionPool
+
+def _schemas(con):
+    return [row[1] for row in con.execute("pragma database_list").fetchall()]
+
+def test_attachIsAppliedWhenEachThreadNextChecksOut(tracePath, tmp_path):
+    other = str(tmp_path / "other.sqlite")
+    con = sqlite3.connect(other)
+    con.execute("create table t (x integer)")
+    con.execute("insert into t values (42)")
+    con.commit()
+    con.close()
+
+    pool = ConnectionPool(tracePath)
+    checkedOut = threading.Barrier(3)
+    attached = threading.Event()
+    results = dict()
+
+    def work(name):
+        con = pool.connection()
+        checkedOut.wait()
+        attached.wait()
+        # Connections already held are left alone until checked out again
+        before = _schemas(con)
+        con = pool.connection()
+        results[name] = (before, _schemas(con), con.execute("select x from other.t").fetchone()[0])
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(2)]
+    try:
+        for thread in threads:
+            thread.start()
+        checkedOut.wait()
+        pool.attach(other, "other")
+        attached.set()
+        for thread in threads:
+            thread.join()
+        assert len(pool) == 2
+        for before, after, value in results.values():
+            assert "other" not in before
+            assert "other" in after
+            assert value == 42
+        # Connections opened after the attach get it straight away
+        assert pool.connection().execute("select x from other.t").fetchone()[0] == 42
+    finally:
+        pool.close()
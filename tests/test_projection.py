@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from nsyspy import KernelTable, NvtxTable
+from nsyspy.projection import projectRanges
+
+def _bruteForce(nvtx, launches):
+    # Kernels whose launching call lies inside the range, on its thread
+    valid = ~nvtx.nullMask("end")
+    result = list()
+    for i in range(len(nvtx)):
+        inside = (
+            valid[i] & (launches.apiGlobalTid == nvtx.globalTid[i])
+            & (launches.apiStart >= nvtx.start[i]) & (launches.apiEnd <= nvtx.end[i])
+        )
+        found = np.flatnonzero(inside)
+        result.append(found[np.argsort(launches.apiStart[found], kind="stable")].tolist())
+    return result
+
+@pytest.mark.parametrize("span", [100000, 2**61])
+def test_projectRangesMatchesBruteForce(span):
+    # A span too wide to pack with the thread into int64 takes the rank path
+    rng = np.random.default_rng(0)
+    n = 2000
+    apiStart = rng.integers(0, 100000, n)
+    apiStart[0] = span
+    start = apiStart + rng.integers(100, 1000, n)
+    launches = KernelTable({
+        "start": start,
+        "end": start + rng.integers(10, 500, n),
+        "apiStart": apiStart,
+        "apiEnd": apiStart + rng.integers(0, 50, n),
+        "apiGlobalTid": rng.choice([7, 9, 12], n),
+    })
+    m = 300
+    rangeStart = rng.integers(-1000, 101000, m)
+    end = rangeStart + rng.integers(0, 5000, m)
+    endMask = rng.random(m) < 0.1
+    nvtx = NvtxTable(
+        {
+            "start": rangeStart, "end": end,
+            "globalTid": rng.choice([7, 8, 9, 12, 13], m),
+        },
+        nullMasks={"end": endMask},
+    )
+    projection = projectRanges(nvtx, launches)
+    expected = _bruteForce(nvtx, launches)
+    assert len(projection) == m
+    assert projection.kernelCount.tolist() == [len(e) for e in expected]
+    assert sum(len(e) for e in expected) > 0
+    for i, e in enumerate(expected):
+        assert projection.kernelIndices[projection.offsets[i]:projection.offsets[i + 1]].tolist() == e
+        if e:
+            assert projection.gpuStart[i] == launches.start[e].min()
+            assert projection.gpuEnd[i] == launches.end[e].max()
+        else:
+            assert projection.gpuBusy[i] == 0
+
+def test_projectNvtxToKernels(db):
+    nvtx = db.getNvtxBetween(columnar=True)
+    projection = db.projectNvtxToKernels(nvtx)
+    launches = db.getKernelLaunchesBetween()
+    assert len(launches) == len(db.getKernelsBetween(columnar=True))
+    assert projection.kernelCount.tolist() == [len(e) for e in _bruteForce(nvtx, projection.kernels)]
+    # Every launch of the trace is inside one range and one outer range
+    assert np.sum(projection.kernelCount) == 2 * len(launches)
+    for i in (0, len(projection) // 2):
+        kernels = projection.kernelsFor(i)
+        assert projection.gpuSpan[i] == kernels.end.max() - kernels.start.min()
+        assert 0 < projection.gpuBusy[i] <= projection.gpuSpan[i]
+    assert db.projectNvtxToKernels(db.getNvtxBetween()[:10]).kernelCount.tolist() == \
+        projection.kernelCount[:10].tolist()
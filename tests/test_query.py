@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from nsyspy import KernelTable, CuptiActivityKindKernel
+
+@pytest.fixture
+def kernels(db):
+    return db.getKernelsBetween(columnar=True)
+
+def _nameId(db, name):
+    ids = [i for i, s in db.findStringIdsContaining([name]).items() if s == name]
+    assert len(ids) == 1
+    return ids[0]
+
+def test_named(db, kernels):
+    kernel3 = _nameId(db, "kernel_3")
+    table = db.kernels().named("kernel_3").toColumns()
+    assert isinstance(table, KernelTable)
+    assert np.array_equal(table.rowid, kernels.rowid[kernels.shortName == kernel3])
+    # Substring match on demangled names: every name contains 'float'
+    assert db.kernels().named("FLOAT", column="demangledName").count() == len(kernels)
+    assert db.kernels().named("kernel_3", exact=True).count() == len(table)
+    assert db.kernels().named("kernel_", exact=True).count() == 0
+    # LIKE wildcards are matched literally
+    assert db.kernels().named("kernel%").count() == 0
+    with pytest.raises(ValueError):
+        db.kernels().named("kernel_3", column="nameId")
+
+def test_combinedPredicates(db, kernels):
+    t0, t1 = np.percentile(kernels.start, [10, 60]).astype(np.int64).tolist()
+    stream = int(kernels.streamId[kernels.deviceId == 1][0])
+    query = db.kernels().between(t0, t1).onStream(stream).onDevice(1).withGrid(minBlocks=2).withBlock(maxThreads=512)
+    expected = (
+        (kernels.start >= t0) & (kernels.end <= t1) & (kernels.streamId == stream) & (kernels.deviceId == 1)
+        & (kernels.totalBlocks >= 2) & (kernels.threads_per_blk <= 512)
+    )
+    assert np.sum(expected) > 0
+    assert query.count() == np.sum(expected)
+    assert np.array_equal(query.toColumns().rowid, kernels.rowid[expected])
+    rows = list(query)
+    assert all(isinstance(r, CuptiActivityKindKernel) for r in rows)
+    assert [r.rowid for r in rows] == kernels.rowid[expected].tolist()
+
+def test_rawPredicateIsParenthesized(db, kernels):
+    a, b = np.unique(kernels.streamId)[:2].tolist()
+    query = db.kernels().where("streamId = ? or streamId = ?", a, b).onDevice(0)
+    expected = np.isin(kernels.streamId, [a, b]) & (kernels.deviceId == 0)
+    assert query.count() == np.sum(expected)
+
+def test_queriesAreImmutable(db, kernels):
+    base = db.kernels().onDevice(0)
+    narrowed = base.onStream(int(kernels.streamId[0]))
+    assert base.count() == np.sum(kernels.deviceId == 0)
+    assert narrowed.count() < base.count()
+    stmt, params = narrowed.compile()
+    assert stmt.count("?") == len(params) == 2
+    assert base.compile()[1] == [0]
+
+def test_orderAndLimit(db, kernels):
+    table = db.kernels().orderBy("end desc").limit(10).toColumns()
+    assert np.array_equal(table.end, np.sort(kernels.end)[::-1][:10])
+    assert db.kernels().limit(10).count() == len(kernels)
+
+def test_groupByStream(db, kernels):
+    query = db.kernels().onDevice(0)
+    grouped = query.groupByStream(columnar=True)
+    onDevice = kernels[kernels.deviceId == 0]
+    assert sorted(grouped) == np.unique(onDevice.streamId).tolist()
+    for streamId, table in grouped.items():
+        assert np.array_equal(table.rowid, onDevice.rowid[onDevice.streamId == streamId])
+    rows = query.groupByStream()
+    assert {s: [k.rowid for k in r] for s, r in rows.items()} == {s: t.rowid.tolist() for s, t in grouped.items()}
@@ -0,0 +1,40 @@
+import os
+
+import numpy as np
+import pytest
+
+from nsyspy import ReportSet
+from nsyspy.synthetic import generateTrace
+
+@pytest.fixture
+def reportPaths(tmp_path):
+    paths = [str(tmp_path / f"run{i}.sqlite") for i in range(3)]
+    for i, path in enumerate(paths):
+        generateTrace(path, numKernels=200 * (i + 1), numNames=4, kernelsPerRange=0, seed=i)
+    return paths
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_gather(reportPaths, parallel):
+    pattern = os.path.join(os.path.dirname(reportPaths[0]), "run*.sqlite")
+    with ReportSet(pattern, maxWorkers=2, parallel=parallel) as reports:
+        assert reports.paths == reportPaths
+        kernels = reports.getKernelsBetween()
+        assert np.bincount(kernels.report).tolist() == [200, 400, 600]
+        summary = reports.kernelSummary()
+        assert sorted(set(summary.name.tolist())) == [f"kernel_{i}" for i in range(4)]
+        assert [int(np.sum(summary.count[summary.report == i])) for i in range(3)] == [200, 400, 600]
+
+def test_reexportedReportIsReopened(reportPaths):
+    reports = ReportSet(reportPaths[:1], parallel=False)
+    try:
+        assert len(reports.getKernelsBetween()) == 200
+        # Same path, new contents
+        generateTrace(reportPaths[0], numKernels=50, numNames=4, kernelsPerRange=0, seed=9)
+        assert len(reports.getKernelsBetween()) == 50
+    finally:
+        reports.close()
+    assert len(reports._openReports._reports) == 0
+
+def test_missingReport(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ReportSet(str(tmp_path / "missing.sqlite"))
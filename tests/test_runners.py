@@ -0,0 +1,168 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from nsyspy import Runner, Job
+from nsyspy.runners import exportIsUpToDate
+
+STUB = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "benchmarks", "stubnsys.py")
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    # Run the stub with this interpreter, whatever python3 is on the PATH
+    nsys = tmp_path / "nsys"
+    nsys.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.abspath(STUB)}" "$@"\n')
+    nsys.chmod(0o755)
+    monkeypatch.setenv("STUBNSYS_KERNELS", "200")
+    monkeypatch.setenv("STUBNSYS_NAMES", "4")
+    for name in ("STUBNSYS_FAIL", "STUBNSYS_SLEEP", "STUBNSYS_WARMUP", "STUBNSYS_JITTER"):
+        monkeypatch.delenv(name, raising=False)
+    return Runner(nsys_path=str(nsys))
+
+def _jobs(tmp_path, n):
+    return [Job(target=["./app", str(i)], reportname=str(tmp_path / f"job{i}.nsys-rep")) for i in range(n)]
+
+def _profiledAt(reportname):
+    with open(reportname) as f:
+        report = json.load(f)
+    return report["started"], report["finished"]
+
+@pytest.mark.parametrize("maxConcurrent", [1, 4])
+def test_runJobsConcurrency(runner, tmp_path, monkeypatch, maxConcurrent):
+    monkeypatch.setenv("STUBNSYS_SLEEP", "0.3")
+    jobs = _jobs(tmp_path, 4)
+    results = runner.runJobs(jobs, maxConcurrent=maxConcurrent)
+    try:
+        assert [r.job for r in results] == jobs
+        for r in results:
+            assert r.ok, r.error
+            assert r.exported and r.returncode == 0
+            assert r.sqlitepath == os.path.splitext(r.reportname)[0] + ".sqlite"
+            assert len(r.db.getKernelsBetween(columnar=True)) == 200
+    finally:
+        for r in results:
+            if r.db is not None:
+                r.db.close()
+    spans = sorted(_profiledAt(j.reportname) for j in jobs)
+    if maxConcurrent == 1:
+        assert all(b[0] >= a[1] for a, b in zip(spans[:-1], spans[1:]))
+    else:
+        assert max(s for s, _ in spans) < min(f for _, f in spans)
+
+def test_runJobsReportsErrors(runner, tmp_path):
+    jobs = [
+        Job(target=["./app"], reportname=str(tmp_path / "ok.nsys-rep")),
+        Job(reportname=str(tmp_path / "missing.nsys-rep")),
+        Job(),
+    ]
+    ok, missing, empty = runner.runJobs(jobs, openDatabases=False)
+    assert ok.ok and ok.db is None
+    assert isinstance(missing.error, FileNotFoundError)
+    assert missing.returncode is None
+    assert isinstance(empty.error, ValueError)
+
+def test_generatedReportNamesAreUnique(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    results = runner.runJobs([Job(target=["./app"]) for _ in range(4)], openDatabases=False)
+    names = [r.reportname for r in results] + [runner.profile(["./app"]) for _ in range(2)]
+    assert len(set(names)) == len(names)
+    assert all(r.ok for r in results)
+    assert all(os.path.exists(name) for name in names)
+
+def test_failedProfileIsNotExported(runner, tmp_path, monkeypatch):
+    job = _jobs(tmp_path, 1)[0]
+    first, = runner.runJobs([job], openDatabases=False)
+    assert first.ok
+    sqliteStat = os.stat(first.sqlitepath)
+
+    # The report of the first run is still there, but must not be exported again
+    monkeypatch.setenv("STUBNSYS_FAIL", "profile")
+    second, = runner.runJobs([job])
+    assert isinstance(second.error, subprocess.CalledProcessError)
+    assert second.returncode == 1
+    assert "profile failed" in second.stderr
+    assert not second.exported and second.sqlitepath is None and second.db is None
+    assert os.stat(first.sqlitepath).st_mtime_ns == sqliteStat.st_mtime_ns
+
+def test_failedExportIsNeverUpToDate(runner, tmp_path, monkeypatch):
+    job = _jobs(tmp_path, 1)[0]
+    first, = runner.runJobs([job], openDatabases=False)
+    assert first.ok and exportIsUpToDate(job.reportname, first.sqlitepath)
+
+    # A new report whose export fails, leaving the old sqlite file behind
+    monkeypatch.setenv("STUBNSYS_FAIL", "export")
+    job = Job(target=["./app", "--changed"], reportname=job.reportname)
+    second, = runner.runJobs([job])
+    assert isinstance(second.error, subprocess.CalledProcessError)
+    assert second.returncode == 1
+    assert "export failed" in second.stderr
+    assert not second.exported and second.db is None
+    assert os.path.exists(first.sqlitepath)
+    assert not exportIsUpToDate(job.reportname, first.sqlitepath)
+    with pytest.raises(subprocess.CalledProcessError):
+        runner.export(job.reportname)
+
+    # Once nsys works again, the export is redone rather than skipped
+    monkeypatch.delenv("STUBNSYS_FAIL")
+    third, = runner.runJobs([Job(reportname=job.reportname)], openDatabases=False)
+    assert third.ok and third.exported
+    assert exportIsUpToDate(job.reportname, third.sqlitepath)
+
+def test_skipIfUpToDate(runner, tmp_path):
+    reportname = runner.profile(["./app"], reportname=str(tmp_path / "report.nsys-rep"))
+    job = Job(reportname=reportname)
+    first, = runner.runJobs([job], openDatabases=False)
+    assert first.ok and first.exported
+    exportedAt = os.stat(first.sqlitepath).st_mtime_ns
+
+    second, = runner.runJobs([job], openDatabases=False)
+    assert second.ok and not second.exported and second.returncode is None
+    # A new mtime with the same contents is still up to date
+    os.utime(reportname, ns=(exportedAt + 10**9, exportedAt + 10**9))
+    third, = runner.runJobs([job], openDatabases=False)
+    assert third.ok and not third.exported
+    assert os.stat(first.sqlitepath).st_mtime_ns == exportedAt
+
+    db = runner.export(reportname, skipIfUpToDate=False)
+    db.close()
+    assert os.stat(first.sqlitepath).st_mtime_ns != exportedAt
+    with open(reportname, "a") as f:
+        f.write(" ")
+    fourth, = runner.runJobs([job], openDatabases=False)
+    assert fourth.ok and fourth.exported
+
+def _benchmark(runner, tmp_path, monkeypatch, warmup):
+    monkeypatch.setenv("STUBNSYS_WARMUP", str(warmup))
+    return runner.benchmark(["./app"], runs=3, reportname=str(tmp_path / f"warmup{warmup}"))
+
+def test_benchmarkSkipsWarmup(runner, tmp_path, monkeypatch):
+    monkeypatch.setenv("STUBNSYS_KERNELS", "2000")
+    cold = _benchmark(runner, tmp_path, monkeypatch, 20)
+    warm = _benchmark(runner, tmp_path, monkeypatch, 0)
+    assert len(cold.reportnames) == len(warm.reportnames) == 3
+    assert all(os.path.exists(path) for path in cold.sqlitepaths)
+    # Every name's first 20 launches run slow; MSER finds about that many
+    assert np.all((cold.runs.warmup >= 15) & (cold.runs.warmup <= 30))
+    assert np.all(warm.runs.warmup <= 5)
+    assert cold.summary.runs.tolist() == [3] * 4
+    assert np.all(cold.summary.ciLow <= cold.summary.median)
+    assert np.all(cold.summary.median <= cold.summary.ciHigh)
+    # With the warm-up cut away, the medians match those of warm runs
+    medians = dict(zip(warm.summary.name.tolist(), warm.summary.median.tolist()))
+    for name, median in zip(cold.summary.name.tolist(), cold.summary.median.tolist()):
+        assert median == pytest.approx(medians[name], rel=0.01)
+
+def test_benchmarkStopsWhenStable(runner, tmp_path, monkeypatch):
+    monkeypatch.setenv("STUBNSYS_KERNELS", "1000")
+    monkeypatch.setenv("STUBNSYS_WARMUP", "0")
+    result = runner.benchmark(["./app"], runs=6, minRuns=3, tolerance=0.05, reportname=str(tmp_path / "stable"))
+    assert result.stable
+    # A run is profiled while the previous one is exported, so the check
+    # that stops after three runs comes one run late
+    assert len(result.reportnames) == 4
+    assert result.summary.runs.tolist() == [4] * 4
+    assert np.all(result.summary.relativeError <= 0.05)
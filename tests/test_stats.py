@@ -0,0 +1,121 @@
+import math
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from nsyspy.stats import (
+    groupLabels, groupedSummary, histogramPercentiles, steadyStateStarts, medianConfidenceIntervals, _medianRank
+)
+
+def test_groupedSummaryMatchesNumpy():
+    rng = np.random.default_rng(0)
+    keys = rng.integers(0, 20, 5000) * 3 - 7
+    values = rng.integers(0, 100000, 5000)
+    summary = groupedSummary(keys, values, (0, 25, 50, 90, 100), keyName="name")
+    uniqueKeys = np.unique(keys)
+    assert sorted(summary.name.tolist()) == uniqueKeys.tolist()
+    # Sorted by descending total
+    assert np.all(np.diff(summary.total) <= 0)
+    for row, key in enumerate(summary.name.tolist()):
+        v = values[keys == key]
+        assert summary.count[row] == len(v)
+        assert summary.total[row] == np.sum(v)
+        assert summary.min[row] == np.min(v)
+        assert summary.max[row] == np.max(v)
+        assert summary.mean[row] == pytest.approx(np.mean(v))
+        assert summary.stddev[row] == pytest.approx(np.std(v, ddof=1))
+        for q in (0, 25, 50, 90, 100):
+            assert summary.columns[f"p{q:g}"][row] == pytest.approx(np.percentile(v, q))
+
+def test_groupedSummaryEdgeCases():
+    single = groupedSummary(np.array([5, 5, 6]), np.array([1.5, 2.5, 4.0]))
+    assert single.key.tolist() == [5, 6]
+    assert single.stddev.tolist() == [pytest.approx(np.std([1.5, 2.5], ddof=1)), 0.0]
+    assert single.p50.tolist() == [2.0, 4.0]
+    empty = groupedSummary(np.zeros(0, dtype=np.int64), np.zeros(0))
+    assert len(empty) == 0
+
+def test_groupLabelsMatchesUnique():
+    rng = np.random.default_rng(1)
+    cases = [
+        (rng.integers(0, 5, 1000), rng.integers(0, 3, 1000)),
+        (rng.integers(-3, 3, 1000), rng.integers(0, 3, 1000)),                  # negative keys
+        (rng.integers(0, 1 << 40, 1000), rng.integers(0, 1 << 40, 1000)),      # keys too wide to pack
+        (rng.integers(0, 4, 1000).astype(np.float64) / 3,),                     # non-integer keys
+        (rng.integers(0, 4, 1000), rng.integers(0, 4, 1000), rng.integers(0, 4, 1000)),
+    ]
+    for keys in cases:
+        labels, first = groupLabels(*keys)
+        _, index, inverse = np.unique(np.column_stack(keys), axis=0, return_index=True, return_inverse=True)
+        assert np.array_equal(labels, inverse.reshape(-1))
+        assert np.array_equal(first, index)
+    labels, first = groupLabels(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    assert len(labels) == len(first) == 0
+
+def test_histogramPercentiles():
+    # Group 0 spans 0..99 with 10 values per bucket of 10; group 1 has no rows
+    groups = np.zeros(10, dtype=np.int64)
+    buckets = np.arange(10)
+    counts = np.full(10, 10)
+    out = histogramPercentiles(groups, buckets, counts, np.array([0, 5]), np.array([99, 9]), 10, (0, 50, 100))
+    assert out[0].tolist() == [0.0, pytest.approx(50.0, abs=10), 99.0]
+    assert np.all(np.isnan(out[1]))
+
+def _exactMedianRank(n, confidence):
+    # Largest j with 1 - 2 * P(B <= j) >= confidence, with exact fractions
+    j, cdf = 0, Fraction(1, 2 ** n)
+    while j + 1 < n - 1 - j:
+        next_ = cdf + Fraction(math.comb(n, j + 1), 2 ** n)
+        if 1 - 2 * next_ < Fraction(confidence).limit_denominator(10 ** 6):
+            break
+        j, cdf = j + 1, next_
+    return j
+
+def test_medianRank():
+    for n in list(range(1, 60)) + [100, 257, 1000]:
+        for confidence in (0.9, 0.95, 0.99):
+            assert _medianRank(n, confidence) == _exactMedianRank(n, confidence), (n, confidence)
+
+def test_medianRankLargeGroups():
+    # 0.5 ** n underflows from n = 1075 on; ranks must keep growing like
+    # (n - z * sqrt(n)) / 2 instead of collapsing onto the median
+    z = 1.959963984540054
+    for n in (1074, 1075, 5000, 10000, 10001, 100000):
+        j = _medianRank(n, 0.95)
+        assert abs(j - (n - z * math.sqrt(n)) / 2) <= 2, n
+    ranks = [_medianRank(n, 0.95) for n in range(9990, 10010)]
+    assert np.all(np.diff(ranks) >= 0)
+
+def test_medianConfidenceIntervals():
+    rng = np.random.default_rng(2)
+    sizes = [0, 1, 5, 6, 100, 2000]
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    values = rng.normal(100, 10, offsets[-1])
+    median, low, high = medianConfidenceIntervals(values, offsets)
+    assert np.isnan(median[0])
+    for g in range(1, len(sizes)):
+        v = np.sort(values[offsets[g]:offsets[g + 1]])
+        j = _exactMedianRank(len(v), 0.95)
+        assert median[g] == pytest.approx(np.median(v))
+        assert (low[g], high[g]) == (v[j], v[len(v) - 1 - j])
+        assert low[g] <= median[g] <= high[g]
+    # 5 values cannot reach 95%; they get their min and max
+    five = values[offsets[2]:offsets[3]]
+    assert (low[2], high[2]) == (five.min(), five.max())
+
+def test_steadyStateStarts():
+    rng = np.random.default_rng(3)
+    warmup = [0, 10, 40]
+    series = [
+        100 + rng.normal(0, 1, 200) + np.concatenate((200 * (1 - np.arange(w) / w), np.zeros(200 - w)))
+        for w in warmup
+    ]
+    offsets = np.concatenate(([0], np.cumsum([len(s) for s in series])))
+    starts = steadyStateStarts(np.concatenate(series), offsets)
+    # Without a transient, only noise decides the cut, so it stays short
+    assert starts[0] <= 20
+    for s, w in zip(starts[1:].tolist(), warmup[1:]):
+        assert w - 5 <= s <= w + 5
+    # Series shorter than 3 values are never cut
+    assert steadyStateStarts(np.array([500.0, 1.0]), np.array([0, 2])).tolist() == [0]
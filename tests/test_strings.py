@@ -0,0 +1,42 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from nsyspy import NsysSqlite
+from nsyspy.strings import StringCache
+
+def test_stringCacheEvictsLeastRecentlyUsed():
+    cache = StringCache(2)
+    cache.put(1, "a")
+    cache.put(2, "b")
+    assert cache.get(1) == "a"
+    cache.put(3, "c")
+    assert 1 in cache and 3 in cache and 2 not in cache
+    assert len(cache) == 2
+    with pytest.raises(ValueError):
+        StringCache(0)
+
+def test_resolveStrings(tracePath, monkeypatch):
+    con = sqlite3.connect(tracePath)
+    expected = dict(con.execute("select id, value from StringIds").fetchall())
+    con.close()
+    # A cache smaller than the table, and batches smaller than the ids
+    db = NsysSqlite(tracePath, maxCachedStrings=4)
+    monkeypatch.setattr(db, "_MAX_PARAMS_PER_QUERY", 3)
+    try:
+        ids = list(expected) + [max(expected) + 1]
+        assert db.resolveStrings(ids + ids[:5]) == expected
+        assert len(db._stringCache) == 4
+        assert all(db.findStringMatchingId(i) == expected[i] for i in expected)
+        with pytest.raises(KeyError):
+            db.findStringMatchingId(max(expected) + 1)
+
+        kernels = db.getKernelsBetween(columnar=True)
+        names = db.resolveStringColumn(kernels.shortName)
+        assert names.tolist() == [expected[i] for i in kernels.shortName.tolist()]
+        assert np.array_equal(kernels.shortNameStrings(db), names)
+        assert kernels.demangledNameStrings(db)[0] == expected[int(kernels.demangledName[0])]
+        assert db.resolveStringColumn(np.array([ids[-1]])).tolist() == [None]
+    finally:
+        db.close()
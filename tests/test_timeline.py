@@ -0,0 +1,54 @@
+import numpy as np
+
+from nsyspy import KernelTable
+from nsyspy.timeline import utilizationSeries
+
+class _FixedOccupancy:
+    # Stands in for a device.Device: launch occupancy by kernel rowid
+    def __init__(self, occupancy):
+        self._occupancy = occupancy
+
+    def launchOccupancies(self, kernels):
+        return np.array([self._occupancy[i] for i in kernels.rowid.tolist()])
+
+def _kernels(rows):
+    # (deviceId, streamId, start, end) per kernel
+    deviceId, streamId, start, end = (np.array(c, dtype=np.int64) for c in zip(*rows))
+    return KernelTable({
+        "rowid": np.arange(len(start)), "start": start, "end": end,
+        "deviceId": deviceId, "streamId": streamId,
+    })
+
+def test_busyAndOccupancy():
+    kernels = _kernels([
+        (0, 1, 0, 100),
+        (0, 2, 50, 100),
+        (1, 1, 10, 20),
+    ])
+    series = utilizationSeries(kernels, 2, 0, 100, device=_FixedOccupancy([0.5, 0.25, 1.0]))
+    assert len(series) == 2
+    assert series.edges.tolist() == [0, 50, 100]
+    assert series.deviceIds.tolist() == [0, 1]
+    assert series.deviceBusy.tolist() == [[1.0, 1.0], [0.2, 0.0]]
+    assert series.deviceKernels.tolist() == [[1, 2], [1, 0]]
+    # Mean over the running kernels, weighted by time: (0.5 * 50 + 0.25 * 50) / 100
+    assert series.deviceOccupancy[0].tolist() == [0.5, 0.375]
+    assert series.deviceOccupancy[1, 0] == 1.0
+    assert np.isnan(series.deviceOccupancy[1, 1])
+    # Sum over the running kernels, averaged over the bucket
+    assert series.deviceSummedOccupancy.tolist() == [[0.5, 0.75], [0.2, 0.0]]
+
+    assert series.streamDeviceIds.tolist() == [0, 0, 1]
+    assert series.streamIds.tolist() == [1, 2, 1]
+    assert series.streamBusy.tolist() == [[1.0, 1.0], [0.0, 1.0], [0.2, 0.0]]
+    assert series.streamOccupancy[0].tolist() == [0.5, 0.5]
+    assert np.isnan(series.streamOccupancy[1, 0])
+
+def test_fractionalWindow():
+    # Back to back kernels merge into one busy interval, also when the
+    # window starts between two nanoseconds
+    kernels = _kernels([(0, 1, 0, 10), (0, 2, 10, 20), (0, 1, 30, 40)])
+    series = utilizationSeries(kernels, 1, 0.5, 40.5)
+    assert series.deviceBusy[0, 0] == (19.5 + 10) / 40
+    assert series.deviceOccupancy is None
+    assert series.deviceKernels.tolist() == [[3]]